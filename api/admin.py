@@ -1,3 +1,15 @@
 from django.contrib import admin
+from .models import MediaBlob, UploadSession
 
-# Register your models here.
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'target', 'object_id', 'filename', 'received', 'size', 'updated_at']
+    list_filter = ['target']
+    list_select_related = ['user']
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'refcount', 'updated_at']
+    search_fields = ['name']
@@ -0,0 +1,38 @@
+import threading
+from django.db import transaction
+
+
+class _Batch:
+
+    def __init__(self):
+        self.items = set()
+        self.done = False
+
+
+class CommitBatch:
+    """
+    Collects items during a transaction and calls ``func`` with all of them
+    once after it commits, however many times ``add`` was called.
+
+    Every ``add`` registers its own commit callback and the first one to run
+    takes the whole batch, so a savepoint rolled back together with an
+    earlier callback cannot lose the later items. Items left over by a
+    rolled-back transaction are handed over with the next batch.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self._local = threading.local()
+
+    def add(self, *items):
+        batch = getattr(self._local, 'batch', None)
+        if batch is None or batch.done:
+            batch = self._local.batch = _Batch()
+        batch.items.update(items)
+        transaction.on_commit(lambda: self._run(batch))
+
+    def _run(self, batch):
+        if batch.done:
+            return
+        batch.done = True
+        self.func(batch.items)
@@ -0,0 +1,183 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from .imaging import render
+from .storage import BLOB_DIR, get_content_store, is_blob
+
+DERIVATIVE_DIR = 'derivatives'
+LEGACY_DIR = 'files'
+RENDER_TIMEOUT = 30
+SIGNING_SALT = 'api.derivatives'
+PRIVATE_SIGNING_SALT = 'api.derivatives.private'
+# URLs of public images (provider logos) are handed out with every
+# serialized provider, so a week covers any page a client still has open.
+TOKEN_MAX_AGE = 7 * 24 * 60 * 60
+# URLs of private images (proofs) are bound to the reader they were issued
+# to and only work briefly, since an <img> cannot send the Bearer header.
+PRIVATE_TOKEN_MAX_AGE = 60 * 60
+
+# variant -> (bounding box in pixels, output format; None keeps JPEG or PNG
+# depending on the source)
+VARIANTS = {
+    'thumb': (320, None),
+    'thumb_webp': (320, 'WEBP'),
+    'preview_webp': (1280, 'WEBP'),
+}
+_LOSSLESS_SOURCES = ('.png', '.gif', '.webp')
+
+_pool = None
+_pool_lock = threading.Lock()
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def source_key(name):
+    """The content hash of a blob."""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def output_format(name, variant):
+    fmt = VARIANTS[variant][1]
+    if fmt is None:
+        fmt = 'PNG' if os.path.splitext(name)[1].lower() in _LOSSLESS_SOURCES else 'JPEG'
+    return fmt
+
+
+def source_dir(name):
+    """
+    Where the derivatives of ``name`` live: under the content hash for
+    blobs, and under the file's own name for older files, so that the
+    source of any derivative can be worked out from its path.
+    """
+    if is_blob(name):
+        key = source_key(name)
+        return f"{DERIVATIVE_DIR}/{key[:2]}/{key}"
+    return f"{DERIVATIVE_DIR}/{LEGACY_DIR}/{name}"
+
+
+def source_of(derivative):
+    """The image a derivative was rendered from, or None."""
+    from .models import MediaBlob
+
+    directory = os.path.dirname(derivative)
+    prefix = f"{DERIVATIVE_DIR}/{LEGACY_DIR}/"
+    if directory.startswith(prefix):
+        return directory[len(prefix):]
+    key = os.path.basename(directory)
+    return (
+        MediaBlob.objects.filter(name__startswith=f"{BLOB_DIR}/{key[:2]}/{key[2:4]}/{key}")
+        .values_list('name', flat=True)
+        .first()
+    )
+
+
+def derivative_name(name, variant):
+    extension = {'WEBP': 'webp', 'PNG': 'png', 'JPEG': 'jpg'}[output_format(name, variant)]
+    return f"{source_dir(name)}/{variant}.{extension}"
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_DERIVATIVE_WORKERS)
+        return _pool
+
+
+def _discard_pool(pool):
+    """
+    Drops ``pool`` after a worker died, so that the next render starts a
+    new one instead of failing on the broken executor.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def ensure_derivative(name, variant):
+    """
+    Returns the storage name of ``variant`` of the image ``name``, rendering
+    it first if needed. Decoding happens in the process pool; concurrent
+    requests for the same derivative wait on a single render.
+    """
+    storage = get_content_store()
+    dest = derivative_name(name, variant)
+    if storage.exists(dest):
+        return dest
+
+    with _in_flight_lock:
+        pool, future = _in_flight.get(dest, (None, None))
+        if future is None:
+            pool = _get_pool()
+            try:
+                future = pool.submit(
+                    render, storage.path(name), storage.path(dest), VARIANTS[variant][0], output_format(name, variant),
+                )
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                raise
+            _in_flight[dest] = (pool, future)
+            future.add_done_callback(lambda _: _in_flight.pop(dest, None))
+    try:
+        future.result(timeout=RENDER_TIMEOUT)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    return dest
+
+
+def remove_derivatives(name):
+    shutil.rmtree(get_content_store().path(source_dir(name)), ignore_errors=True)
+
+
+def derivative_token(name, variant, user=None):
+    """
+    Signs a variant URL. ``user`` is the reader of a private image; public
+    images pass None and get a long-lived token that anyone may use.
+    """
+    if user is None:
+        return signing.dumps([name, variant], salt=SIGNING_SALT, compress=True)
+    return signing.dumps([name, variant, user.pk], salt=PRIVATE_SIGNING_SALT, compress=True)
+
+
+def read_derivative_token(token):
+    """
+    Returns (name, variant, user id), the user id being None for a public
+    image; raises signing.BadSignature for a bad or expired token.
+    """
+    try:
+        name, variant = signing.loads(token, salt=SIGNING_SALT, max_age=TOKEN_MAX_AGE)
+        user_id = None
+    except signing.BadSignature:
+        name, variant, user_id = signing.loads(token, salt=PRIVATE_SIGNING_SALT, max_age=PRIVATE_TOKEN_MAX_AGE)
+    if variant not in VARIANTS:
+        raise signing.BadSignature(variant)
+    return name, variant, user_id
+
+
+def derivative_urls(field_file, request=None, public=False):
+    """
+    The signed URL of every variant of an image field. The endpoint renders
+    the variant on its first request and serves the stored file after that,
+    without a Bearer header, so the URLs work in an ``<img>``. URLs of a
+    private image are issued to the request's user, and to nobody without one.
+    """
+    if not field_file:
+        return None
+    user = None
+    if not public:
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return None
+    urls = {}
+    for variant in VARIANTS:
+        url = reverse('image-derivative', args=[derivative_token(field_file.name, variant, user)])
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
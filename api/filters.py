@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from django.utils import timezone
+from rest_framework import serializers
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()), timezone.get_current_timezone())
+
+
+def filter_date_window(queryset, params, field):
+    """
+    Filters ``field`` to the inclusive ``from``/``to`` days (YYYY-MM-DD) in
+    ``params``, taken in the current time zone. Either bound may be left out.
+    """
+    try:
+        if params.get('from'):
+            day = datetime.strptime(params['from'], '%Y-%m-%d').date()
+            queryset = queryset.filter(**{f'{field}__gte': _day_start(day)})
+        if params.get('to'):
+            day = datetime.strptime(params['to'], '%Y-%m-%d').date() + timedelta(days=1)
+            queryset = queryset.filter(**{f'{field}__lt': _day_start(day)})
+    except ValueError:
+        raise serializers.ValidationError({"error": "'from' and 'to' must use the YYYY-MM-DD format."})
+    return queryset
+
+
+def filter_statuses(queryset, params, choices):
+    """Filters on the comma-separated, case-insensitive ``status`` values in ``params``."""
+    if not params.get('status'):
+        return queryset
+    statuses = [value.strip().upper() for value in params['status'].split(',') if value.strip()]
+    valid_statuses = [choice[0] for choice in choices]
+    if any(value not in valid_statuses for value in statuses):
+        raise serializers.ValidationError({"error": f"Invalid status. Valid choices: {valid_statuses}"})
+    return queryset.filter(status__in=statuses)
@@ -0,0 +1,23 @@
+import os
+from PIL import Image, ImageOps
+
+# Runs in the derivative process pool (see api.derivatives), so it must stay
+# importable without Django being set up.
+
+
+def render(source_path, dest_path, box, fmt):
+    """Writes ``source_path`` scaled to fit a ``box`` pixel square as ``fmt``."""
+    with Image.open(source_path) as image:
+        # Lets the JPEG decoder scale down while decoding.
+        image.draft('RGB', (box, box))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((box, box))
+        if fmt == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        image.save(tmp_path, fmt, quality=80)
+    os.replace(tmp_path, dest_path)
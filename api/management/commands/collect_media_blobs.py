@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from api.storage import collect_garbage, recount_blobs
+
+
+class Command(BaseCommand):
+    help = 'Deletes content-addressed media blobs that no proof, attachment or logo refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24, help='Keep unreferenced blobs this long, for uploads still being saved.')
+        parser.add_argument('--recount', action='store_true', help='Recompute reference counts from the database first.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting it.')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            corrected = recount_blobs()
+            self.stdout.write(f"Corrected {corrected} reference counts.")
+        blobs, size = collect_garbage(timedelta(hours=options['grace_hours']), dry_run=options['dry_run'])
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {blobs} unreferenced blobs ({size} bytes)."))
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import UploadSession
+from api.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = 'Deletes resumable uploads that have not received a chunk recently, with their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Idle time after which an upload is abandoned.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        purged = 0
+        for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+            discard_upload(session)
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} abandoned uploads."))
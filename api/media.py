@@ -0,0 +1,155 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+from users.models import User
+from .derivatives import DERIVATIVE_DIR, source_key, source_of
+from .storage import get_content_store, is_blob
+
+READ_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# The only types shown inline. The extension comes from the uploader's file
+# name, so anything else (HTML, SVG, PDF...) is sent as a download rather
+# than rendered on the API origin.
+INLINE_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp'}
+
+
+def public_file(name):
+    from payments.models import PaymentProvider
+
+    return PaymentProvider.objects.filter(logo=name).exists()
+
+
+def source_file(name):
+    """The file whose permissions apply to ``name``: derivatives follow their source image."""
+    if name.startswith(f"{DERIVATIVE_DIR}/"):
+        return source_of(name)
+    return name
+
+
+def can_read(user, name, public=False):
+    """
+    Whether ``user`` may download the media file ``name``. Provider logos
+    are public; proofs and attachments belong to the order's customer and
+    to staff. A blob shared by several orders is readable by any of their
+    customers, since they uploaded the same bytes.
+    """
+    from communications.models import WorkUpdate
+    from ecommerce.models import Transaction
+
+    if public:
+        return True
+    if not user.is_authenticated:
+        return False
+    if user.role in [User.Role.EMPLOYEE, User.Role.OWNER]:
+        return True
+    return (
+        Transaction.objects.filter(proof_screenshot=name, order__user=user).exists()
+        or WorkUpdate.objects.filter(attachment=name, order__user=user).exists()
+    )
+
+
+def etag_for(name, stat):
+    # A blob's name is its content hash, so the ETag can be strong and stable.
+    if is_blob(name):
+        return f'"{source_key(name)}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) for a single satisfiable byte range, None when the
+    whole file should be sent, or False when the range cannot be satisfied.
+    """
+    match = _RANGE.match(header or '')
+    if not match:
+        # Absent, malformed or multi-range: answer with the whole file.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _file_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            data = f.read(min(READ_SIZE, remaining))
+            if not data:
+                return
+            remaining -= len(data)
+            yield data
+
+
+def serve(request, name, public=False):
+    """
+    Responds with the media file ``name``. With MEDIA_SENDFILE_BACKEND set,
+    the front proxy is told to send the file itself (X-Accel-Redirect for
+    nginx, X-Sendfile for Apache and lighttpd) and no bytes pass through
+    Python; otherwise the file is streamed here with Range and ETag support.
+    MEDIA_SENDFILE_EMULATE keeps the proxy headers but also sends the body,
+    so the handoff can be checked without a proxy in front. Files outside
+    INLINE_TYPES are sent as attachments, and nothing is sniffed.
+    """
+    storage = get_content_store()
+    path = storage.path(name)
+    stat = os.stat(path)
+    etag = etag_for(name, stat)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        if backend and not settings.MEDIA_SENDFILE_EMULATE:
+            response = HttpResponse(content_type=content_type)
+        else:
+            response = _python_response(request, path, stat.st_size, etag, content_type)
+        if backend == 'nginx':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+        elif backend == 'xsendfile':
+            response['X-Sendfile'] = path
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = 'public, max-age=86400' if public else 'private, max-age=3600'
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Content-Disposition'] = content_disposition_header(
+        content_type not in INLINE_TYPES, os.path.basename(name),
+    )
+    return response
+
+
+def _python_response(request, path, size, etag, content_type):
+    byte_range = None
+    # A Range only applies to the version named by If-Range, if any.
+    if request.headers.get('If-Range') in (None, etag):
+        byte_range = parse_range(request.headers.get('Range'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_file_range(path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -1,3 +1,58 @@
+import uuid
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class UploadSession(models.Model):
+    """
+    A resumable upload in progress. Chunks are appended to ``part_path``
+    until ``received`` reaches ``size``; finalizing moves the file onto the
+    target's file field and deletes the session.
+    """
+
+    class Target(models.TextChoices):
+        TRANSACTION_PROOF = 'TRANSACTION_PROOF', 'Transaction proof screenshot'
+        WORK_UPDATE_ATTACHMENT = 'WORK_UPDATE_ATTACHMENT', 'Work update attachment'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=30, choices=Target.choices)
+    object_id = models.PositiveBigIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='upload_session_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload of {self.filename} ({self.received}/{self.size} bytes)"
+
+    @property
+    def part_path(self):
+        return settings.UPLOAD_SESSION_ROOT / f"{self.id}.part"
+
+
+class MediaBlob(models.Model):
+    """
+    A file in ContentAddressedStorage and the number of model fields that
+    refer to it. Blobs nothing refers to are removed by collect_media_blobs.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at'], name='media_blob_gc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
@@ -0,0 +1,120 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over a composite, unique ordering such as
+    ``('-timestamp', '-id')``. The cursor carries the ordering values of the
+    last row served, so each page is a single indexed range scan no matter
+    how deep the client has paged.
+    """
+    ordering = ('-id',)
+    page_size = 25
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.after_position(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.position_of(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def after_position(self, position):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), per direction.
+        condition = Q()
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = f"{name}__lt" if descending else f"{name}__gt"
+            term = Q(**{lookup: position[index]})
+            for prior_index, (prior_name, _) in enumerate(self.fields[:index]):
+                term &= Q(**{prior_name: position[prior_index]})
+            condition |= term
+        return condition
+
+    def position_of(self, instance):
+        return [getattr(instance, name) for name, _ in self.fields]
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        raw = json.dumps(values, default=str).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
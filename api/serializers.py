@@ -0,0 +1,26 @@
+import re
+from django.conf import settings
+from rest_framework import serializers
+from .models import UploadSession
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'target', 'object_id', 'filename', 'size', 'sha256', 'offset', 'created_at']
+        read_only_fields = ['id', 'created_at']
+        extra_kwargs = {'sha256': {'required': True, 'allow_blank': False}}
+
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("The file is empty.")
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Files are limited to {settings.UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def validate_sha256(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest of the whole file.")
+        return value
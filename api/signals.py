@@ -0,0 +1,41 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from .storage import CONTENT_ADDRESSED_FIELDS, adjust_refcount
+
+
+def _stash_previous_file(field):
+    def remember_previous_file(sender, instance, update_fields=None, **kwargs):
+        instance._previous_files = getattr(instance, '_previous_files', {})
+        if instance.pk and (update_fields is None or field in update_fields):
+            instance._previous_files[field] = (
+                sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+            )
+    return remember_previous_file
+
+
+def _count_saved_file(field):
+    def count_saved_file(sender, instance, update_fields=None, **kwargs):
+        previous_files = getattr(instance, '_previous_files', {})
+        if field not in previous_files and not kwargs['created']:
+            # The field was not part of this save.
+            return
+        previous = previous_files.pop(field, None)
+        current = getattr(instance, field).name
+        if previous == current:
+            return
+        adjust_refcount(previous, -1)
+        adjust_refcount(current, 1)
+    return count_saved_file
+
+
+def _count_deleted_file(field):
+    def count_deleted_file(sender, instance, **kwargs):
+        adjust_refcount(getattr(instance, field).name, -1)
+    return count_deleted_file
+
+
+for app_label, model_name, field in CONTENT_ADDRESSED_FIELDS:
+    sender = f"{app_label}.{model_name}"
+    uid = f"media-blob-{sender}.{field}"
+    pre_save.connect(_stash_previous_file(field), sender=sender, weak=False, dispatch_uid=uid)
+    post_save.connect(_count_saved_file(field), sender=sender, weak=False, dispatch_uid=uid)
+    post_delete.connect(_count_deleted_file(field), sender=sender, weak=False, dispatch_uid=uid)
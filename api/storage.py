@@ -0,0 +1,196 @@
+import hashlib
+import os
+import tempfile
+import time
+from collections import Counter
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Count, F
+from django.utils import timezone
+
+BLOB_DIR = 'blobs'
+READ_SIZE = 64 * 1024
+
+# The file fields stored in ContentAddressedStorage, as (app label, model,
+# field). api.signals keeps MediaBlob.refcount in step with them.
+CONTENT_ADDRESSED_FIELDS = [
+    ('ecommerce', 'Transaction', 'proof_screenshot'),
+    ('communications', 'WorkUpdate', 'attachment'),
+    ('payments', 'PaymentProvider', 'logo'),
+]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under the SHA-256 of its content, sharded as
+    ``blobs/ab/cd/<hash><ext>``, and records it as a MediaBlob. Saving
+    content that is already stored is a hash and a lookup: nothing is
+    written a second time and every field refers to the same blob.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from the content in _save, never from ``name``.
+        return name
+
+    def blob_name(self, digest, extension):
+        return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def delete(self, name):
+        # A blob may back several fields, so deleting or replacing one of
+        # them must not remove the file; collect_garbage removes blobs once
+        # nothing refers to them.
+        pass
+
+    def _makedirs(self, directory):
+        if self.directory_permissions_mode is None:
+            os.makedirs(directory, exist_ok=True)
+            return
+        old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+        try:
+            os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+        finally:
+            os.umask(old_umask)
+
+    def _chmod(self, path):
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        extension = os.path.splitext(name)[1].lower()
+        if hasattr(content, 'temporary_file_path'):
+            digest, size = file_digest(content.temporary_file_path())
+            blob_name = self.blob_name(digest, extension)
+            if not self.exists(blob_name):
+                self._makedirs(os.path.dirname(self.path(blob_name)))
+                # Identical content, so losing a race to another writer is harmless.
+                file_move_safe(content.temporary_file_path(), self.path(blob_name), allow_overwrite=True)
+                self._chmod(self.path(blob_name))
+        else:
+            blob_name, size = self._write_stream(content, extension)
+
+        blob, created = MediaBlob.objects.get_or_create(name=blob_name, defaults={'size': size})
+        if not created:
+            # Holds a blob that is about to be referenced again back from
+            # the garbage collector's grace period.
+            MediaBlob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+        return blob_name
+
+    def _write_stream(self, content, extension):
+        tmp_dir = self.path(f"{BLOB_DIR}/tmp")
+        self._makedirs(tmp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    tmp.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            blob_name = self.blob_name(digest.hexdigest(), extension)
+            if self.exists(blob_name):
+                os.remove(tmp_path)
+            else:
+                self._makedirs(os.path.dirname(self.path(blob_name)))
+                os.replace(tmp_path, self.path(blob_name))
+                self._chmod(self.path(blob_name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return blob_name, size
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(data)
+            size += len(data)
+    return digest.hexdigest(), size
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f"{BLOB_DIR}/")
+
+
+def adjust_refcount(name, delta):
+    from .models import MediaBlob
+
+    if is_blob(name):
+        MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + delta, updated_at=timezone.now())
+
+
+def recount_blobs():
+    """
+    Recomputes every MediaBlob.refcount from the fields that refer to it,
+    with one GROUP BY per field. Returns the number of blobs corrected.
+    """
+    from .models import MediaBlob
+
+    counts = Counter()
+    for app_label, model_name, field in CONTENT_ADDRESSED_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        rows = (
+            model.objects.filter(**{f"{field}__startswith": f"{BLOB_DIR}/"})
+            .values(field)
+            .annotate(references=Count('pk'))
+            .order_by()
+        )
+        for row in rows:
+            counts[row[field]] += row['references']
+
+    corrected = []
+    for blob in MediaBlob.objects.only('id', 'name', 'refcount').iterator(chunk_size=2000):
+        if blob.refcount != counts.get(blob.name, 0):
+            blob.refcount = counts.get(blob.name, 0)
+            corrected.append(blob)
+    MediaBlob.objects.bulk_update(corrected, ['refcount'], batch_size=1000)
+    return len(corrected)
+
+
+def collect_garbage(grace, dry_run=False):
+    """
+    Deletes the blobs nothing has referred to for at least ``grace`` (a
+    timedelta), along with temporary files left by interrupted writes.
+    Returns (blobs, bytes) freed, or that would be freed with ``dry_run``.
+    """
+    from .derivatives import remove_derivatives
+    from .models import MediaBlob
+
+    storage = get_content_store()
+    cutoff = timezone.now() - grace
+    candidates = MediaBlob.objects.filter(refcount__lte=0, updated_at__lt=cutoff)
+    freed = freed_bytes = 0
+    for blob in candidates.only('id', 'name', 'size').iterator(chunk_size=2000):
+        # Re-check in the DELETE itself: the blob may have been saved again.
+        if not dry_run and not candidates.filter(pk=blob.pk).delete()[0]:
+            continue
+        if not dry_run:
+            # storage.delete() leaves blobs alone; this is the one place
+            # that removes them.
+            try:
+                os.remove(storage.path(blob.name))
+            except FileNotFoundError:
+                pass
+            remove_derivatives(blob.name)
+        freed += 1
+        freed_bytes += blob.size
+
+    tmp_dir = storage.path(f"{BLOB_DIR}/tmp")
+    if not dry_run and os.path.isdir(tmp_dir):
+        for entry in os.scandir(tmp_dir):
+            if entry.stat().st_mtime < time.time() - grace.total_seconds():
+                os.remove(entry.path)
+    return freed, freed_bytes
+
+
+content_store = ContentAddressedStorage()
+
+
+def get_content_store():
+    return content_store
@@ -1,3 +1,458 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from api import derivatives
+from api.derivatives import (
+    PRIVATE_TOKEN_MAX_AGE, VARIANTS, derivative_name, derivative_token, derivative_urls, read_derivative_token,
+)
+from api.models import MediaBlob, UploadSession
+from api.storage import BLOB_DIR, get_content_store
+from api.uploads import UploadError, UploadedPart, finish_upload, write_chunk
+from ecommerce.models import Order, Transaction
+from payments.models import PaymentProvider
+from services.models import Service, Plan
+from users.models import User
 
-# Create your tests here.
+MEDIA_ROOT = tempfile.mkdtemp()
+UPLOAD_SESSION_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SENDFILE_BACKEND=None, MEDIA_SENDFILE_EMULATE=False)
+class ProtectedMediaTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        self.other = User.objects.create_user(email="other@example.com", password="x")
+        self.employee = User.objects.create_user(email="employee@example.com", password="x", role=User.Role.EMPLOYEE)
+        order = Order.objects.create(user=self.customer, plan=plan)
+        self.transaction = Transaction.objects.create(order=order, amount="100.00")
+        self.body = b"0123456789" * 100
+        self.transaction.proof_screenshot.save("receipt.png", ContentFile(self.body), save=True)
+        self.url = self.transaction.proof_screenshot.url
+        self.client = APIClient()
+
+    def get(self, user=None, url=None, **headers):
+        if user:
+            self.client.force_authenticate(user)
+        return self.client.get(url or self.url, headers=headers)
+
+    def test_owner_and_staff_can_read_a_proof(self):
+        for user in (self.customer, self.employee):
+            response = self.get(user)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b"".join(response.streaming_content), self.body)
+            self.assertEqual(response["Accept-Ranges"], "bytes")
+            self.assertIn("private", response["Cache-Control"])
+
+    def test_proofs_are_hidden_from_other_users(self):
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get(self.other).status_code, 404)
+
+    def test_range_and_conditional_requests(self):
+        response = self.get(self.customer, Range="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.body)}")
+        self.assertEqual(b"".join(response.streaming_content), self.body[10:20])
+
+        self.assertEqual(self.get(self.customer, Range=f"bytes={len(self.body)}-").status_code, 416)
+
+        etag = self.get(self.customer)["ETag"]
+        response = self.get(self.customer, If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_nginx_handoff_sends_no_body(self):
+        response = self.get(self.customer)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/" + self.transaction.proof_screenshot.name)
+        self.assertEqual(response.content, b"")
+        self.assertIn("ETag", response)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='xsendfile', MEDIA_SENDFILE_EMULATE=True)
+    def test_emulated_handoff_keeps_the_headers_and_the_body(self):
+        response = self.get(self.customer)
+        self.assertEqual(response["X-Sendfile"], self.transaction.proof_screenshot.path)
+        self.assertEqual(b"".join(response.streaming_content), self.body)
+
+    def test_only_raster_images_are_shown_inline(self):
+        self.assertTrue(self.get(self.customer)["Content-Disposition"].startswith("inline"))
+        for filename in ("page.html", "drawing.svg", "notes.txt"):
+            self.transaction.proof_screenshot.save(filename, ContentFile(b"<script>alert(1)</script>"), save=True)
+            response = self.get(self.customer, self.transaction.proof_screenshot.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response["Content-Disposition"].startswith("attachment"))
+            self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+    def test_directories_and_absolute_names_are_not_found(self):
+        for url in ("/media/blobs/", "/media/" + os.path.dirname(self.transaction.proof_screenshot.name) + "/", "/media//etc/passwd"):
+            self.assertEqual(self.get(self.employee, url).status_code, 404)
+
+    def test_provider_logos_are_public(self):
+        provider = PaymentProvider.objects.create(title="Bank", provider_name_code="bank")
+        provider.logo.save("logo.png", ContentFile(b"logo"), save=True)
+        response = self.get(url=provider.logo.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, UPLOAD_SESSION_ROOT=Path(UPLOAD_SESSION_ROOT))
+class ResumableUploadTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(UPLOAD_SESSION_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        self.other = User.objects.create_user(email="other@example.com", password="x")
+        self.order = Order.objects.create(user=self.customer, plan=plan)
+        self.transaction = Transaction.objects.create(order=self.order, amount="100.00")
+        self.body = bytes(range(256)) * 4
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def start(self, sha256=None, target=UploadSession.Target.TRANSACTION_PROOF, object_id=None):
+        return self.client.post("/api/uploads/", {
+            "target": target,
+            "object_id": object_id or self.transaction.id,
+            "filename": "receipt.png",
+            "size": len(self.body),
+            "sha256": sha256 or hashlib.sha256(self.body).hexdigest(),
+        }, format="json")
+
+    def put(self, session_id, start, end, checksum=None):
+        headers = {"Content-Range": f"bytes {start}-{end}/{len(self.body)}"}
+        if checksum:
+            headers["X-Chunk-SHA256"] = checksum
+        return self.client.put(
+            f"/api/uploads/{session_id}/", self.body[start:end + 1],
+            content_type="application/octet-stream", headers=headers,
+        )
+
+    def finalize(self, session_id):
+        return self.client.post(f"/api/uploads/{session_id}/finalize/")
+
+    def test_chunks_are_assembled_and_attached(self):
+        session_id = self.start().data["id"]
+
+        self.assertEqual(self.put(session_id, 0, 499).data["offset"], 500)
+        self.assertEqual(self.put(session_id, 500, 1023, hashlib.sha256(self.body[500:]).hexdigest()).data["offset"], 1024)
+        response = self.finalize(session_id)
+
+        self.assertEqual(response.status_code, 200)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, Transaction.Status.VERIFYING)
+        with self.transaction.proof_screenshot.open("rb") as proof:
+            self.assertEqual(proof.read(), self.body)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_out_of_order_and_overlapping_chunks_conflict(self):
+        session_id = self.start().data["id"]
+
+        response = self.put(session_id, 100, 199)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 0)
+
+        self.put(session_id, 0, 99)
+        response = self.put(session_id, 50, 149)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 100)
+
+    def test_resume_after_a_cut_off_chunk(self):
+        session_id = self.start().data["id"]
+        session = UploadSession.objects.get(pk=session_id)
+
+        # The connection drops halfway through the first chunk.
+        self.assertEqual(write_chunk(session, BytesIO(self.body[:300]), f"bytes 0-599/{len(self.body)}", 600), 300)
+
+        self.assertEqual(self.client.get(f"/api/uploads/{session_id}/").data["offset"], 300)
+        self.assertEqual(self.put(session_id, 300, 1023).data["offset"], 1024)
+        self.assertEqual(self.finalize(session_id).status_code, 200)
+
+    def test_a_chunk_with_a_bad_checksum_is_not_counted(self):
+        session_id = self.start().data["id"]
+
+        response = self.put(session_id, 0, 499, "0" * 64)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["offset"], 0)
+        self.assertEqual(self.put(session_id, 0, 1023).data["offset"], 1024)
+
+    def test_a_file_with_a_bad_digest_is_discarded(self):
+        session_id = self.start(sha256="0" * 64).data["id"]
+        part_path = UploadSession.objects.get(pk=session_id).part_path
+        self.assertEqual(self.finalize(session_id).status_code, 409)
+        self.put(session_id, 0, 1023)
+
+        response = self.finalize(session_id)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(part_path.exists())
+        self.assertEqual(self.client.get(f"/api/uploads/{session_id}/").status_code, 404)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, Transaction.Status.PENDING)
+
+    def test_overlapping_finalize_calls_conflict(self):
+        session_id = self.start().data["id"]
+        self.put(session_id, 0, 1023)
+        stale = UploadSession.objects.get(pk=session_id)
+
+        self.assertEqual(self.finalize(session_id).status_code, 200)
+
+        # A retry that loaded the session before the first call claimed it.
+        with self.assertRaises(UploadError) as error:
+            finish_upload(stale, self.customer)
+        self.assertEqual(error.exception.status, 409)
+
+    def test_a_missing_part_file_conflicts(self):
+        session_id = self.start().data["id"]
+        self.put(session_id, 0, 1023)
+        UploadSession.objects.get(pk=session_id).part_path.unlink()
+
+        self.assertEqual(self.finalize(session_id).status_code, 409)
+
+    def test_a_refused_target_keeps_the_session(self):
+        session_id = self.start().data["id"]
+        self.put(session_id, 0, 1023)
+        Transaction.objects.filter(pk=self.transaction.pk).update(status=Transaction.Status.SUCCESS)
+
+        self.assertEqual(self.finalize(session_id).status_code, 400)
+
+        Transaction.objects.filter(pk=self.transaction.pk).update(status=Transaction.Status.PENDING)
+        self.assertEqual(self.finalize(session_id).status_code, 200)
+
+    def test_access_checks(self):
+        session_id = self.start().data["id"]
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f"/api/uploads/{session_id}/").status_code, 404)
+        self.assertEqual(self.put(session_id, 0, 1023).status_code, 404)
+        self.assertEqual(self.finalize(session_id).status_code, 404)
+        self.assertEqual(self.client.delete(f"/api/uploads/{session_id}/").status_code, 404)
+        self.assertEqual(self.start().status_code, 403)
+        self.assertEqual(self.start(target=UploadSession.Target.WORK_UPDATE_ATTACHMENT).status_code, 403)
+        self.assertEqual(self.start(object_id=self.transaction.id + 100).status_code, 404)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(f"/api/uploads/{session_id}/").status_code, 401)
+
+    @override_settings(UPLOAD_MAX_OPEN_SESSIONS=2)
+    def test_open_sessions_are_limited_per_user(self):
+        first = self.start().data["id"]
+        self.start()
+
+        response = self.start()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(UploadSession.objects.filter(user=self.customer).count(), 2)
+
+        self.client.delete(f"/api/uploads/{first}/")
+        self.assertEqual(self.start().status_code, 201)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        customer = User.objects.create_user(email="customer@example.com", password="x")
+        order = Order.objects.create(user=customer, plan=plan)
+        self.first = Transaction.objects.create(order=order, amount="100.00")
+        self.second = Transaction.objects.create(order=order, amount="100.00")
+
+    def attach(self, transaction, body, name="receipt.png"):
+        transaction.proof_screenshot.save(name, ContentFile(body), save=True)
+        return transaction.proof_screenshot.name
+
+    def temporary_file(self, body):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        return path
+
+    def refcount(self, name):
+        return MediaBlob.objects.get(name=name).refcount
+
+    def test_a_duplicate_upload_writes_nothing(self):
+        name = self.attach(self.first, b"same bytes")
+        before = os.stat(get_content_store().path(name))
+
+        with open(self.temporary_file(b"same bytes"), "rb") as f:
+            self.second.proof_screenshot.save("copy.png", UploadedPart(f, name="copy.png"), save=True)
+        self.assertEqual(self.attach(self.second, b"same bytes", "again.png"), name)
+
+        after = os.stat(get_content_store().path(name))
+        self.assertEqual((after.st_ino, after.st_mtime_ns), (before.st_ino, before.st_mtime_ns))
+        self.assertEqual(self.second.proof_screenshot.name, name)
+        self.assertEqual(MediaBlob.objects.count(), 1)
+        self.assertEqual(os.listdir(get_content_store().path(f"{BLOB_DIR}/tmp")), [])
+
+    @override_settings(FILE_UPLOAD_PERMISSIONS=0o640, FILE_UPLOAD_DIRECTORY_PERMISSIONS=0o750)
+    def test_moved_files_get_the_configured_permissions(self):
+        with open(self.temporary_file(b"moved bytes"), "rb") as f:
+            self.first.proof_screenshot.save("moved.png", UploadedPart(f, name="moved.png"), save=True)
+
+        path = get_content_store().path(self.first.proof_screenshot.name)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o640)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode), 0o750)
+
+    def test_refcounts_follow_replace_and_delete(self):
+        old = self.attach(self.first, b"old")
+        self.attach(self.second, b"old")
+        self.assertEqual(self.refcount(old), 2)
+
+        new = self.attach(self.first, b"new")
+        self.assertEqual((self.refcount(old), self.refcount(new)), (1, 1))
+
+        # Deleting the field's file must not remove a blob another row uses.
+        self.second.proof_screenshot.delete(save=True)
+        self.first.delete()
+        self.assertEqual((self.refcount(old), self.refcount(new)), (0, 0))
+        self.assertTrue(get_content_store().exists(old))
+
+    def test_garbage_collection_removes_only_unreferenced_blobs(self):
+        kept = self.attach(self.first, b"kept")
+        orphan = self.attach(self.second, b"orphan")
+        recent = self.attach(self.second, b"recent")
+        self.second.delete()
+        MediaBlob.objects.filter(name__in=[kept, orphan]).update(updated_at=timezone.now() - timedelta(days=2))
+
+        call_command("collect_media_blobs", stdout=StringIO())
+
+        store = get_content_store()
+        self.assertEqual(set(MediaBlob.objects.values_list("name", flat=True)), {kept, recent})
+        self.assertTrue(store.exists(kept))
+        self.assertTrue(store.exists(recent))
+        self.assertFalse(store.exists(orphan))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SENDFILE_BACKEND=None, MEDIA_SENDFILE_EMULATE=False)
+class ImageDerivativeTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        order = Order.objects.create(user=self.customer, plan=plan)
+        self.transaction = Transaction.objects.create(order=order, amount="100.00")
+        image = BytesIO()
+        Image.new("RGB", (1600, 800), "navy").save(image, "PNG")
+        self.transaction.proof_screenshot.save("receipt.png", ContentFile(image.getvalue()), save=True)
+        self.name = self.transaction.proof_screenshot.name
+        self.client = APIClient()
+
+    def variants(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(f"/api/transactions/{self.transaction.id}/")
+        self.client.force_authenticate(None)
+        return response.data["proof_screenshot_variants"]
+
+    def test_a_variant_is_rendered_on_first_request(self):
+        urls = self.variants()
+        self.assertEqual(set(urls), set(VARIANTS))
+        for variant, url in urls.items():
+            token = url.removeprefix("http://testserver/api/images/").removesuffix("/")
+            self.assertEqual(read_derivative_token(token), (self.name, variant, self.customer.pk))
+
+        # An <img> sends no Bearer header; the signed URL is enough.
+        response = self.client.get(urls["thumb_webp"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("private", response["Cache-Control"])
+        with Image.open(BytesIO(b"".join(response.streaming_content))) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ("WEBP", (320, 160)))
+        self.assertTrue(get_content_store().exists(derivative_name(self.name, "thumb_webp")))
+
+    def test_a_rendered_variant_keeps_its_signed_url(self):
+        self.client.get(self.variants()["thumb"])
+
+        with mock.patch("api.derivatives._get_pool") as get_pool:
+            response = self.client.get(self.variants()["thumb"])
+
+        self.assertEqual(response.status_code, 200)
+        get_pool.assert_not_called()
+
+    def url(self, user=None, name=None, variant="thumb"):
+        return f"/api/images/{derivative_token(name or self.name, variant, user or self.customer)}/"
+
+    def test_bad_and_expired_tokens_are_unknown(self):
+        self.assertEqual(self.client.get("/api/images/garbage/").status_code, 404)
+        with mock.patch("time.time", return_value=time.time() - PRIVATE_TOKEN_MAX_AGE - 60):
+            url = self.url()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_private_urls_follow_the_readers_access(self):
+        other = User.objects.create_user(email="other@example.com", password="x")
+        self.assertEqual(self.client.get(self.url(other)).status_code, 404)
+        # Public, unbound tokens are only honoured for provider logos.
+        self.assertEqual(self.client.get(f"/api/images/{derivative_token(self.name, 'thumb')}/").status_code, 404)
+
+        url = self.url()
+        User.objects.filter(pk=self.customer.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_logo_urls_are_public_and_long_lived(self):
+        provider = PaymentProvider.objects.create(title="Bank", provider_name_code="bank")
+        image = BytesIO()
+        Image.new("RGB", (64, 64), "teal").save(image, "PNG")
+        provider.logo.save("logo.png", ContentFile(image.getvalue()), save=True)
+
+        with mock.patch("time.time", return_value=time.time() - PRIVATE_TOKEN_MAX_AGE - 60):
+            url = self.client.get("/api/payment-providers/").data[0]["logo_variants"]["thumb"]
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+
+    def test_anonymous_readers_get_no_private_urls(self):
+        self.assertIsNone(derivative_urls(self.transaction.proof_screenshot))
+
+    def test_oversized_images_are_refused(self):
+        with mock.patch("api.views.ensure_derivative", side_effect=Image.DecompressionBombError("too big")):
+            response = self.client.get(self.url())
+        self.assertEqual(response.status_code, 422)
+
+    def test_a_broken_pool_is_replaced(self):
+        broken = mock.Mock(submit=mock.Mock(side_effect=BrokenProcessPool("worker died")))
+        with mock.patch("api.derivatives._pool", broken):
+            response = self.client.get(self.url())
+            self.assertEqual(response.status_code, 503)
+            self.assertIsNone(derivatives._pool)
+        broken.shutdown.assert_called_once()
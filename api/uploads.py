@@ -0,0 +1,209 @@
+import hashlib
+import os
+import re
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from users.models import User
+from .models import UploadSession
+
+READ_SIZE = 64 * 1024
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class UploadedPart(File):
+    """
+    The finished part file. Exposing ``temporary_file_path`` lets
+    FileSystemStorage move it into MEDIA_ROOT instead of copying it.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _proof_transaction(user, object_id):
+    from ecommerce.models import Transaction
+
+    transaction = Transaction.objects.select_related('order').filter(pk=object_id).first()
+    if transaction is None:
+        raise UploadError("Transaction not found.", status=404)
+    if transaction.order.user_id != user.id:
+        raise UploadError("You do not have permission to access this transaction.", status=403)
+    if transaction.status not in [Transaction.Status.PENDING, Transaction.Status.FAILED]:
+        raise UploadError("Cannot submit proof for this transaction status.")
+    return transaction
+
+
+def _attach_proof(transaction, name, content):
+    transaction.proof_screenshot.save(name, content, save=False)
+    transaction.status = transaction.Status.VERIFYING
+    transaction.save()
+
+
+def _work_update(user, object_id):
+    from communications.models import WorkUpdate
+
+    if user.role not in [User.Role.EMPLOYEE, User.Role.OWNER]:
+        raise UploadError("You do not have permission to perform this action.", status=403)
+    work_update = WorkUpdate.objects.select_related('order').filter(pk=object_id).first()
+    if work_update is None:
+        raise UploadError("Work update not found.", status=404)
+    return work_update
+
+
+def _attach_work_update(work_update, name, content):
+    work_update.attachment.save(name, content, save=False)
+    work_update.save(update_fields=['attachment'])
+
+
+# target -> (look up the object and check access, store the file on it)
+TARGETS = {
+    UploadSession.Target.TRANSACTION_PROOF: (_proof_transaction, _attach_proof),
+    UploadSession.Target.WORK_UPDATE_ATTACHMENT: (_work_update, _attach_work_update),
+}
+
+
+def start_upload(user, target, object_id, filename, size, sha256):
+    filename = os.path.basename(filename.replace('\\', '/'))
+    if not filename:
+        raise UploadError("A file name is required.")
+    lookup, _ = TARGETS[target]
+    lookup(user, object_id)
+    # The transaction holds the write lock, so concurrent starts cannot
+    # both pass the count.
+    with transaction.atomic():
+        if UploadSession.objects.filter(user=user).count() >= settings.UPLOAD_MAX_OPEN_SESSIONS:
+            raise UploadError("Too many uploads in progress; finish or cancel one first.", status=429)
+        session = UploadSession.objects.create(
+            user=user,
+            target=target,
+            object_id=object_id,
+            filename=filename,
+            size=size,
+            sha256=sha256.lower(),
+        )
+    session.part_path.parent.mkdir(parents=True, exist_ok=True)
+    session.part_path.touch()
+    return session
+
+
+def parse_content_range(header):
+    match = _CONTENT_RANGE.match(header or '')
+    if not match:
+        raise UploadError("A 'Content-Range: bytes <start>-<end>/<size>' header is required.")
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError("Invalid Content-Range.")
+    return start, end, total
+
+
+def write_chunk(session, stream, content_range, content_length, chunk_sha256=None):
+    """
+    Streams one chunk from ``stream`` into the session's part file at its
+    offset and returns the new offset. Only ``READ_SIZE`` bytes are held at
+    a time. Chunks must arrive in order; a retry of a chunk that was cut
+    off resumes from the last byte stored, unless the client asked for a
+    chunk checksum, in which case the whole chunk is needed again.
+    """
+    start, end, total = parse_content_range(content_range)
+    if total != session.size or end >= session.size:
+        raise UploadError("Content-Range does not match the upload size.")
+    if start != session.received:
+        raise UploadError(f"Expected the chunk at offset {session.received}.", status=409)
+    length = end - start + 1
+    if content_length != length:
+        raise UploadError("Content-Length does not match Content-Range.")
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(session.part_path, 'r+b') as part:
+        part.seek(start)
+        while written < length and stream is not None:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            part.write(data)
+            digest.update(data)
+            written += len(data)
+
+    if chunk_sha256:
+        if written < length:
+            raise UploadError("The chunk was incomplete; send it again.")
+        if digest.hexdigest() != chunk_sha256.lower():
+            raise UploadError("The chunk checksum does not match; send it again.")
+
+    # Only one request can move the offset on from ``start``.
+    advanced = UploadSession.objects.filter(pk=session.pk, received=start).update(
+        received=start + written,
+        updated_at=timezone.now(),
+    )
+    if not advanced:
+        raise UploadError("Another request is uploading this chunk.", status=409)
+    session.received = start + written
+    return session.received
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _remove_part(session):
+    try:
+        os.remove(session.part_path)
+    except FileNotFoundError:
+        pass
+
+
+def discard_upload(session):
+    _remove_part(session)
+    session.delete()
+
+
+def finish_upload(session, user):
+    """
+    Checks the assembled file against the declared SHA-256 and attaches it
+    to the target. Returns the updated target object.
+
+    The session row is deleted up front as a claim, so a finalize retried
+    while the first is still running answers 409 instead of hashing or
+    attaching the file a second time.
+    """
+    if session.received != session.size:
+        raise UploadError(f"The upload is incomplete: {session.received} of {session.size} bytes received.", status=409)
+    if not UploadSession.objects.filter(pk=session.pk, received=session.size).delete()[0]:
+        raise UploadError("The upload is already being finalized.", status=409)
+    try:
+        digest = file_sha256(session.part_path)
+    except FileNotFoundError:
+        raise UploadError("The upload is already being finalized.", status=409)
+    if digest != session.sha256:
+        # The bytes on disk cannot be trusted any more; start over.
+        _remove_part(session)
+        raise UploadError("The file checksum does not match; the upload has been discarded.")
+
+    lookup, attach = TARGETS[session.target]
+    try:
+        with transaction.atomic():
+            target = lookup(user, session.object_id)
+            with open(session.part_path, 'rb') as part:
+                attach(target, session.filename, UploadedPart(part, name=session.filename))
+    except UploadError:
+        # The file is intact; give the session back so it can be retried.
+        session.save(force_insert=True)
+        raise
+    # Left behind when the storage already held the same content.
+    _remove_part(session)
+    return target
@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import ImageDerivativeView, UploadFinalizeView, UploadSessionCreateView, UploadSessionView
+
+urlpatterns = [
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/<uuid:pk>/', UploadSessionView.as_view(), name='upload-session'),
+    path('uploads/<uuid:pk>/finalize/', UploadFinalizeView.as_view(), name='upload-session-finalize'),
+    path('images/<str:token>/', ImageDerivativeView.as_view(), name='image-derivative'),
+]
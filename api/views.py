@@ -1,3 +1,157 @@
-from django.shortcuts import render
+import os
+from concurrent.futures import TimeoutError as RenderTimeout
+from concurrent.futures.process import BrokenProcessPool
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.shortcuts import get_object_or_404
+from PIL import Image, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from users.models import User
+from .derivatives import ensure_derivative, read_derivative_token
+from .media import can_read, public_file, serve, source_file
+from .models import UploadSession
+from .storage import get_content_store
+from .serializers import UploadSessionSerializer
+from .uploads import UploadError, discard_upload, finish_upload, start_upload, write_chunk
 
-# Create your views here.
+
+class UploadSessionCreateView(APIView):
+    """
+    Starts a resumable upload of a transfer proof or a work-update
+    attachment. Send the file with PUTs to the session URL, each carrying a
+    ``Content-Range`` (and optionally an ``X-Chunk-SHA256``), then POST to
+    ``finalize/``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = start_upload(request.user, **serializer.validated_data)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=e.status)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionMixin:
+    permission_classes = [IsAuthenticated]
+
+    def get_session(self, request, pk):
+        return get_object_or_404(UploadSession, pk=pk, user=request.user)
+
+
+class UploadSessionView(UploadSessionMixin, APIView):
+
+    def get(self, request, pk):
+        """The number of bytes stored so far, to resume from."""
+        return Response(UploadSessionSerializer(self.get_session(request, pk)).data)
+
+    def put(self, request, pk):
+        session = self.get_session(request, pk)
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        try:
+            # Read the raw body a block at a time; request.data would buffer it.
+            offset = write_chunk(
+                session,
+                request.stream,
+                request.headers.get('Content-Range'),
+                content_length,
+                chunk_sha256=request.headers.get('X-Chunk-SHA256'),
+            )
+        except UploadError as e:
+            return Response({"error": str(e), "offset": session.received}, status=e.status)
+        return Response({"offset": offset, "size": session.size})
+
+    def delete(self, request, pk):
+        discard_upload(self.get_session(request, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadFinalizeView(UploadSessionMixin, APIView):
+
+    def post(self, request, pk):
+        session = self.get_session(request, pk)
+        try:
+            target = finish_upload(session, request.user)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=e.status)
+        return Response(self.serialize_target(session.target, target, request))
+
+    def serialize_target(self, kind, target, request):
+        from communications.serializers import WorkUpdateSerializer
+        from ecommerce.serializers import TransactionSerializer
+
+        if kind == UploadSession.Target.TRANSACTION_PROOF:
+            return TransactionSerializer(target, context={'request': request}).data
+        return WorkUpdateSerializer(target, context={'request': request}).data
+
+
+class ImageDerivativeView(APIView):
+    """
+    Serves a thumbnail or WebP variant, rendering it on the first request.
+    The signed token names the source image and stands in for the Bearer
+    header an ``<img>`` cannot send, so only URLs handed out by a serializer
+    are accepted. A private image's token names the reader it was issued to,
+    whose access is checked again as for the file itself.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, token):
+        try:
+            name, variant, user_id = read_derivative_token(token)
+        except signing.BadSignature:
+            return Response({"error": "Unknown image."}, status=status.HTTP_404_NOT_FOUND)
+        storage = get_content_store()
+        if not storage.exists(name):
+            return Response({"error": "Unknown image."}, status=status.HTTP_404_NOT_FOUND)
+        if user_id is None:
+            allowed = public_file(name)
+        else:
+            reader = User.objects.filter(pk=user_id, is_active=True).first()
+            allowed = reader is not None and can_read(reader, name)
+        if not allowed:
+            return Response({"error": "Unknown image."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            derivative = ensure_derivative(name, variant)
+        except RenderTimeout:
+            return Response({"error": "The image is still being prepared."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except BrokenProcessPool:
+            return Response({"error": "The image could not be prepared; try again."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            return Response({"error": "The file is not a supported image."}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return serve(request, derivative, public=user_id is None)
+
+
+class ProtectedMediaView(APIView):
+    """
+    Serves MEDIA_ROOT after checking, once, that the user may read the file
+    (see api.media.can_read). Unknown and forbidden files both answer 404
+    so that file names cannot be probed.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, name):
+        storage = get_content_store()
+        try:
+            # Directories exist too; only regular files are served.
+            found = '..' not in name.split('/') and os.path.isfile(storage.path(name))
+        except SuspiciousFileOperation:
+            # An absolute name, which resolves outside MEDIA_ROOT.
+            found = False
+        if not found:
+            return Response({"error": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        source = source_file(name)
+        public = source is not None and public_file(source)
+        if source is None or not can_read(request.user, source, public=public):
+            if not request.user.is_authenticated:
+                return Response({"error": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+            return Response({"error": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return serve(request, name, public=public)
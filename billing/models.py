@@ -14,4 +14,12 @@ class Milestone(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
 
     def __str__(self):
-        return f"{self.title} for Order #{self.order.id}"
\ No newline at end of file
+        return f"{self.title} for Order #{self.order.id}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a milestone moved to another order refreshes the old
+        # order's totals as well.
+        instance._loaded_order_id = instance.__dict__.get('order_id')
+        return instance
@@ -1,9 +1,19 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from ecommerce.financials import refresh_financials
+from ecommerce.order_status import schedule_status_refresh
 from .models import Milestone
 
 @receiver(post_save, sender=Milestone)
 def update_order_status_on_milestone_change(sender, instance, **kwargs):
 
-    if instance.order:
-        instance.order.update_status_based_on_milestones()
\ No newline at end of file
+    if instance.order_id:
+        schedule_status_refresh(instance.order_id)
+
+
+@receiver(post_save, sender=Milestone)
+@receiver(post_delete, sender=Milestone)
+def update_order_totals_on_milestone_change(sender, instance, **kwargs):
+    # A milestone moved to another order changes the totals of both.
+    refresh_financials({instance.order_id, getattr(instance, '_loaded_order_id', None)})
+    instance._loaded_order_id = instance.order_id
@@ -1,3 +1,100 @@
+from decimal import Decimal
+from unittest import mock
+from django.db import transaction
 from django.test import TestCase
+from rest_framework.test import APIClient
+from billing.models import Milestone
+from ecommerce import order_status
+from ecommerce.models import Order, Transaction
+from payments.models import PaymentProvider
+from services.models import Service, Plan
+from users.models import User
 
-# Create your tests here.
+
+class MilestoneStatusRefreshTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        self.employee = User.objects.create_user(email="employee@example.com", password="x", role=User.Role.EMPLOYEE)
+        self.order = Order.objects.create(user=self.customer, plan=plan, status=Order.Status.ACTIVE)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.milestone = Milestone.objects.create(order=self.order, title="Deposit", amount="100.00")
+        PaymentProvider.objects.create(
+            title="Bank", provider_name_code="bank", type=PaymentProvider.ProviderType.BANK_TRANSFER,
+            min_amount="20.00", max_amount="2000.00",
+        )
+        self.client = APIClient()
+
+    def refreshes(self):
+        return mock.patch.object(order_status._status_refresh, "func", wraps=order_status.refresh_statuses)
+
+    def pay(self, amount):
+        self.client.force_authenticate(self.customer)
+        return self.client.post(
+            f"/api/milestones/{self.milestone.id}/initiate_payment/",
+            {"provider_code": "bank", "custom_amount": amount},
+            format="json",
+        )
+
+    def test_partial_payment_refreshes_the_status_once(self):
+        with self.refreshes() as refresh, self.captureOnCommitCallbacks(execute=True):
+            response = self.pay("40.00")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(
+            sorted(Milestone.objects.filter(order=self.order).values_list("amount", flat=True)),
+            [Decimal("40.00"), Decimal("60.00")],
+        )
+        self.assertEqual(Transaction.objects.get().amount, Decimal("40.00"))
+
+    def test_rejected_amount_leaves_the_milestone_whole(self):
+        response = self.pay("10.00")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(Milestone.objects.filter(order=self.order).values_list("amount", flat=True)), [Decimal("100.00")])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_milestone_create_refreshes_the_status_once(self):
+        self.client.force_authenticate(self.employee)
+        with self.refreshes() as refresh, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/milestones/", {"order": self.order.id, "title": "Extra", "amount": "50.00"}, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(refresh.call_count, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.AWAITING_PAYMENT)
+
+    def test_one_refresh_per_transaction(self):
+        with self.refreshes() as refresh, self.captureOnCommitCallbacks(execute=True):
+            for index in range(5):
+                Milestone.objects.create(order=self.order, title=f"Part {index}", amount="10.00")
+
+        refresh.assert_called_once_with({self.order.id})
+
+    def test_a_rolled_back_transaction_does_not_block_later_refreshes(self):
+        try:
+            with transaction.atomic():
+                Milestone.objects.create(order=self.order, title="Discarded", amount="10.00")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        with self.refreshes() as refresh, self.captureOnCommitCallbacks(execute=True):
+            Milestone.objects.create(order=self.order, title="Kept", amount="10.00")
+
+        refresh.assert_called_once_with({self.order.id})
+
+    def test_rolled_back_savepoint_does_not_lose_later_changes(self):
+        with self.refreshes() as refresh, self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Milestone.objects.create(order=self.order, title="Discarded", amount="10.00")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            Milestone.objects.create(order=self.order, title="Kept", amount="10.00")
+
+        refresh.assert_called_once_with({self.order.id})
@@ -4,6 +4,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.conf import settings
+from django.db import transaction
 import requests
 from decimal import Decimal
 import urllib.parse
@@ -33,6 +34,9 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
         return [IsEmployeeOrOwner()]
 
+    # Milestone writes run in one transaction each, so the order status
+    # refresh scheduled by billing.signals runs once, on commit.
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
         if response.status_code == status.HTTP_201_CREATED:
@@ -46,6 +50,14 @@ class MilestoneViewSet(viewsets.ModelViewSet):
                 pass
         return response
 
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @transaction.atomic
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
     @action(detail=True, methods=['post'])
     def initiate_payment(self, request, pk=None):
         milestone = self.get_object()
@@ -79,12 +91,27 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             
             if custom_amount > milestone.amount:
                 return Response({"error": "You cannot pay more than the milestone amount."}, status=status.HTTP_400_BAD_REQUEST)
+            payment_amount = custom_amount
+
+        # Checked before anything is written, so a rejected amount leaves the milestone whole.
+        if payment_amount < provider.min_amount:
+            return Response({"error": f"Payment amount ${payment_amount} is below the minimum of ${provider.min_amount} for this provider."}, status=status.HTTP_400_BAD_REQUEST)
+        if payment_amount > provider.max_amount:
+            return Response({"error": f"Payment amount ${payment_amount} exceeds the maximum of ${provider.max_amount} for this provider."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fee_percentage = provider.processing_fee_percentage / Decimal('100')
+        processing_fee = payment_amount * fee_percentage
+        final_charge_amount = payment_amount + processing_fee
 
-            if custom_amount < milestone.amount:
-                remaining_amount = milestone.amount - custom_amount
+        # One transaction for the split and the payment record, so the order
+        # status is recomputed once, on commit. The gateway call below stays
+        # outside it.
+        with transaction.atomic():
+            if payment_amount < milestone.amount:
+                remaining_amount = milestone.amount - payment_amount
                 original_title = milestone.title
                 
-                milestone.amount = custom_amount
+                milestone.amount = payment_amount
                 milestone.title = f"{original_title} (Partial Payment)"
                 milestone.save()
                 
@@ -94,40 +121,29 @@ class MilestoneViewSet(viewsets.ModelViewSet):
                     amount=remaining_amount,
                     status=Milestone.Status.PENDING
                 )
-                payment_amount = custom_amount
 
-        if payment_amount < provider.min_amount:
-            return Response({"error": f"Payment amount ${payment_amount} is below the minimum of ${provider.min_amount} for this provider."}, status=status.HTTP_400_BAD_REQUEST)
-        if payment_amount > provider.max_amount:
-            return Response({"error": f"Payment amount ${payment_amount} exceeds the maximum of ${provider.max_amount} for this provider."}, status=status.HTTP_400_BAD_REQUEST)
-
-        fee_percentage = provider.processing_fee_percentage / Decimal('100')
-        processing_fee = payment_amount * fee_percentage
-        final_charge_amount = payment_amount + processing_fee
-        
-        existing_transaction = Transaction.objects.filter(
-            milestone=milestone, 
-            status=Transaction.Status.PENDING
-        ).first()
-
-        if existing_transaction:
-            transaction = existing_transaction
-            transaction.amount = final_charge_amount
-            transaction.provider_name = provider.title
-            transaction.save()
-        else:
-            transaction = Transaction.objects.create(
-                order=milestone.order,
-                milestone=milestone,
-                amount=final_charge_amount,
-                status=Transaction.Status.PENDING,
-                provider_name=provider.title 
-            )
+            payment = Transaction.objects.filter(
+                milestone=milestone, 
+                status=Transaction.Status.PENDING
+            ).first()
+
+            if payment:
+                payment.amount = final_charge_amount
+                payment.provider_name = provider.title
+                payment.save()
+            else:
+                payment = Transaction.objects.create(
+                    order=milestone.order,
+                    milestone=milestone,
+                    amount=final_charge_amount,
+                    status=Transaction.Status.PENDING,
+                    provider_name=provider.title 
+                )
 
         if provider.type == PaymentProvider.ProviderType.BANK_TRANSFER:
             return Response({
                 'payment_type': 'MANUAL',
-                'transaction_id': transaction.id,
+                'transaction_id': payment.id,
                 'bank_details': provider.bank_details, 
                 'milestone_amount': payment_amount,
                 'processing_fee': processing_fee,
@@ -135,7 +151,7 @@ class MilestoneViewSet(viewsets.ModelViewSet):
                 'message': "Please transfer the amount manually using the provided bank details."
             }, status=status.HTTP_200_OK)
         
-        callback_url_with_id = f"{settings.RISKPAY_CALLBACK_URL}?transaction_id={transaction.id}"
+        callback_url_with_id = f"{settings.RISKPAY_CALLBACK_URL}?transaction_id={payment.id}"
         params = {'address': settings.RISKPAY_MERCHANT_WALLET_ADDRESS, 'callback': callback_url_with_id}
         
         try:
@@ -143,14 +159,14 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             response.raise_for_status() 
             riskpay_data = response.json()
         except Exception as e:
-            transaction.status = Transaction.Status.FAILED
-            transaction.save()
+            payment.status = Transaction.Status.FAILED
+            payment.save()
             return Response({"error": f"Could not connect to payment gateway: {str(e)}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-        transaction.gateway_address_in = riskpay_data.get('address_in')
-        transaction.gateway_polygon_address_in = riskpay_data.get('polygon_address_in')
-        transaction.gateway_ipn_token = riskpay_data.get('ipn_token')
-        transaction.save()
+        payment.gateway_address_in = riskpay_data.get('address_in')
+        payment.gateway_polygon_address_in = riskpay_data.get('polygon_address_in')
+        payment.gateway_ipn_token = riskpay_data.get('ipn_token')
+        payment.save()
 
         payment_url_params = {
             'amount': str(final_charge_amount),
@@ -160,7 +176,7 @@ class MilestoneViewSet(viewsets.ModelViewSet):
         }
         
         query_string = urllib.parse.urlencode(payment_url_params)
-        payment_url = f"{settings.RISKPAY_PAYMENT_PROCESSING_URL}?address={transaction.gateway_address_in}&{query_string}"
+        payment_url = f"{settings.RISKPAY_PAYMENT_PROCESSING_URL}?address={payment.gateway_address_in}&{query_string}"
         
         print("--- Generated Payment URL ---")
         print(payment_url)
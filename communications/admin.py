@@ -1,4 +1,9 @@
 from django.contrib import admin
-from communications.models import ChatMessage
+from communications.models import ChatMessage, OutboundEmail
 
-admin.site.register(ChatMessage)
\ No newline at end of file
+admin.site.register(ChatMessage)
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from communications.outbox import MAX_ATTEMPTS, claim_batch, deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued outbox emails over one reused SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails sent per SMTP connection.')
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS, help='Attempts before an email is marked FAILED.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting once it is drained.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls in --loop mode.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.drain(options['batch_size'], options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def drain(self, batch_size, max_attempts):
+        total_sent = total_failed = 0
+        while True:
+            batch = claim_batch(batch_size)
+            if not batch:
+                return total_sent, total_failed
+            sent, failed = deliver_batch(batch, max_attempts=max_attempts)
+            total_sent += sent
+            total_failed += failed
+            if not sent:
+                # Nothing in the batch went through, most likely because the
+                # SMTP server is unreachable; leave the rest for the next poll.
+                return total_sent, total_failed
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:42
+
+import api.storage
+import communications.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0003_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='workupdate',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=api.storage.get_content_store, upload_to=communications.models.order_update_path),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0004_alter_workupdate_attachment'),
+        ('ecommerce', '0014_alter_transaction_proof_screenshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workupdate',
+            index=models.Index(fields=['attachment'], name='work_update_attachment_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from ecommerce.models import Order
+from api.storage import get_content_store
 
 def order_update_path(instance, filename):
     return f'order_updates/{instance.order.id}/{filename}'
@@ -12,12 +14,16 @@ class WorkUpdate(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     title = models.CharField(max_length=255)
     description = models.TextField()
-    attachment = models.FileField(upload_to=order_update_path, blank=True, null=True)
+    attachment = models.FileField(upload_to=order_update_path, storage=get_content_store, blank=True, null=True)
     link = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Looked up by file name when media access is checked.
+            models.Index(fields=['attachment'], name='work_update_attachment_idx'),
+        ]
 
     def __str__(self):
         author_email = self.author.email if self.author else "a Deleted User"
@@ -36,3 +42,30 @@ class ChatMessage(models.Model):
     def __str__(self):
         author_email = self.author.email if self.author else "a Deleted User"
         return f"Message by {author_email} on Order #{self.order.id}"
+
+
+class OutboundEmail(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENT = 'SENT', 'Sent'
+        FAILED = 'FAILED', 'Failed'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Email '{self.subject}' to {', '.join(self.recipients)} ({self.status})"
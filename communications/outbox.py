@@ -0,0 +1,115 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboundEmail
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 60 * 60
+# Claimed rows are pushed this far into the future so a second worker skips
+# them; if the worker dies mid-batch they simply become due again.
+CLAIM_LEASE_SECONDS = 10 * 60
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """
+    Records an email in the outbox instead of talking to SMTP. The row is
+    written in the caller's transaction, so it is only delivered if the
+    surrounding work commits.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.EMAIL_HOST_USER,
+        recipients=list(recipient_list),
+    )
+
+
+def queue_emails(messages, from_email=None, batch_size=500):
+    """
+    Bulk version of ``queue_email`` for (subject, message, recipient_list)
+    tuples, written with batched inserts.
+    """
+    from_email = from_email or settings.EMAIL_HOST_USER
+    return OutboundEmail.objects.bulk_create(
+        [
+            OutboundEmail(subject=subject, body=message, from_email=from_email, recipients=list(recipient_list))
+            for subject, message, recipient_list in messages
+        ],
+        batch_size=batch_size,
+    )
+
+
+def backoff_delay(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=[email.id for email in batch]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        )
+    return batch
+
+
+def _record_failure(email, error, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboundEmail.Status.FAILED
+    else:
+        email.next_attempt_at = timezone.now() + backoff_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_batch(batch, max_attempts=MAX_ATTEMPTS, connection=None):
+    """
+    Sends a claimed batch over a single SMTP connection. Returns the number
+    of emails sent and failed.
+    """
+    sent = failed = 0
+    if not batch:
+        return sent, failed
+
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            _record_failure(email, e, max_attempts)
+        return sent, len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipients,
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                _record_failure(email, e, max_attempts)
+                failed += 1
+                continue
+
+            email.status = OutboundEmail.Status.SENT
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.last_error = None
+            email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+            sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
@@ -1,3 +1,103 @@
-from django.test import TestCase
+from io import StringIO
+import socketserver
+import threading
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from communications.models import OutboundEmail
+from communications.outbox import queue_email
 
-# Create your tests here.
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for Django's backend to deliver messages."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.startswith("RCPT") and any(r in command for r in server.rejected):
+                self.reply("550 mailbox unavailable")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                server.messages += 1
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSMTPHandler)
+        self.connections = 0
+        self.messages = 0
+        self.rejected = set()
+
+
+class OutboxDeliveryTests(TestCase):
+
+    def setUp(self):
+        self.smtp = FakeSMTPServer()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+        smtp_settings = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        )
+        smtp_settings.enable()
+        self.addCleanup(smtp_settings.disable)
+
+    def test_batch_is_sent_over_one_connection(self):
+        for i in range(5):
+            queue_email("Hello", "Body", [f"user{i}@example.com"], from_email="team@example.com")
+
+        call_command("send_queued_emails", batch_size=10, stdout=StringIO())
+
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(self.smtp.messages, 5)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.Status.SENT).exists())
+
+    def test_rejected_email_is_retried_with_backoff_then_failed(self):
+        self.smtp.rejected.add("BOUNCE@EXAMPLE.COM")
+        email = queue_email("Hello", "Body", ["bounce@example.com"], from_email="team@example.com")
+        queue_email("Hello", "Body", ["ok@example.com"], from_email="team@example.com")
+
+        call_command("send_queued_emails", stdout=StringIO())
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(self.smtp.messages, 1)
+
+        for _ in range(4):
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            call_command("send_queued_emails", stdout=StringIO())
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.FAILED)
+        self.assertEqual(email.attempts, 5)
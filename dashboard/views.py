@@ -3,7 +3,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from dashboard.models import SiteSettings
 from dashboard.serializers import SiteSettingsSerializer
-from ecommerce.serializers import OrderDetailSerializer
+from ecommerce.serializers import OrderDetailSerializer, order_detail_queryset
 from quotes.models import QuoteRequest
 from quotes.serializers import QuoteRequestSerializer
 from users.models import User
@@ -23,7 +23,7 @@ class CustomerDashboardView(APIView):
     def get(self, request, *args, **kwargs):
         user = request.user
         
-        orders = user.orders.all()
+        orders = order_detail_queryset(user.orders.all())
         order_serializer = OrderDetailSerializer(orders, many=True)
         quotes = QuoteRequest.objects.filter(user=user)
         quote_serializer = QuoteRequestSerializer(quotes, many=True)
@@ -0,0 +1,41 @@
+from decimal import Decimal
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Order
+
+ZERO = Value(Decimal('0.00'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _milestone_sum(**filters):
+    from billing.models import Milestone
+
+    total = (
+        Milestone.objects.filter(order=OuterRef('pk'), **filters)
+        .order_by()
+        .values('order')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    return Coalesce(Subquery(total, output_field=DecimalField(max_digits=12, decimal_places=2)), ZERO)
+
+
+def financial_updates():
+    """UPDATE expressions recomputing the stored totals from milestones."""
+    budget = _milestone_sum()
+    paid = _milestone_sum(status='PAID')
+    return {
+        'total_budget': budget,
+        'total_paid': paid,
+        'remaining_balance': budget - paid,
+    }
+
+
+def refresh_financials(order_ids=None):
+    """
+    Recomputes the totals of ``order_ids`` (every order when None) in a
+    single UPDATE with correlated subqueries. Returns the rows updated.
+    """
+    orders = Order.objects.all()
+    if order_ids is not None:
+        orders = orders.filter(pk__in=[order_id for order_id in order_ids if order_id is not None])
+    return orders.update(**financial_updates())
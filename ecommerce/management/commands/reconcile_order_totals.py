@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ecommerce.financials import refresh_financials
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored budget, paid and balance totals of every order from its milestones in one UPDATE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order', type=int, action='append', dest='order_ids', help='Only reconcile these order ids.')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Reconciling order totals...")
+        with transaction.atomic():
+            updated = refresh_financials(options['order_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled totals for {updated} orders."))
@@ -0,0 +1,31 @@
+from collections import Counter
+from django.core.management.base import BaseCommand
+from ecommerce.order_status import repair_statuses
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every order status from its milestones in chunks, optionally as a dry run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing them.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--verbose-diff', action='store_true', help='List every changed order, not only the totals.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self.stdout.write("Checking order statuses" + (" (dry run)..." if dry_run else "..."))
+
+        transitions = Counter()
+        for repairs in repair_statuses(chunk_size=options['chunk_size'], dry_run=dry_run):
+            for order, old_status in repairs:
+                transitions[old_status, order.status] += 1
+                if options['verbose_diff']:
+                    self.stdout.write(f"Order {order.pk}: {old_status} -> {order.status}")
+
+        for (old_status, new_status), count in sorted(transitions.items()):
+            self.stdout.write(f"  {old_status} -> {new_status}: {count}")
+        total = sum(transitions.values())
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"{total} orders would be updated."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Updated {total} orders."))
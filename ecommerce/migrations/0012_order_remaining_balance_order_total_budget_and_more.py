@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:34
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model('ecommerce', 'Order')
+    Milestone = apps.get_model('billing', 'Milestone')
+    output = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def milestone_sum(**filters):
+        total = (
+            Milestone.objects.filter(order=OuterRef('pk'), **filters)
+            .order_by().values('order').annotate(total=Sum('amount')).values('total')
+        )
+        return Coalesce(Subquery(total, output_field=output), Value(Decimal('0.00'), output_field=output))
+
+    budget = milestone_sum()
+    paid = milestone_sum(status='PAID')
+    Order.objects.update(total_budget=budget, total_paid=paid, remaining_balance=budget - paid)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0011_transaction_proof_reference_number_and_more'),
+        ('billing', '0001_initial'),
+        ('quotes', '0003_quoterequest_quote_status_created_idx_and_more'),
+        ('services', '0003_catalog_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='remaining_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_budget',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['remaining_balance', 'id'], name='order_balance_idx'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+        ('ecommerce', '0012_order_remaining_balance_order_total_budget_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'timestamp', 'id'], name='transaction_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['timestamp', 'id'], name='transaction_time_idx'),
+        ),
+    ]
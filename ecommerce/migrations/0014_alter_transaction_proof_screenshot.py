@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:42
+
+import api.storage
+import ecommerce.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0013_transaction_transaction_status_time_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='proof_screenshot',
+            field=models.ImageField(blank=True, null=True, storage=api.storage.get_content_store, upload_to=ecommerce.models.transaction_proof_path),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+        ('ecommerce', '0014_alter_transaction_proof_screenshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['proof_screenshot'], name='transaction_proof_idx'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db.models import Sum
 from django.conf import settings
 from services.models import Plan
 from quotes.models import QuoteRequest
+from api.storage import get_content_store
 import os
 
 def transaction_proof_path(instance, filename):
@@ -12,6 +13,9 @@ def transaction_proof_path(instance, filename):
     return f"transactions/{order_id}/{transaction_id}/{filename}"
 
 
+FINANCIAL_FIELDS = ('total_budget', 'total_paid', 'remaining_balance')
+
+
 class Order(models.Model):
     class Status(models.TextChoices):
         PENDING = 'PENDING', 'Pending'
@@ -27,22 +31,54 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Sums over the order's milestones, kept up to date by billing.signals
+    # and repaired by the reconcile_order_totals command.
+    total_budget = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    remaining_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['remaining_balance', 'id'], name='order_balance_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} by {self.user.email}"
 
-    def update_status_based_on_milestones(self):
-        if not self.milestones.exists():
-            return
+    def save(self, *args, **kwargs):
+        # The totals are written with UPDATE statements as milestones change;
+        # a full save of an instance loaded earlier must not put back stale
+        # values.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in FINANCIAL_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
-        has_pending_milestones = self.milestones.filter(status='PENDING').exists()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so an order moved to another customer refreshes the
+        # previous customer's stats as well.
+        instance._loaded_user_id = instance.__dict__.get('user_id')
+        return instance
 
-        if not has_pending_milestones:
-            self.status = self.Status.ACTIVE
-        else:
-            if self.status != self.Status.PENDING:
-                self.status = self.Status.AWAITING_PAYMENT
-        
-        self.save()
+    def status_for_milestones(self, has_milestones, has_pending):
+        """The status implied by the order's milestones, or the current one."""
+        if not has_milestones:
+            return self.status
+        if not has_pending:
+            return self.Status.ACTIVE
+        if self.status != self.Status.PENDING:
+            return self.Status.AWAITING_PAYMENT
+        return self.status
+
+    def update_status_based_on_milestones(self):
+        from ecommerce.order_status import refresh_statuses
+
+        refresh_statuses([self.pk])
+        self.refresh_from_db(fields=['status'])
 
     @property
     def final_price(self):
@@ -70,9 +106,17 @@ class Transaction(models.Model):
     gateway_txid_out = models.CharField(max_length=255, blank=True, null=True) 
     gateway_coin_type = models.CharField(max_length=50, blank=True, null=True) 
     gateway_value_in_coin = models.CharField(max_length=50, blank=True, null=True) 
-    proof_screenshot = models.ImageField(upload_to=transaction_proof_path, null=True, blank=True)
+    proof_screenshot = models.ImageField(upload_to=transaction_proof_path, storage=get_content_store, null=True, blank=True)
     proof_reference_number = models.CharField(max_length=100, null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'timestamp', 'id'], name='transaction_status_time_idx'),
+            models.Index(fields=['timestamp', 'id'], name='transaction_time_idx'),
+            # Looked up by file name when media access is checked.
+            models.Index(fields=['proof_screenshot'], name='transaction_proof_idx'),
+        ]
+
     def __str__(self):
         return f"Transaction {self.id} for Order #{self.order.id} - {self.status}"
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from api.commit import CommitBatch
+from .models import Order
+
+
+def refresh_statuses(order_ids):
+    """
+    Recomputes the status of ``order_ids`` from their milestones with one
+    query, saving only the orders whose status actually changes. Returns
+    the number of orders updated.
+    """
+    from billing.models import Milestone
+
+    milestones = Milestone.objects.filter(order=OuterRef('pk'))
+    orders = Order.objects.filter(pk__in=order_ids).annotate(
+        has_milestones=Exists(milestones),
+        has_pending=Exists(milestones.filter(status=Milestone.Status.PENDING)),
+    )
+    changed = 0
+    for order in orders:
+        status = order.status_for_milestones(order.has_milestones, order.has_pending)
+        if status != order.status:
+            order.status = status
+            order.save(update_fields=['status'])
+            changed += 1
+    return changed
+
+
+def schedule_status_refresh(order_id):
+    """
+    Recomputes the order's status once after the current transaction
+    commits, however many of its milestones were saved.
+    """
+    _status_refresh.add(order_id)
+
+
+_status_refresh = CommitBatch(refresh_statuses)
+
+
+def status_repairs(chunk_size=1000):
+    """
+    Yields, one chunk of orders at a time, the (order, old status) pairs
+    whose stored status disagrees with their milestones. Each chunk is one
+    GROUP BY over milestones, walked by order id so memory stays bounded.
+    Orders without milestones keep whatever status they have.
+    """
+    from billing.models import Milestone
+
+    last_id = 0
+    while True:
+        rows = list(
+            Milestone.objects.filter(order_id__gt=last_id)
+            .values('order_id', 'order__status', 'order__user_id')
+            .annotate(pending=Count('id', filter=Q(status=Milestone.Status.PENDING)))
+            .order_by('order_id')[:chunk_size]
+        )
+        if not rows:
+            return
+        last_id = rows[-1]['order_id']
+
+        repairs = []
+        for row in rows:
+            order = Order(pk=row['order_id'], user_id=row['order__user_id'], status=row['order__status'])
+            status = order.status_for_milestones(True, row['pending'] > 0)
+            if status != order.status:
+                old_status, order.status = order.status, status
+                repairs.append((order, old_status))
+        yield repairs
+
+
+def repair_statuses(chunk_size=1000, dry_run=False):
+    """
+    Brings every order's status in line with its milestones, writing each
+    chunk with one ``bulk_update``. Yields the repairs of each chunk so the
+    caller can report them; with ``dry_run`` nothing is written.
+    """
+    from users.stats import rebuild_stats
+
+    for repairs in status_repairs(chunk_size):
+        if repairs and not dry_run:
+            orders = [order for order, _ in repairs]
+            with transaction.atomic():
+                Order.objects.bulk_update(orders, ['status'])
+                # bulk_update skips the order signals that keep the rollups current.
+                rebuild_stats({order.user_id for order in orders})
+        yield repairs
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.db import models
 from services.models import Plan
 from .models import Order, Transaction
+from api.derivatives import derivative_urls
 from decimal import Decimal
 
 
@@ -22,6 +23,7 @@ class TransactionSerializer(serializers.ModelSerializer):
     milestone_title = serializers.CharField(source='milestone.title', read_only=True)
     user_id = serializers.IntegerField(source='order.user.id', read_only=True)
     user_name = serializers.CharField(source='order.user.get_full_name', read_only=True)
+    proof_screenshot_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Transaction
@@ -40,12 +42,16 @@ class TransactionSerializer(serializers.ModelSerializer):
             'gateway_coin_type', 
             'gateway_value_in_coin', 
             'proof_screenshot',
+            'proof_screenshot_variants',
             'proof_reference_number',
             'user_id',
             'user_name',
         ]
         read_only_fields = ['status', 'amount', 'order', 'milestone', 'provider_name']
 
+    def get_proof_screenshot_variants(self, obj):
+        return derivative_urls(obj.proof_screenshot, self.context.get('request'))
+
 class OrderListSerializer(serializers.ModelSerializer):
 
     plan_details = serializers.StringRelatedField(source='plan')
@@ -54,7 +60,11 @@ class OrderListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'plan', 'plan_details', 'plan_price', 'status', 'created_at']
+        fields = [
+            'id', 'plan', 'plan_details', 'plan_price', 'status', 'created_at',
+            'total_budget', 'total_paid', 'remaining_balance',
+        ]
+        read_only_fields = ['total_budget', 'total_paid', 'remaining_balance']
 
 
 
@@ -70,10 +80,6 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     chat_messages = ChatMessageSerializer(many=True, read_only=True)
     review = ReviewSerializer(read_only=True)
 
-    total_budget = serializers.SerializerMethodField()
-    total_paid = serializers.SerializerMethodField()
-    remaining_balance = serializers.SerializerMethodField()
-
     class Meta:
         model = Order
         fields = [
@@ -86,12 +92,25 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'review',
             'quote_request'
         ]
-
-    def get_total_budget(self, obj):
-        return obj.milestones.aggregate(total=models.Sum('amount'))['total'] or 0.00
-    
-    def get_total_paid(self, obj):
-        return obj.milestones.filter(status='PAID').aggregate(total=models.Sum('amount'))['total'] or 0.00
-
-    def get_remaining_balance(self, obj):
-        return Decimal(self.get_total_budget(obj)) - Decimal(self.get_total_paid(obj))
+        read_only_fields = ['total_budget', 'total_paid', 'remaining_balance']
+
+
+def order_detail_queryset(queryset=None):
+    """
+    Orders with everything OrderDetailSerializer reads, in a fixed number of
+    queries however many milestones, transactions, updates and messages an
+    order has. Prefetched children get their ``order`` cache pointed at the
+    parent, so its user and plan are never fetched again.
+    """
+    from communications.models import WorkUpdate, ChatMessage
+
+    if queryset is None:
+        queryset = Order.objects.all()
+    return queryset.select_related(
+        'user', 'plan__service', 'review__user__profile',
+    ).prefetch_related(
+        'milestones',
+        models.Prefetch('transactions', queryset=Transaction.objects.select_related('milestone')),
+        models.Prefetch('work_updates', queryset=WorkUpdate.objects.select_related('author__profile')),
+        models.Prefetch('chat_messages', queryset=ChatMessage.objects.select_related('author__profile')),
+    )
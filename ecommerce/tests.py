@@ -1,3 +1,249 @@
+from datetime import datetime
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from billing.models import Milestone
+from communications.models import WorkUpdate, ChatMessage
+from ecommerce.models import Order, Transaction
+from reviews.models import Review
+from services.models import Service, Plan
+from users.models import User, UserStats
+from users.stats import get_or_build_stats
 
-# Create your tests here.
+
+class OrderDetailQueryCountTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x", role=User.Role.CUSTOMER)
+        self.employee = User.objects.create_user(email="employee@example.com", password="x", role=User.Role.EMPLOYEE)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def make_order(self, size):
+        order = Order.objects.create(user=self.customer, plan=self.plan)
+        for i in range(size):
+            milestone = Milestone.objects.create(
+                order=order,
+                title=f"Milestone {i}",
+                amount="50.00",
+                status=Milestone.Status.PAID if i % 2 else Milestone.Status.PENDING,
+            )
+            Transaction.objects.create(order=order, milestone=milestone, amount="50.00")
+            WorkUpdate.objects.create(order=order, author=self.employee, title=f"Update {i}", description="Done")
+            ChatMessage.objects.create(order=order, author=self.customer if i % 2 else self.employee, message="Hi")
+        return order
+
+    def retrieve(self, order):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/api/orders/{order.id}/")
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_order_size(self):
+        _, small = self.retrieve(self.make_order(1))
+        large_order = self.make_order(20)
+        Review.objects.create(order=large_order, plan=self.plan, user=self.customer, rating=5, comment="Great")
+        response, large = self.retrieve(large_order)
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 6)
+        self.assertEqual(len(response.data["chat_messages"]), 20)
+        self.assertEqual(response.data["review"]["rating"], 5)
+
+    def test_totals_are_computed_from_milestones(self):
+        response, _ = self.retrieve(self.make_order(4))
+
+        self.assertEqual(Decimal(str(response.data["total_budget"])), Decimal("200.00"))
+        self.assertEqual(Decimal(str(response.data["total_paid"])), Decimal("100.00"))
+        self.assertEqual(Decimal(str(response.data["remaining_balance"])), Decimal("100.00"))
+
+
+class OrderTotalsTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        self.order = Order.objects.create(user=self.customer, plan=self.plan)
+        self.other_order = Order.objects.create(user=self.customer, plan=self.plan)
+
+    def totals(self, order):
+        order.refresh_from_db()
+        return order.total_budget, order.total_paid, order.remaining_balance
+
+    def test_totals_follow_milestone_changes(self):
+        deposit = Milestone.objects.create(order=self.order, title="Deposit", amount="40.00")
+        final = Milestone.objects.create(order=self.order, title="Final", amount="60.00")
+        self.assertEqual(self.totals(self.order), (Decimal("100.00"), Decimal("0.00"), Decimal("100.00")))
+
+        deposit.status = Milestone.Status.PAID
+        deposit.save()
+        self.assertEqual(self.totals(self.order), (Decimal("100.00"), Decimal("40.00"), Decimal("60.00")))
+
+        final = Milestone.objects.get(pk=final.pk)
+        final.order = self.other_order
+        final.save()
+        self.assertEqual(self.totals(self.order), (Decimal("40.00"), Decimal("40.00"), Decimal("0.00")))
+        self.assertEqual(self.totals(self.other_order), (Decimal("60.00"), Decimal("0.00"), Decimal("60.00")))
+
+        deposit.delete()
+        self.assertEqual(self.totals(self.order), (Decimal("0.00"), Decimal("0.00"), Decimal("0.00")))
+
+    def test_list_filters_and_orders_by_balance(self):
+        Milestone.objects.create(order=self.order, title="Deposit", amount="40.00")
+        Milestone.objects.create(order=self.other_order, title="Deposit", amount="90.00")
+        client = APIClient()
+        client.force_authenticate(self.customer)
+
+        response = client.get("/api/orders/", {"min_balance": "50"})
+        self.assertEqual([order["id"] for order in response.data], [self.other_order.id])
+
+        response = client.get("/api/orders/", {"ordering": "remaining_balance"})
+        self.assertEqual([order["id"] for order in response.data], [self.order.id, self.other_order.id])
+
+        self.assertEqual(client.get("/api/orders/", {"max_balance": "lots"}).status_code, 400)
+
+    def test_reconcile_command_repairs_drift(self):
+        Milestone.objects.create(order=self.order, title="Deposit", amount="40.00")
+        Order.objects.filter(pk=self.order.pk).update(total_budget=0, remaining_balance=999)
+
+        call_command("reconcile_order_totals", stdout=StringIO())
+
+        self.assertEqual(self.totals(self.order), (Decimal("40.00"), Decimal("0.00"), Decimal("40.00")))
+
+
+class RepairOrderStatusesTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        get_or_build_stats(self.customer)
+        self.paid = self.order(Milestone.Status.PAID)
+        self.unpaid = self.order(Milestone.Status.PENDING, status=Order.Status.ACTIVE)
+        self.new = self.order(Milestone.Status.PENDING)
+        self.empty = Order.objects.create(user=self.customer, plan=self.plan, status=Order.Status.ACTIVE)
+        # Drift that bypassed the signals.
+        Order.objects.filter(pk=self.paid.pk).update(status=Order.Status.AWAITING_PAYMENT)
+        Order.objects.filter(pk=self.unpaid.pk).update(status=Order.Status.ACTIVE)
+
+    def order(self, milestone_status, status=Order.Status.PENDING):
+        order = Order.objects.create(user=self.customer, plan=self.plan, status=status)
+        Milestone.objects.create(order=order, title="Deposit", amount="100.00", status=milestone_status)
+        return order
+
+    def statuses(self):
+        return dict(Order.objects.values_list("pk", "status"))
+
+    def repair(self, *args):
+        out = StringIO()
+        call_command("repair_order_statuses", "--chunk-size", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_without_writing(self):
+        before = self.statuses()
+
+        output = self.repair("--dry-run", "--verbose-diff")
+
+        self.assertEqual(self.statuses(), before)
+        self.assertIn(f"Order {self.paid.pk}: AWAITING_PAYMENT -> ACTIVE", output)
+        self.assertIn(f"Order {self.unpaid.pk}: ACTIVE -> AWAITING_PAYMENT", output)
+        self.assertIn("2 orders would be updated.", output)
+
+    def test_repairs_every_chunk_and_the_stats(self):
+        output = self.repair()
+
+        statuses = self.statuses()
+        self.assertEqual(statuses[self.paid.pk], Order.Status.ACTIVE)
+        self.assertEqual(statuses[self.unpaid.pk], Order.Status.AWAITING_PAYMENT)
+        self.assertEqual(statuses[self.new.pk], Order.Status.PENDING)
+        self.assertEqual(statuses[self.empty.pk], Order.Status.ACTIVE)
+        self.assertIn("Updated 2 orders.", output)
+        stats = UserStats.objects.get(user=self.customer)
+        self.assertEqual((stats.active_orders, stats.awaiting_payment_orders), (2, 1))
+        self.assertIn("Updated 0 orders.", self.repair())
+
+
+class TransactionListTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        self.other = User.objects.create_user(email="other@example.com", password="x")
+        self.employee = User.objects.create_user(email="employee@example.com", password="x", role=User.Role.EMPLOYEE)
+        self.order = Order.objects.create(user=self.customer, plan=self.plan)
+        self.other_order = Order.objects.create(user=self.other, plan=self.plan)
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def transaction(self, day, order=None, status=Transaction.Status.PENDING, provider="RiskPay"):
+        order = order or self.order
+        milestone = Milestone.objects.create(order=order, title=f"Milestone {day}", amount="10.00")
+        transaction = Transaction.objects.create(
+            order=order, milestone=milestone, amount="10.00", status=status, provider_name=provider,
+        )
+        Transaction.objects.filter(pk=transaction.pk).update(timestamp=timezone.make_aware(datetime(2030, 1, day, 12, 0)))
+        return transaction
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_filters(self):
+        early = self.transaction(1, status=Transaction.Status.SUCCESS)
+        middle = self.transaction(5, status=Transaction.Status.VERIFYING, provider="Bank")
+        late = self.transaction(9, order=self.other_order, status=Transaction.Status.FAILED)
+
+        self.assertEqual(self.ids(self.client.get("/api/transactions/", {"status": "verifying,failed"})), [late.id, middle.id])
+        self.assertEqual(self.ids(self.client.get("/api/transactions/", {"provider": "Bank"})), [middle.id])
+        self.assertEqual(self.ids(self.client.get("/api/transactions/", {"order": self.order.id})), [middle.id, early.id])
+        self.assertEqual(self.ids(self.client.get("/api/transactions/", {"from": "2030-01-05", "to": "2030-01-09"})), [late.id, middle.id])
+        self.assertEqual(self.ids(self.client.get("/api/transactions/", {"to": "2030-01-01"})), [early.id])
+
+        for params in ({"status": "lost"}, {"order": "one"}, {"from": "01/05/2030"}):
+            response = self.client.get("/api/transactions/", params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.data)
+
+    def test_customers_only_see_their_own(self):
+        own = self.transaction(1)
+        self.transaction(2, order=self.other_order)
+
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.ids(self.client.get("/api/transactions/")), [own.id])
+
+    def test_cursor_walks_every_page_newest_first(self):
+        transactions = [self.transaction(day) for day in range(1, 6)]
+        # Two rows on the same timestamp are ordered by id.
+        tied = self.transaction(5)
+
+        seen = []
+        response = self.client.get("/api/transactions/", {"page_size": 2})
+        while True:
+            seen += self.ids(response)
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        expected = [tied.id] + [transaction.id for transaction in reversed(transactions)]
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get("/api/transactions/", {"cursor": "garbage"}).status_code, 404)
+
+    def test_a_page_is_a_single_query(self):
+        for day in range(1, 11):
+            self.transaction(day, order=self.order if day % 2 else self.other_order)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/transactions/", {"status": "pending"})
+
+        self.assertEqual(len(self.ids(response)), 10)
+        self.assertEqual(response.data["results"][0]["customer_email"], "other@example.com")
+        self.assertEqual(len(context.captured_queries), 1)
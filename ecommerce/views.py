@@ -1,21 +1,47 @@
-from rest_framework import viewsets, status
+from decimal import Decimal, InvalidOperation
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Order, Transaction
-from .serializers import OrderListSerializer, OrderDetailSerializer, TransactionSerializer
+from .serializers import OrderListSerializer, OrderDetailSerializer, TransactionSerializer, order_detail_queryset
 from users.permissions import IsEmployeeOrOwner
+from api.filters import filter_date_window, filter_statuses
+from api.pagination import KeysetPagination
 from billing.models import Milestone 
 
 class OrderViewSet(viewsets.ModelViewSet):
+    """
+    Lists accept ``min_balance``/``max_balance`` filters on the outstanding
+    balance and ``ordering`` by created_at, total_budget, total_paid or
+    remaining_balance (prefix with ``-`` for descending).
+    """
     permission_classes = [IsAuthenticated]
-
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['created_at', 'total_budget', 'total_paid', 'remaining_balance']
 
     def get_queryset(self):
         user = self.request.user
         if user.role in [user.Role.EMPLOYEE, user.Role.OWNER]:
-            return Order.objects.all().order_by("-created_at")
-        return Order.objects.filter(user=user).order_by("-created_at")
+            queryset = Order.objects.all().order_by("-created_at")
+        else:
+            queryset = Order.objects.filter(user=user).order_by("-created_at")
+        if self.action == 'retrieve':
+            return order_detail_queryset(queryset)
+        if self.action == 'list':
+            queryset = self.filter_balance(queryset).select_related('plan__service')
+        return queryset
+
+    def filter_balance(self, queryset):
+        params = self.request.query_params
+        try:
+            if params.get('min_balance'):
+                queryset = queryset.filter(remaining_balance__gte=Decimal(params['min_balance']))
+            if params.get('max_balance'):
+                queryset = queryset.filter(remaining_balance__lte=Decimal(params['max_balance']))
+        except InvalidOperation:
+            raise serializers.ValidationError({"error": "'min_balance' and 'max_balance' must be numbers."})
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -46,15 +72,45 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response({"message": f"Order status updated to {order.status}"}, status=status.HTTP_200_OK)
 
 
+class TransactionPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+
+
 class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Lists newest first, a page at a time, and accepts ``status`` (comma
+    separated), ``provider``, ``order`` and an inclusive ``from``/``to`` date
+    range (YYYY-MM-DD) on the transaction timestamp.
+    """
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionPagination
+
     def get_queryset(self):
         user = self.request.user
         if user.role in [user.Role.EMPLOYEE, user.Role.OWNER]:
-            return Transaction.objects.all().order_by('-timestamp')
-        
-        return Transaction.objects.filter(order__user=user).order_by('-timestamp')
+            queryset = Transaction.objects.all()
+        else:
+            queryset = Transaction.objects.filter(order__user=user)
+        if self.action == 'list':
+            queryset = self.filter_transactions(queryset)
+        return queryset.select_related('order__user', 'order__plan', 'milestone')
+
+    def filter_transactions(self, queryset):
+        params = self.request.query_params
+        queryset = filter_date_window(queryset, params, 'timestamp')
+
+        if params.get('order'):
+            try:
+                queryset = queryset.filter(order_id=int(params['order']))
+            except ValueError:
+                raise serializers.ValidationError({"error": "'order' must be an integer."})
+
+        if params.get('provider'):
+            queryset = queryset.filter(provider_name=params['provider'])
+        return filter_statuses(queryset, params, Transaction.Status.choices)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def submit_proof(self, request, pk=None):
         transaction = self.get_object()
@@ -72,6 +72,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts, so concurrent
+        # writers queue on the timeout instead of failing with
+        # "database is locked" when they upgrade a read lock.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file-backed test database honours the busy timeout across
+        # threads, which the shared in-memory default does not.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -96,7 +108,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -111,6 +123,26 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
 
+# Shared by every worker process on the host. Point it at Redis or
+# Memcached when the API runs on several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+}
+
+# Users resolved from JWTs are kept in an in-process LRU. SHARED_CACHE is the
+# CACHES alias that carries entries and invalidations across processes.
+USER_AUTH_CACHE = {
+    'MAX_ENTRIES': 1024,
+    'TTL': 300,
+    'SHARED_CACHE': 'default',
+}
+
+# Swaps in a local-memory cache for the test suite (see global/test_runner.py).
+TEST_RUNNER = 'global.test_runner.TestRunner'
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -127,6 +159,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Partial files of resumable uploads (api.UploadSession); kept outside
+# MEDIA_ROOT so unfinished uploads are never served.
+UPLOAD_SESSION_ROOT = BASE_DIR / 'upload_sessions'
+UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+# Uploads one user may have in progress at once.
+UPLOAD_MAX_OPEN_SESSIONS = 5
+# Processes that render image thumbnails (api.derivatives).
+IMAGE_DERIVATIVE_WORKERS = 2
+# How api.views.ProtectedMediaView hands files to the front proxy: 'nginx'
+# (X-Accel-Redirect to an internal location aliased to MEDIA_ROOT),
+# 'xsendfile' (Apache/lighttpd) or None to stream them from Django.
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Also send the body along with the proxy headers, to check them locally.
+MEDIA_SENDFILE_EMULATE = False
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Global Financial World API',
     'DESCRIPTION': 'API documentation for your Django backend',
@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the suite against a local-memory cache, so tests never read or
+    write the FileBasedCache under BASE_DIR that the running site shares.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_settings = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        )
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -7,8 +7,8 @@ from drf_spectacular.views import (
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.conf import settings
-from django.conf.urls.static import static
 from users.views import MyTokenObtainPairView
+from api.views import ProtectedMediaView
 
 
 
@@ -25,6 +25,7 @@ urlpatterns = [
     path('api/', include('reviews.urls')),
     path('api/', include('payments.urls')),
     path('api/', include('scheduling.urls')), 
+    path('api/', include('api.urls')),
 
     
     #path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -36,7 +37,9 @@ urlpatterns = [
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
 ]
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media is never served as static files: proofs and attachments are private.
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", ProtectedMediaView.as_view(), name='protected-media'),
+]
 
     
\ No newline at end of file
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:42
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_paymentprovider_bank_details_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentprovider',
+            name='logo',
+            field=models.ImageField(blank=True, null=True, storage=api.storage.get_content_store, upload_to='provider_logos/'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from api.storage import get_content_store
 
 
 class PaymentProvider(models.Model):
@@ -9,7 +10,7 @@ class PaymentProvider(models.Model):
 
     title = models.CharField(max_length=100)
     provider_name_code = models.CharField(max_length=50, unique=True, help_text="The code name RiskPay uses, e.g., 'simplex'")
-    logo = models.ImageField(upload_to='provider_logos/', null=True, blank=True)
+    logo = models.ImageField(upload_to='provider_logos/', storage=get_content_store, null=True, blank=True)
     account_number = models.CharField(max_length=255, blank=True, null=True, help_text="Your account number with this provider, if any.")
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True, help_text="Enable or disable this provider on the frontend.")
@@ -1,14 +1,26 @@
 from rest_framework import serializers
+from api.derivatives import derivative_urls
 from .models import PaymentProvider
 
 class PaymentProviderSerializer(serializers.ModelSerializer):
+    logo_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = PaymentProvider
         fields = [
-            'id', 'title', 'provider_name_code', 'logo', 'description', 
+            'id', 'title', 'provider_name_code', 'logo', 'logo_variants', 'description', 
             'processing_fee_percentage', 'type', 'min_amount', 'max_amount'
         ]
+
+    def get_logo_variants(self, obj):
+        return derivative_urls(obj.logo, self.context.get('request'), public=True)
+
 class PaymentProviderSerializer(serializers.ModelSerializer):
+    logo_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = PaymentProvider
-        fields = '__all__'        
\ No newline at end of file
+        fields = '__all__'        
+
+    def get_logo_variants(self, obj):
+        return derivative_urls(obj.logo, self.context.get('request'), public=True)
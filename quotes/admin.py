@@ -2,4 +2,8 @@ from django.contrib import admin
 from . models import QuoteRequest
 # Register your models here.
 
-admin.site.register(QuoteRequest)
\ No newline at end of file
+@admin.register(QuoteRequest)
+class QuoteRequestAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'created_at')
+    list_filter = ('status',)
+    list_select_related = ('plan',)
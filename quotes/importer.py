@@ -0,0 +1,269 @@
+import csv
+import io
+import json
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from billing.models import Milestone
+from communications.outbox import queue_emails
+from ecommerce.models import Order
+from services.models import Plan
+from users.models import Profile, User
+from users.stats import rebuild_stats
+from .models import QuoteRequest
+
+CHUNK_SIZE = 1000
+FIELDS = ['name', 'email', 'company_name', 'custom_requirements', 'plan']
+FORMATS = ('jsonl', 'csv')
+# The columns each lead field is written to; a value must fit all of them.
+COLUMNS = {
+    'name': [(QuoteRequest, 'name')],
+    'email': [(User, 'email'), (QuoteRequest, 'email')],
+    'company_name': [(QuoteRequest, 'company_name'), (Profile, 'company_name')],
+}
+
+
+def read_rows(stream, fmt):
+    """
+    Yields (line number, row dict or None) from a JSONL or CSV text stream.
+    A line that cannot be parsed yields None.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def detect_format(filename, content_type=None):
+    name = (filename or '').lower()
+    if name.endswith('.csv') or (content_type or '').startswith('text/csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def text_stream(uploaded_file):
+    return io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+
+
+class LeadImporter:
+    """
+    Imports quote requests in chunks. Each chunk is one transaction that
+    creates users (with unusable passwords, so nothing is hashed), profiles,
+    quotes, orders and milestones with ``bulk_create``, and queues the
+    welcome emails in the outbox for the delivery worker.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.seen_emails = set()
+        self.plans = {}
+        for plan in Plan.objects.all():
+            self.plans[str(plan.id)] = plan
+            self.plans[plan.slug] = plan
+        self.results = []
+        self.error = None
+
+    def run(self, rows):
+        """
+        Imports every row and returns the per-row results. If the stream
+        cannot be decoded or parsed partway through, the rows read before
+        that point are still imported and ``error`` describes the failure.
+        """
+        chunk = []
+        line_number = 0
+        try:
+            for line_number, row in rows:
+                lead = self.clean(line_number, row)
+                if lead is not None:
+                    chunk.append(lead)
+                if len(chunk) >= self.chunk_size:
+                    self.save_chunk(chunk)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            self.error = f"Could not read the file after line {line_number}: {e}"
+        if chunk:
+            self.save_chunk(chunk)
+        return self.results
+
+    def save_chunk(self, leads):
+        try:
+            self.import_chunk(leads)
+        except IntegrityError:
+            # Most likely another import or sign-up created one of these
+            # users meanwhile. Retry row by row so only a row that still
+            # conflicts is rejected.
+            for lead in leads:
+                try:
+                    self.import_chunk([lead])
+                except IntegrityError as e:
+                    self.report(lead['line'], lead['email'], 'invalid', errors=[f"The row could not be saved: {e}"])
+
+    def report(self, line_number, email, status, **extra):
+        self.results.append({'line': line_number, 'email': email, 'status': status, **extra})
+
+    def clean(self, line_number, row):
+        if row is None:
+            self.report(line_number, None, 'invalid', errors=['Row could not be parsed.'])
+            return None
+
+        lead = {field: (str(row.get(field) or '').strip() or None) for field in FIELDS}
+        errors = []
+        email = lead['email'] and User.objects.normalize_email(lead['email'])
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append('A valid email is required.')
+        if not lead['name']:
+            errors.append('A name is required.')
+        errors.extend(self.length_errors(lead))
+        plan = None
+        if lead['plan']:
+            plan = self.plans.get(lead['plan'])
+            if plan is None:
+                errors.append(f"Unknown plan '{lead['plan']}'.")
+        if errors:
+            self.report(line_number, email, 'invalid', errors=errors)
+            return None
+
+        key = email.lower()
+        if key in self.seen_emails:
+            self.report(line_number, email, 'duplicate')
+            return None
+        self.seen_emails.add(key)
+
+        lead.update(line=line_number, email=email, plan=plan)
+        return lead
+
+    def length_errors(self, lead):
+        values = dict(lead)
+        if lead['name']:
+            first_name, _, last_name = lead['name'].partition(' ')
+            values.update(first_name=first_name, last_name=last_name)
+        columns = {**COLUMNS, 'first_name': [(User, 'first_name')], 'last_name': [(User, 'last_name')]}
+        errors = []
+        for field, targets in columns.items():
+            limit = min(model._meta.get_field(name).max_length for model, name in targets)
+            if values.get(field) and len(values[field]) > limit:
+                errors.append(f"'{field}' cannot be longer than {limit} characters.")
+        return errors
+
+    def existing_users(self, emails):
+        return {user.email: user for user in User.objects.filter(email__in=emails)}
+
+    @transaction.atomic
+    def import_chunk(self, leads):
+        existing = self.existing_users([lead['email'] for lead in leads])
+
+        created = {}
+        profiles = []
+        for lead in leads:
+            if lead['email'] in existing:
+                continue
+            first_name, _, last_name = lead['name'].partition(' ')
+            user = created[lead['email']] = User(
+                email=lead['email'],
+                first_name=first_name,
+                last_name=last_name,
+                role=User.Role.CUSTOMER,
+                password=make_password(None),
+            )
+            profiles.append(Profile(user=user, company_name=lead['company_name']))
+        User.objects.bulk_create(created.values())
+        # bulk_create skips the post_save handler that creates profiles.
+        Profile.objects.bulk_create(profiles)
+
+        users = []
+        quotes = []
+        for lead in leads:
+            users.append(created.get(lead['email']) or existing[lead['email']])
+            quotes.append(QuoteRequest(
+                user=users[-1],
+                plan=lead['plan'],
+                name=lead['name'],
+                email=lead['email'],
+                company_name=lead['company_name'],
+                custom_requirements=lead['custom_requirements'],
+            ))
+        QuoteRequest.objects.bulk_create(quotes)
+
+        # The totals the milestone signals would have written.
+        orders = [
+            Order(
+                user=user,
+                plan=quote.plan,
+                quote_request=quote,
+                status=Order.Status.PENDING,
+                total_budget=quote.plan.price if quote.plan else 0,
+                remaining_balance=quote.plan.price if quote.plan else 0,
+            )
+            for user, quote in zip(users, quotes)
+        ]
+        Order.objects.bulk_create(orders)
+        # New orders start PENDING with a pending milestone, which is what the
+        # milestone signal would leave them as, so it can safely be skipped.
+        Milestone.objects.bulk_create([
+            Milestone(order=order, title=f"Initial payment for {order.plan.name}", amount=order.plan.price, status=Milestone.Status.PENDING)
+            for order in orders
+            if order.plan
+        ])
+
+        queue_emails(welcome_email(user) for user in created.values())
+        # bulk_create bypasses the stats signals; recount the users whose
+        # rollups already exist.
+        rebuild_stats([user.id for user in existing.values()])
+
+        for lead, quote in zip(leads, quotes):
+            status = 'created' if lead['email'] in created else 'existing_user'
+            self.report(lead['line'], lead['email'], status, quote_id=quote.id)
+
+
+def welcome_email(user):
+    uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    setup_url = f"{settings.FRONTEND_URL}/reset-password/{uidb64}/{token}/"
+    subject = "Welcome to Global Financial World - Your Account is Ready"
+    message = f"""
+                Hi {user.first_name},
+
+                Thank you for your interest! We have created an account for you so you can follow your quote.
+
+                Please choose a password using the link below. If the link has expired, request a new one from the password reset page.
+
+                {setup_url}
+
+                Thanks,
+                The Global Financial World Team
+                """
+    return subject, message, [user.email]
+
+
+def import_leads(rows, chunk_size=CHUNK_SIZE):
+    """
+    Returns (summary, results, error). ``error`` is None unless the file
+    could not be read to the end, in which case the results cover the rows
+    before the failure, which have been imported.
+    """
+    lead_importer = LeadImporter(chunk_size=chunk_size)
+    results = lead_importer.run(rows)
+    # Rejected rows are reported as they are read, imported ones per chunk.
+    results.sort(key=lambda result: result['line'])
+    summary = {status: 0 for status in ('created', 'existing_user', 'duplicate', 'invalid')}
+    for result in results:
+        summary[result['status']] += 1
+    return summary, results, lead_importer.error
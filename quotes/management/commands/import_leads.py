@@ -0,0 +1,40 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from quotes import importer
+
+
+class Command(BaseCommand):
+    help = 'Imports quote request leads from a JSONL or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=importer.FORMATS, help='Defaults to csv for .csv files, jsonl otherwise.')
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE, help='Leads written per transaction.')
+        parser.add_argument('--report', help='Write the per-row results to this file as JSONL.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or importer.detect_format(options['path'])
+        try:
+            stream = open(options['path'], encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        with stream:
+            summary, results, error = importer.import_leads(importer.read_rows(stream, fmt), chunk_size=options['chunk_size'])
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as report:
+                for result in results:
+                    report.write(json.dumps(result) + '\n')
+        else:
+            for result in results:
+                if result['status'] == 'invalid':
+                    self.stdout.write(self.style.WARNING(f"Line {result['line']}: {' '.join(result['errors'])}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['created'] + summary['existing_user']} leads "
+            f"({summary['created']} new users, {summary['existing_user']} existing), "
+            f"skipped {summary['duplicate']} duplicates and {summary['invalid']} invalid rows."
+        ))
+        if error:
+            raise CommandError(f"{error}. The rows before it were imported.")
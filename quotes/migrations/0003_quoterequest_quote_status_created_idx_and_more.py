@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0002_initial'),
+        ('services', '0003_catalog_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quoterequest',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='quote_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quoterequest',
+            index=models.Index(fields=['created_at', 'id'], name='quote_created_idx'),
+        ),
+    ]
@@ -18,6 +18,12 @@ class QuoteRequest(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id'], name='quote_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='quote_created_idx'),
+        ]
+
     def __str__(self):
         return f"Quote Request from {self.email} for {self.plan.name if self.plan else 'Custom Plan'}"
     
\ No newline at end of file
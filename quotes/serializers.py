@@ -1,11 +1,10 @@
 from rest_framework import serializers
 from .models import QuoteRequest
-from users.models import User
+from users.models import GuestWelcome
+from users.provisioning import provision_guest
 from ecommerce.models import Order
 from billing.models import Milestone
-from django.core.mail import send_mail
-from django.conf import settings
-from django.utils.crypto import get_random_string
+from django.db import transaction
 from rest_framework_simplejwt.tokens import RefreshToken
 
 class QuoteRequestSerializer(serializers.ModelSerializer):
@@ -26,45 +25,19 @@ class QuoteRequestSerializer(serializers.ModelSerializer):
             }
         return None
 
+    @transaction.atomic
     def create(self, validated_data):
         email = validated_data['email']
         plan = validated_data.get('plan')
 
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'first_name': validated_data.get('name', '').split(' ')[0],
-                'last_name': ' '.join(validated_data.get('name', '').split(' ')[1:]),
-                'role': User.Role.CUSTOMER,
-            }
+        name = validated_data.get('name', '').split(' ')
+        user, created = provision_guest(
+            email,
+            GuestWelcome.Kind.QUOTE,
+            first_name=name[0],
+            last_name=' '.join(name[1:]),
         )
 
-        if created:
-            temp_password = get_random_string(length=10)
-            user.set_password(temp_password)
-            user.save()
-
-            subject = "Welcome to Global Financial World - Your Account is Ready"
-            message = f"""
-                Hi {user.first_name},
-
-                Thank you for your request! Your account has been created and you are now logged in.
-
-                For future logins, please use the credentials below. We recommend changing your password from your dashboard.
-
-                Email: {user.email}
-                Temporary Password: {temp_password}
-
-                Thanks,
-                The Global Financial World Team
-                """
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[user.email],
-            )
-
         quote_request = QuoteRequest.objects.create(user=user, **validated_data)
         quote_request.created_user = user
         order = Order.objects.create(user=user, plan=plan, quote_request=quote_request, status=Order.Status.PENDING)
@@ -1,3 +1,160 @@
+import json
+from datetime import datetime
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ecommerce.models import Order
+from quotes.importer import LeadImporter
+from quotes.models import QuoteRequest
+from services.models import Service, Plan
+from users.models import User
 
-# Create your tests here.
+
+class LeadImportTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.staff = User.objects.create_user(email="staff@example.com", password="x", role=User.Role.EMPLOYEE)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def upload(self, content, name="leads.jsonl"):
+        upload = SimpleUploadedFile(name, content, content_type="text/csv" if name.endswith(".csv") else "application/json")
+        return self.client.post("/api/quotes/import/", {"file": upload}, format="multipart")
+
+    def jsonl(self, *rows):
+        return "\n".join(json.dumps(row) for row in rows).encode()
+
+    def test_imports_leads_and_reports_every_row(self):
+        User.objects.create_user(email="known@example.com", password="x")
+        response = self.upload(self.jsonl(
+            {"name": "Ada Byron", "email": "ada@example.com", "plan": "basic"},
+            {"name": "Known", "email": "known@example.com"},
+            {"name": "Ada again", "email": "ADA@example.com"},
+            {"name": "", "email": "nobody"},
+            {"name": "Grace", "email": "grace@example.com", "plan": "missing"},
+        ))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["summary"], {"created": 1, "existing_user": 1, "duplicate": 1, "invalid": 2})
+        self.assertEqual([row["status"] for row in response.data["results"]], ["created", "existing_user", "duplicate", "invalid", "invalid"])
+        self.assertEqual(QuoteRequest.objects.count(), 2)
+        self.assertEqual(Order.objects.get(user__email="ada@example.com").remaining_balance, 100)
+        self.assertFalse(User.objects.get(email="ada@example.com").has_usable_password())
+
+    def test_rows_longer_than_their_columns_are_rejected(self):
+        response = self.upload(self.jsonl(
+            {"name": "A" * 151, "email": "long-first@example.com"},
+            {"name": "Ada Byron", "email": "company@example.com", "company_name": "C" * 256},
+            {"name": "Ada Byron", "email": "fits@example.com", "company_name": "C" * 255},
+        ))
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([row["status"] for row in results], ["invalid", "invalid", "created"])
+        self.assertIn("'first_name' cannot be longer than 150 characters.", results[0]["errors"])
+        self.assertIn("'company_name' cannot be longer than 255 characters.", results[1]["errors"])
+
+    def test_unreadable_file_keeps_the_rows_read_before_it(self):
+        rows = "".join(f"Lead {i},lead{i}@example.com\n" for i in range(1000))
+        response = self.upload(b"name,email\n" + rows.encode() + b"Bad \xff,bad@example.com\n", name="leads.csv")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Could not read the file", response.data["error"])
+        created = response.data["summary"]["created"]
+        self.assertGreater(created, 0)
+        self.assertEqual(len(response.data["results"]), created)
+        self.assertEqual(QuoteRequest.objects.count(), created)
+
+    def test_concurrently_created_users_are_imported_row_by_row(self):
+        existing_users = LeadImporter.existing_users
+        calls = []
+
+        def racing(importer, emails):
+            # The first lookup misses a user another request is creating.
+            calls.append(emails)
+            return {} if len(calls) == 1 else existing_users(importer, emails)
+
+        User.objects.create_user(email="raced@example.com", password="x")
+        with mock.patch.object(LeadImporter, "existing_users", racing):
+            response = self.upload(self.jsonl(
+                {"name": "Raced", "email": "raced@example.com"},
+                {"name": "Ada Byron", "email": "ada@example.com"},
+            ))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["status"] for row in response.data["results"]], ["existing_user", "created"])
+        self.assertEqual(QuoteRequest.objects.count(), 2)
+
+    def test_customers_cannot_import(self):
+        self.client.force_authenticate(User.objects.create_user(email="customer@example.com", password="x"))
+        self.assertEqual(self.upload(self.jsonl({"name": "Ada", "email": "ada@example.com"})).status_code, 403)
+
+
+class QuoteInboxTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.basic = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.pro = Plan.objects.create(service=service, name="Pro", slug="pro", description="Pro", price="200.00")
+        self.staff = User.objects.create_user(email="staff@example.com", password="x", role=User.Role.EMPLOYEE)
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        # Two quotes a day from 2030-01-01; the second of each day shares its timestamp.
+        self.quotes = []
+        for index in range(6):
+            quote = QuoteRequest.objects.create(
+                user=self.customer if index == 0 else None,
+                plan=self.basic if index % 2 else self.pro,
+                name=f"Lead {index}",
+                email=f"lead{index}@example.com",
+                status=QuoteRequest.Status.PENDING if index < 4 else QuoteRequest.Status.CONTACTED,
+            )
+            created_at = timezone.make_aware(datetime(2030, 1, 1 + index // 2, 9, 0))
+            QuoteRequest.objects.filter(pk=quote.pk).update(created_at=created_at)
+            self.quotes.append(quote)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def ids(self, response):
+        return [quote["id"] for quote in response.data["results"]]
+
+    def test_pages_newest_first_without_gaps(self):
+        seen = []
+        response = self.client.get("/api/quotes/", {"page_size": 4})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += self.ids(response)
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        expected = sorted(self.quotes, key=lambda quote: (QuoteRequest.objects.get(pk=quote.pk).created_at, quote.pk), reverse=True)
+        self.assertEqual(seen, [quote.pk for quote in expected])
+
+    def test_filters_and_facets(self):
+        response = self.client.get("/api/quotes/", {"status": "pending", "from": "2030-01-02", "to": "2030-01-03"})
+
+        self.assertEqual(sorted(self.ids(response)), [self.quotes[2].pk, self.quotes[3].pk])
+        # Facets count the other filters but not the status itself.
+        self.assertEqual(response.data["facets"]["PENDING"], 2)
+        self.assertEqual(response.data["facets"]["CONTACTED"], 2)
+
+        response = self.client.get("/api/quotes/", {"plan": self.basic.pk})
+        self.assertEqual(sorted(self.ids(response)), [self.quotes[1].pk, self.quotes[3].pk, self.quotes[5].pk])
+
+    def test_list_takes_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/quotes/", {"page_size": 100})
+        self.assertEqual(len(response.data["results"]), 6)
+
+    def test_invalid_parameters(self):
+        for params in ({"from": "01/02/2030"}, {"plan": "pro"}, {"status": "LOST"}):
+            self.assertEqual(self.client.get("/api/quotes/", params).status_code, 400, params)
+        self.assertEqual(self.client.get("/api/quotes/", {"cursor": "not-a-cursor"}).status_code, 404)
+
+    def test_customers_see_only_their_quotes(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.ids(self.client.get("/api/quotes/")), [self.quotes[0].pk])
@@ -1,4 +1,7 @@
-from rest_framework import viewsets, mixins
+from django.db.models import Count
+from rest_framework import viewsets, mixins, serializers
+from api.filters import filter_date_window, filter_statuses
+from api.pagination import KeysetPagination
 from .models import QuoteRequest
 from .serializers import QuoteRequestSerializer
 from ecommerce.models import Order
@@ -9,19 +12,62 @@ from rest_framework import views, status
 from rest_framework.response import Response
 from rest_framework.decorators import action 
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from . import importer
+
+class QuoteInboxPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 25
+
 
 class QuoteRequestViewSet(viewsets.ModelViewSet):
+    """
+    Quote requests, newest first and keyset-paginated. Lists accept a
+    comma-separated ``status``, ``plan`` and ``from``/``to`` (YYYY-MM-DD,
+    inclusive) filters and carry per-status ``facets`` for the other filters.
+    """
     serializer_class = QuoteRequestSerializer
+    pagination_class = QuoteInboxPagination
     
     def get_queryset(self):
 
         user = self.request.user
         if user.is_authenticated:
             if user.role in [user.Role.EMPLOYEE, user.Role.OWNER]:
-                return QuoteRequest.objects.all().order_by('-created_at')
-            return QuoteRequest.objects.filter(user=user).order_by('-created_at')
+                queryset = QuoteRequest.objects.all()
+            else:
+                queryset = QuoteRequest.objects.filter(user=user)
+            return queryset.select_related('plan__service', 'user').order_by('-created_at', '-id')
         return QuoteRequest.objects.none() 
 
+    def filter_inbox(self, queryset, include_status=True):
+        params = self.request.query_params
+        queryset = filter_date_window(queryset, params, 'created_at')
+
+        if params.get('plan'):
+            try:
+                queryset = queryset.filter(plan_id=int(params['plan']))
+            except ValueError:
+                raise serializers.ValidationError({"error": "'plan' must be an integer."})
+
+        if include_status:
+            queryset = filter_statuses(queryset, params, QuoteRequest.Status.choices)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(self.filter_inbox(queryset))
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['facets'] = self.status_facets(self.filter_inbox(queryset, include_status=False))
+        return response
+
+    def status_facets(self, queryset):
+        """Counts per status in a single GROUP BY, zero-filled."""
+        facets = {value: 0 for value in QuoteRequest.Status.values}
+        for row in queryset.order_by().values('status').annotate(count=Count('id')):
+            facets[row['status']] = row['count']
+        return facets
+
     def get_permissions(self):
 
         if self.action == 'create':
@@ -63,3 +109,29 @@ class ConvertQuoteToOrderView(APIView):
         quote.save()
         serializer = OrderDetailSerializer(order)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class LeadImportView(APIView):
+    """
+    Bulk intake of quote requests from a JSONL or CSV file upload (``file``).
+    Each row needs ``name`` and ``email`` and may carry ``company_name``,
+    ``custom_requirements`` and ``plan`` (id or slug). The format comes from
+    ``format`` or the file name.
+    """
+    permission_classes = [IsEmployeeOrOwner]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "A 'file' upload is required."}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or importer.detect_format(upload.name, upload.content_type)
+        if fmt not in importer.FORMATS:
+            return Response({"error": f"Invalid format. Valid choices: {list(importer.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = importer.read_rows(importer.text_stream(upload.file), fmt)
+        summary, results, error = importer.import_leads(rows)
+        if error:
+            # The rows before the failure were imported; report them too.
+            return Response({"error": error, "summary": summary, "results": results}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"summary": summary, "results": results}, status=status.HTTP_200_OK)
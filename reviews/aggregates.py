@@ -0,0 +1,77 @@
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest
+from .models import PlanReviewStats, Review
+
+RATINGS = range(1, 6)
+RATING_FIELDS = [f'rating_{rating}' for rating in RATINGS]
+STATS_FIELDS = ['review_count', 'rating_total'] + RATING_FIELDS
+# Reviews embedded in catalog responses; the rest are paginated per plan.
+RECENT_REVIEWS_LIMIT = 3
+
+
+def recent_reviews():
+    return Review.objects.select_related('user__profile').order_by('-created_at', '-id')
+
+
+def rebuild_stats(plan_ids):
+    """Recounts the stats of ``plan_ids`` from their reviews in one grouped query."""
+    rows = {plan_id: PlanReviewStats(plan_id=plan_id) for plan_id in plan_ids}
+    if not rows:
+        return 0
+
+    counts = (
+        Review.objects.filter(plan_id__in=rows)
+        .values('plan_id')
+        .annotate(
+            review_count=Count('id'),
+            rating_total=Sum('rating'),
+            **{f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in RATINGS},
+        )
+    )
+    for row in counts:
+        for field in STATS_FIELDS:
+            setattr(rows[row['plan_id']], field, row[field] or 0)
+
+    PlanReviewStats.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['plan'],
+        update_fields=STATS_FIELDS,
+    )
+    return len(rows)
+
+
+def apply_rating(plan_id, rating, sign, recount_missing=True):
+    """
+    Adds (``sign`` = 1) or removes (-1) one review of ``rating`` from the
+    plan's stats. A plan without a stats row yet is recounted instead, which
+    already reflects the saved review; returns False in that case. Deletes
+    pass ``recount_missing=False`` since the plan itself may be going away,
+    and a missing row is built on first read anyway.
+    """
+    def adjust(field, delta):
+        # The counters are unsigned; a decrement on a drifted row stops at
+        # zero instead of failing the CHECK constraint.
+        if delta < 0:
+            return Greatest(F(field) + delta, Value(0))
+        return F(field) + delta
+
+    changes = {
+        'review_count': adjust('review_count', sign),
+        'rating_total': adjust('rating_total', sign * rating),
+    }
+    if rating in RATINGS:
+        changes[f'rating_{rating}'] = adjust(f'rating_{rating}', sign)
+    if PlanReviewStats.objects.filter(plan_id=plan_id).update(**changes):
+        return True
+    if recount_missing:
+        rebuild_stats([plan_id])
+    return False
+
+
+def get_stats(plan):
+    try:
+        return plan.review_stats
+    except PlanReviewStats.DoesNotExist:
+        rebuild_stats([plan.pk])
+        return PlanReviewStats.objects.get(plan_id=plan.pk)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from reviews.aggregates import rebuild_stats
+from services.models import Plan
+
+
+class Command(BaseCommand):
+    help = 'Recounts the per-plan review stats from the reviews table'
+
+    def handle(self, *args, **options):
+        plan_ids = list(Plan.objects.values_list('id', flat=True))
+        total = rebuild_stats(plan_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt review stats for {total} plans."))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:26
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0011_transaction_proof_reference_number_and_more'),
+        ('reviews', '0001_initial'),
+        ('services', '0002_catalogsnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanReviewStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='rating',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['plan', 'created_at', 'id'], name='review_plan_recent_idx'),
+        ),
+        migrations.AddField(
+            model_name='planreviewstats',
+            name='plan',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='review_stats', to='services.plan'),
+        ),
+    ]
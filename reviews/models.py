@@ -1,3 +1,4 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.conf import settings
 from ecommerce.models import Order
@@ -7,12 +8,15 @@ class Review(models.Model):
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='review')
     plan = models.ForeignKey(Plan, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    rating = models.PositiveSmallIntegerField()
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('plan', 'user')
+        indexes = [
+            models.Index(fields=['plan', 'created_at', 'id'], name='review_plan_recent_idx'),
+        ]
 
     def __str__(self):
         return f"Review for {self.plan.name} by {self.user.email}"
@@ -23,4 +27,32 @@ class FAQ(models.Model):
     answer = models.TextField()
 
     def __str__(self):
-        return f"FAQ for {self.plan.name}: {self.question}"
\ No newline at end of file
+        return f"FAQ for {self.plan.name}: {self.question}"
+
+
+class PlanReviewStats(models.Model):
+    """
+    Running review totals of one plan, kept up to date by reviews.signals so
+    catalog pages never aggregate over every review.
+    """
+    plan = models.OneToOneField(Plan, on_delete=models.CASCADE, related_name='review_stats')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return None
+        return round(self.rating_total / self.review_count, 2)
+
+    @property
+    def histogram(self):
+        return {str(rating): getattr(self, f'rating_{rating}') for rating in range(1, 6)}
+
+    def __str__(self):
+        return f"Review stats for plan {self.plan_id}"
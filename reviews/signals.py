@@ -0,0 +1,29 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Review
+from . import aggregates
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk).values_list('plan_id', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def count_saved_review(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    if previous == (instance.plan_id, instance.rating):
+        return
+    if previous and not aggregates.apply_rating(*previous, sign=-1) and previous[0] == instance.plan_id:
+        # The recount already saw the new rating.
+        return
+    aggregates.apply_rating(instance.plan_id, instance.rating, sign=1)
+
+
+@receiver(post_delete, sender=Review)
+def count_deleted_review(sender, instance, **kwargs):
+    aggregates.apply_rating(instance.plan_id, instance.rating, sign=-1, recount_missing=False)
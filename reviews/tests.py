@@ -1,3 +1,56 @@
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
+from ecommerce.models import Order
+from reviews.models import PlanReviewStats, Review
+from services.models import Service, Plan
+from users.models import User
 
-# Create your tests here.
+
+class ReviewStatsTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.other_plan = Plan.objects.create(service=service, name="Pro", slug="pro", description="Pro", price="200.00")
+        self.reviews = [self.review(f"customer{i}@example.com", rating) for i, rating in enumerate([5, 4, 4])]
+
+    def review(self, email, rating):
+        user = User.objects.create_user(email=email, password="x")
+        order = Order.objects.create(user=user, plan=self.plan)
+        return Review.objects.create(order=order, plan=self.plan, user=user, rating=rating, comment="Fine")
+
+    def stats(self, plan=None):
+        return PlanReviewStats.objects.get(plan=plan or self.plan)
+
+    def test_created_reviews_are_counted(self):
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_total, stats.average_rating), (3, 13, 4.33))
+        self.assertEqual(stats.histogram, {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1})
+
+    def test_edits_move_the_rating_and_the_plan(self):
+        review = self.reviews[0]
+        review.rating = 1
+        review.save()
+        self.assertEqual(self.stats().histogram, {"1": 1, "2": 0, "3": 0, "4": 2, "5": 0})
+        self.assertEqual(self.stats().rating_total, 9)
+
+        review.plan = self.other_plan
+        review.save()
+        self.assertEqual(self.stats().review_count, 2)
+        self.assertEqual(self.stats(self.other_plan).rating_1, 1)
+
+    def test_deletes_are_uncounted(self):
+        self.reviews[1].delete()
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_total, stats.rating_4), (2, 9, 1))
+
+    def test_delete_on_drifted_counters_stops_at_zero(self):
+        PlanReviewStats.objects.filter(plan=self.plan).update(review_count=0, rating_total=0, rating_5=0)
+
+        self.reviews[0].delete()
+
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_total, stats.rating_5), (0, 0, 0))
+        call_command("rebuild_review_stats", stdout=StringIO())
+        self.assertEqual(self.stats().review_count, 2)
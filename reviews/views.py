@@ -1,12 +1,23 @@
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, serializers
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from api.pagination import KeysetPagination
 from .models import Review
 from .serializers import ReviewSerializer
 from ecommerce.models import Order
+from services.models import Plan
+
+
+class ReviewPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 20
+
 
 class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all()
+    queryset = Review.objects.select_related('user__profile')
     serializer_class = ReviewSerializer
+    pagination_class = ReviewPagination
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def perform_create(self, serializer):
@@ -17,4 +28,12 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if hasattr(order, 'review'):
             raise serializers.ValidationError("This order has already been reviewed.")
 
-        serializer.save(user=self.request.user, plan=order.plan)
\ No newline at end of file
+        serializer.save(user=self.request.user, plan=order.plan)
+
+    @action(detail=False, methods=['get'], url_path=r'plan/(?P<plan_slug>[^/.]+)')
+    def plan(self, request, plan_slug=None):
+        """Every review of one plan, newest first, a page at a time."""
+        plan = get_object_or_404(Plan, slug=plan_slug)
+        page = self.paginate_queryset(self.get_queryset().filter(plan=plan))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
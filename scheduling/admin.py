@@ -1,8 +1,10 @@
 from django.contrib import admin
 
-from scheduling.models import Appointment, EmployeeAvailability
+from scheduling.models import Appointment, AvailabilityOverride, CalendarFeed, EmployeeAvailability
 
 # Register your models here.
 
 admin.site.register(EmployeeAvailability)
-admin.site.register(Appointment)
\ No newline at end of file
+admin.site.register(Appointment)
+admin.site.register(AvailabilityOverride)
+admin.site.register(CalendarFeed)
@@ -0,0 +1,174 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.utils import timezone
+from .models import EmployeeAvailability, Appointment, AvailabilityOverride
+
+SLOT_MINUTES = 10
+# Slots must leave room for the longest bookable appointment before the
+# employee's working window closes.
+LONGEST_APPOINTMENT_MINUTES = 30
+MAX_RANGE_DAYS = 62
+
+
+def merge_intervals(intervals):
+    """Merges (start, end) pairs into a sorted list of disjoint intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def subtract_intervals(window_start, window_end, busy, cursor=0):
+    """
+    Returns the free parts of [window_start, window_end) given ``busy``, a
+    sorted list of disjoint intervals. ``cursor`` is the index to resume
+    scanning from; the index to resume from for the next, later window is
+    returned alongside the free intervals.
+    """
+    while cursor < len(busy) and busy[cursor][1] <= window_start:
+        cursor += 1
+
+    free = []
+    position = window_start
+    index = cursor
+    while index < len(busy) and busy[index][0] < window_end:
+        busy_start, busy_end = busy[index]
+        if busy_start > position:
+            free.append((position, busy_start))
+        position = max(position, busy_end)
+        index += 1
+    if position < window_end:
+        free.append((position, window_end))
+    return free, cursor
+
+
+def slot_starts(window_start, window_end, free, step, duration, end_margin):
+    """Grid points, anchored at ``window_start``, whose slot fits in ``free``."""
+    latest_start = window_end - end_margin
+    starts = []
+    for free_start, free_end in free:
+        offset = (free_start - window_start) % step
+        slot = free_start if not offset else free_start + (step - offset)
+        while slot + duration <= free_end and slot <= latest_start:
+            starts.append(slot)
+            slot += step
+    return starts
+
+
+def working_window(day, availability):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, availability.start_time), tz)
+    end = timezone.make_aware(datetime.combine(day, availability.end_time), tz)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def daterange(date_from, date_to):
+    day = date_from
+    while day <= date_to:
+        yield day
+        day += timedelta(days=1)
+
+
+def compute_free_intervals(days, availabilities, bookings):
+    """
+    Pure part of the engine, independent of the ORM.
+
+    ``availabilities`` maps weekday -> object with ``start_time``/``end_time``
+    and ``bookings`` is an iterable of (start, end) datetimes. Returns
+    {date: (window_start, window_end, [free intervals])} for every day in
+    ``days`` the employee works.
+    """
+    busy = merge_intervals(bookings)
+
+    result = {}
+    cursor = 0
+    for day in days:
+        availability = availabilities.get(day.weekday())
+        if availability is None:
+            continue
+        window_start, window_end = working_window(day, availability)
+        free, cursor = subtract_intervals(window_start, window_end, busy, cursor)
+        result[day] = (window_start, window_end, free)
+    return result
+
+
+def compute_free_slots(days, availabilities, bookings, step=SLOT_MINUTES, duration=SLOT_MINUTES,
+                       end_margin=LONGEST_APPOINTMENT_MINUTES):
+    """Like ``compute_free_intervals`` but returns {date: [slot start datetimes]}."""
+    step = timedelta(minutes=step)
+    duration = timedelta(minutes=duration)
+    end_margin = timedelta(minutes=end_margin)
+    return {
+        day: slot_starts(window_start, window_end, free, step, duration, end_margin)
+        for day, (window_start, window_end, free) in compute_free_intervals(days, availabilities, bookings).items()
+    }
+
+
+def override_interval(override):
+    """The blocked (start, end) datetimes of an AvailabilityOverride."""
+    tz = timezone.get_current_timezone()
+    if override.start_time is None or override.end_time is None:
+        start = timezone.make_aware(datetime.combine(override.date, datetime.min.time()), tz)
+        return start, start + timedelta(days=1)
+    return (
+        timezone.make_aware(datetime.combine(override.date, override.start_time), tz),
+        timezone.make_aware(datetime.combine(override.date, override.end_time), tz),
+    )
+
+
+def load_schedule(employee_ids, date_from, date_to):
+    """
+    Returns ({employee_id: {weekday: availability}}, {employee_id: [(start, end)]})
+    with one query for availabilities, one for every non-cancelled booking
+    overlapping the window and one for date-specific overrides, which are
+    treated as busy time.
+    """
+    availabilities = defaultdict(dict)
+    for availability in EmployeeAvailability.objects.filter(employee_id__in=employee_ids):
+        availabilities[availability.employee_id][availability.weekday] = availability
+
+    tz = timezone.get_current_timezone()
+    window_start = timezone.make_aware(datetime.combine(date_from, datetime.min.time()), tz)
+    # Overnight working windows can run into the day after date_to.
+    window_end = timezone.make_aware(datetime.combine(date_to + timedelta(days=2), datetime.min.time()), tz)
+
+    bookings = defaultdict(list)
+    booked = (
+        Appointment.objects.filter(
+            employee_id__in=employee_ids,
+            start_time__lt=window_end,
+            end_time__gt=window_start,
+        )
+        .exclude(status=Appointment.Status.CANCELLED)
+        .values_list('employee_id', 'start_time', 'end_time')
+    )
+    for employee_id, start, end in booked:
+        bookings[employee_id].append((start, end))
+
+    overrides = AvailabilityOverride.objects.filter(
+        employee_id__in=employee_ids,
+        date__range=(date_from, date_to + timedelta(days=1)),
+    )
+    for override in overrides:
+        bookings[override.employee_id].append(override_interval(override))
+    return availabilities, bookings
+
+
+def find_free_slots(employee_ids, date_from, date_to, duration=SLOT_MINUTES):
+    """Free slots per employee per day between ``date_from`` and ``date_to`` inclusive."""
+    days = list(daterange(date_from, date_to))
+    if not days or not employee_ids:
+        return {}
+
+    availabilities, bookings = load_schedule(employee_ids, date_from, date_to)
+    return {
+        employee_id: compute_free_slots(days, availabilities[employee_id], bookings[employee_id], duration=duration)
+        for employee_id in employee_ids
+        if employee_id in availabilities
+    }
@@ -0,0 +1,182 @@
+import math
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.utils import timezone
+from .availability import daterange, load_schedule
+from .free_index import index_window
+from .models import DayBitmap
+
+CELL_MINUTES = 10
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+FULL_DAY = (1 << CELLS_PER_DAY) - 1
+BITMAP_BYTES = (CELLS_PER_DAY + 7) // 8
+
+
+def encode(mask):
+    return mask.to_bytes(BITMAP_BYTES, 'little')
+
+
+def decode(bits):
+    return int.from_bytes(bytes(bits), 'little')
+
+
+def span(first_cell, last_cell):
+    """Mask with cells ``first_cell`` (inclusive) to ``last_cell`` (exclusive) set."""
+    first_cell = max(first_cell, 0)
+    last_cell = min(last_cell, CELLS_PER_DAY)
+    if last_cell <= first_cell:
+        return 0
+    return ((1 << (last_cell - first_cell)) - 1) << first_cell
+
+
+def open_cells(start_minute, end_minute):
+    # Only cells entirely inside working hours are bookable.
+    return span(-(-start_minute // CELL_MINUTES), end_minute // CELL_MINUTES)
+
+
+def busy_cells(start_minute, end_minute):
+    # Any cell a booking touches is taken.
+    return span(start_minute // CELL_MINUTES, -(-end_minute // CELL_MINUTES))
+
+
+def minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def day_bounds(day):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()), tz)
+    return start, start + timedelta(days=1)
+
+
+def compile_day(day, availabilities, busy):
+    """
+    Compiles one employee-day. ``availabilities`` maps weekday ->
+    availability and ``busy`` holds (start, end) datetimes of bookings and
+    overrides.
+    """
+    mask = 0
+    availability = availabilities.get(day.weekday())
+    if availability is not None:
+        start, end = minute_of_day(availability.start_time), minute_of_day(availability.end_time)
+        mask |= open_cells(start, end if end > start else 24 * 60)
+
+    # An overnight window opened the previous day spills into this one.
+    previous = availabilities.get((day.weekday() - 1) % 7)
+    if previous is not None and previous.end_time <= previous.start_time:
+        mask |= open_cells(0, minute_of_day(previous.end_time))
+
+    day_start, day_end = day_bounds(day)
+    for start, end in busy:
+        if start >= day_end or end <= day_start:
+            continue
+        first = (max(start, day_start) - day_start).total_seconds()
+        last = (min(end, day_end) - day_start).total_seconds()
+        mask &= ~busy_cells(int(first // 60), math.ceil(last / 60))
+    return mask & FULL_DAY
+
+
+def rebuild(employee_ids, date_from=None, date_to=None):
+    """Recompiles the calendars of ``employee_ids`` for the given days within the horizon."""
+    first_day, last_day = index_window()
+    date_from = max(date_from or first_day, first_day)
+    date_to = min(date_to or last_day, last_day)
+    employee_ids = list(employee_ids)
+    if date_from > date_to or not employee_ids:
+        return 0
+
+    days = list(daterange(date_from, date_to))
+    # Overnight availability of the day before date_from reaches into it.
+    availabilities, busy = load_schedule(employee_ids, date_from - timedelta(days=1), date_to)
+
+    rows = [
+        DayBitmap(
+            employee_id=employee_id,
+            day=day,
+            bits=encode(compile_day(day, availabilities.get(employee_id, {}), busy.get(employee_id, []))),
+        )
+        for employee_id in employee_ids
+        for day in days
+    ]
+    with transaction.atomic():
+        DayBitmap.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['employee', 'day'],
+            update_fields=['bits'],
+        )
+    return len(rows)
+
+
+def needed_cells(start, minutes):
+    """(day, mask) pairs covering ``minutes`` from the aware datetime ``start``."""
+    start = timezone.localtime(start)
+    first = minute_of_day(start)
+    last = first + minutes
+    parts = []
+    day = start.date()
+    while last > 0:
+        parts.append((day, busy_cells(first, min(last, 24 * 60))))
+        first, last = 0, last - 24 * 60
+        day += timedelta(days=1)
+    return parts
+
+
+def load_masks(employee_ids, days):
+    rows = DayBitmap.objects.filter(employee_id__in=employee_ids, day__in=days).values_list('employee_id', 'day', 'bits')
+    return {(employee_id, day): decode(bits) for employee_id, day, bits in rows}
+
+
+def free_staff(employee_ids, start, minutes):
+    """Ids of the employees in ``employee_ids`` free for ``minutes`` from ``start``."""
+    parts = needed_cells(start, minutes)
+    masks = load_masks(employee_ids, [day for day, _ in parts])
+    return [
+        employee_id for employee_id in employee_ids
+        if all(masks.get((employee_id, day), 0) & cells == cells for day, cells in parts)
+    ]
+
+
+def combine(masks, day, employee_ids, require_all=False):
+    """
+    Cells of ``day`` where any (OR) or every (AND) employee in
+    ``employee_ids`` is free, from masks returned by ``load_masks``.
+    """
+    result = FULL_DAY if require_all else 0
+    for employee_id in employee_ids:
+        mask = masks.get((employee_id, day), 0)
+        result = result & mask if require_all else result | mask
+    return result
+
+
+def run_starts(mask, minutes):
+    """Mask of cells that begin ``minutes`` of consecutive free cells."""
+    length = -(-minutes // CELL_MINUTES)
+    starts = mask
+    for shift in range(1, length):
+        starts &= mask >> shift
+    return starts
+
+
+def cell_times(day, mask):
+    day_start, _ = day_bounds(day)
+    return [
+        day_start + timedelta(minutes=cell * CELL_MINUTES)
+        for cell in range(CELLS_PER_DAY)
+        if mask >> cell & 1
+    ]
+
+
+def free_slots(employee_ids, date_from, date_to, minutes=CELL_MINUTES, require_all=False):
+    """
+    {day: [slot start datetimes]} where any, or with ``require_all`` every,
+    employee in ``employee_ids`` is free for ``minutes``, from the compiled
+    calendars. Days outside the index horizon have no slots.
+    """
+    days = list(daterange(date_from, date_to))
+    masks = load_masks(employee_ids, days)
+    return {
+        day: cell_times(day, run_starts(combine(masks, day, employee_ids, require_all), minutes))
+        for day in days
+    }
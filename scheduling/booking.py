@@ -0,0 +1,67 @@
+from datetime import timedelta
+from django.db import transaction
+from users.models import User
+from .models import Appointment
+
+# Upper bound on an appointment's length. It lets the overlap check scan
+# only a bounded start_time range of the (employee, start_time, end_time)
+# index instead of every earlier appointment of the employee.
+MAX_APPOINTMENT_LENGTH = timedelta(hours=24)
+
+
+class BookingConflict(Exception):
+    pass
+
+
+def overlapping(employee_id, start_time, end_time):
+    return (
+        Appointment.objects.filter(
+            employee_id=employee_id,
+            start_time__gt=start_time - MAX_APPOINTMENT_LENGTH,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+        )
+        .exclude(status=Appointment.Status.CANCELLED)
+    )
+
+
+def _check_free(employee_id, start_time, end_time, exclude=None):
+    # Serialises bookings of the same employee; see ``book``.
+    list(User.objects.select_for_update().filter(pk=employee_id).values_list('pk', flat=True))
+    conflicts = overlapping(employee_id, start_time, end_time)
+    if exclude is not None:
+        conflicts = conflicts.exclude(pk=exclude.pk)
+    if conflicts.exists():
+        raise BookingConflict("This time slot is no longer available.")
+
+
+def book(employee, customer, start_time, end_time, **fields):
+    """
+    Creates an appointment unless it overlaps one of the employee's active
+    bookings. Concurrent bookings for the same employee are serialised on the
+    employee's row (and on SQLite by its IMMEDIATE write transactions), so
+    the check and the insert cannot interleave.
+    """
+    with transaction.atomic():
+        _check_free(employee.pk, start_time, end_time)
+        return Appointment.objects.create(
+            customer=customer,
+            employee=employee,
+            start_time=start_time,
+            end_time=end_time,
+            **fields
+        )
+
+
+def reschedule(appointment, **fields):
+    """
+    Applies ``fields`` to ``appointment`` under the same lock and overlap
+    check as ``book``, ignoring the appointment's own current slot.
+    """
+    with transaction.atomic():
+        for name, value in fields.items():
+            setattr(appointment, name, value)
+        if appointment.status != Appointment.Status.CANCELLED:
+            _check_free(appointment.employee_id, appointment.start_time, appointment.end_time, exclude=appointment)
+        appointment.save()
+        return appointment
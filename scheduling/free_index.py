@@ -0,0 +1,105 @@
+import bisect
+from itertools import islice
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .availability import LONGEST_APPOINTMENT_MINUTES, SLOT_MINUTES, compute_free_intervals, daterange, load_schedule
+from .models import FreeInterval
+
+# Days ahead of today kept in the index; run rebuild_free_intervals daily to
+# roll the horizon forward.
+INDEX_HORIZON_DAYS = 60
+
+
+def index_window():
+    today = timezone.localdate()
+    return today, today + timedelta(days=INDEX_HORIZON_DAYS - 1)
+
+
+def rebuild(employee_ids, date_from=None, date_to=None):
+    """
+    Recomputes the free intervals of ``employee_ids`` for the given days,
+    clamped to the index horizon.
+    """
+    first_day, last_day = index_window()
+    date_from = max(date_from or first_day, first_day)
+    date_to = min(date_to or last_day, last_day)
+    employee_ids = list(employee_ids)
+    if date_from > date_to or not employee_ids:
+        return 0
+
+    days = list(daterange(date_from, date_to))
+    availabilities, bookings = load_schedule(employee_ids, date_from, date_to)
+
+    rows = []
+    for employee_id in employee_ids:
+        free_days = compute_free_intervals(days, availabilities.get(employee_id, {}), bookings.get(employee_id, []))
+        for day, (window_start, window_end, free) in free_days.items():
+            rows.extend(
+                FreeInterval(
+                    employee_id=employee_id,
+                    day=day,
+                    window_start=window_start,
+                    window_end=window_end,
+                    start=start,
+                    end=end,
+                    minutes=int((end - start).total_seconds() // 60),
+                )
+                for start, end in free
+            )
+
+    with transaction.atomic():
+        FreeInterval.objects.filter(employee_id__in=employee_ids, day__range=(date_from, date_to)).delete()
+        FreeInterval.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def _slots_in(interval, earliest, step, duration, end_margin):
+    # The same grid and closing margin as availability.slot_starts.
+    latest_start = interval.window_end - end_margin
+    offset = (max(interval.start, earliest) - interval.window_start) % step
+    slot = max(interval.start, earliest)
+    if offset:
+        slot += step - offset
+    while slot + duration <= interval.end and slot <= latest_start:
+        yield slot
+        slot += step
+
+
+def first_available(duration=SLOT_MINUTES, horizon_days=14, limit=5, now=None):
+    """
+    Earliest ``limit`` open slots of ``duration`` minutes across every active
+    employee and owner within ``horizon_days``, as (start, interval) pairs.
+    """
+    now = now or timezone.now()
+    step = timedelta(minutes=SLOT_MINUTES)
+    length = timedelta(minutes=duration)
+    end_margin = timedelta(minutes=LONGEST_APPOINTMENT_MINUTES)
+    last_day = timezone.localdate(now) + timedelta(days=horizon_days)
+
+    intervals = (
+        FreeInterval.objects.filter(
+            end__gte=now + length,
+            day__lte=last_day,
+            minutes__gte=duration,
+            employee__is_active=True,
+            employee__role__in=['EMPLOYEE', 'OWNER'],
+        )
+        .select_related('employee')
+        .order_by('start', 'employee_id')
+    )
+
+    # Intervals arrive ordered by start and every slot of an interval starts at
+    # or after it, so once ``limit`` candidates start before the next interval
+    # does, nothing later can improve the answer.
+    best = []
+    seen = {}
+    for interval in intervals.iterator(chunk_size=200):
+        if len(best) >= limit and interval.start > best[-1][0]:
+            break
+        seen[interval.id] = interval
+        for slot in islice(_slots_in(interval, now, step, length, end_margin), limit):
+            bisect.insort(best, (slot, interval.employee_id, interval.id))
+        del best[limit:]
+
+    return [(slot, seen[interval_id]) for slot, _, interval_id in best]
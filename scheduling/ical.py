@@ -0,0 +1,117 @@
+import secrets
+from datetime import timezone as dt_timezone
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from .models import Appointment, CalendarFeed
+
+PRODID = '-//Global Financial World//Appointments//EN'
+ICAL_STATUS = {
+    Appointment.Status.PENDING: 'TENTATIVE',
+    Appointment.Status.CONFIRMED: 'CONFIRMED',
+    Appointment.Status.COMPLETED: 'CONFIRMED',
+    Appointment.Status.CANCELLED: 'CANCELLED',
+}
+
+
+def get_or_create_feed(user):
+    feed, _ = CalendarFeed.objects.get_or_create(user=user, defaults={'token': secrets.token_urlsafe(32)})
+    return feed
+
+
+def rotate_feed(user):
+    """Replaces the feed token, invalidating every URL handed out before."""
+    feed = get_or_create_feed(user)
+    feed.token = secrets.token_urlsafe(32)
+    feed.save(update_fields=['token'])
+    return feed
+
+
+def feed_appointments(user):
+    return Appointment.objects.filter(Q(customer=user) | Q(employee=user))
+
+
+def feed_version(feed):
+    """
+    (count, last modified) of the feed, from one aggregate over the user's
+    appointments. A create, edit or delete changes the count or the latest
+    updated_at (queryset.update() moves it too, see AppointmentQuerySet),
+    and a rename of the other party moves ``feed.changed_at``.
+    """
+    version = feed_appointments(feed.user).aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    last_modified = max(filter(None, [version['last_modified'], feed.changed_at]), default=None)
+    return version['count'], last_modified
+
+
+def touch_counterpart_feeds(user):
+    """Marks the feeds that show ``user``'s name as changed, in one UPDATE."""
+    return CalendarFeed.objects.filter(
+        Q(user__in=Appointment.objects.filter(employee=user).values('customer_id'))
+        | Q(user__in=Appointment.objects.filter(customer=user).values('employee_id'))
+    ).update(changed_at=timezone.now())
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Splits a content line into 75-octet chunks as RFC 5545 requires."""
+    raw = line.encode('utf-8')
+    chunks = []
+    while len(raw) > 75:
+        cut = 75 if not chunks else 74
+        # Never split inside a multi-byte character.
+        while raw[cut] & 0xC0 == 0x80:
+            cut -= 1
+        chunks.append(raw[:cut])
+        raw = raw[cut:]
+    chunks.append(raw)
+    return b'\r\n '.join(chunks) + b'\r\n'
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def event_lines(appointment, user, domain):
+    other = appointment.customer if appointment.employee_id == user.id else appointment.employee
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:appointment-{appointment.id}@{domain}',
+        f'DTSTAMP:{format_datetime(appointment.updated_at)}',
+        f'LAST-MODIFIED:{format_datetime(appointment.updated_at)}',
+        f'DTSTART:{format_datetime(appointment.start_time)}',
+        f'DTEND:{format_datetime(appointment.end_time)}',
+        f'SUMMARY:{escape(f"Appointment with {other.first_name} {other.last_name}".strip())}',
+        f'STATUS:{ICAL_STATUS.get(appointment.status, "TENTATIVE")}',
+    ]
+    if appointment.notes:
+        lines.append(f'DESCRIPTION:{escape(appointment.notes)}')
+    if appointment.meeting_link:
+        lines.append(f'URL:{appointment.meeting_link}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def render_feed(user, domain, chunk_size=500):
+    """
+    Yields the feed as encoded content lines, reading appointments in chunks
+    so memory stays flat however long the history is.
+    """
+    for line in ('BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH'):
+        yield fold(line)
+
+    appointments = (
+        feed_appointments(user)
+        .select_related('customer', 'employee')
+        .order_by('start_time', 'id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for appointment in appointments:
+        for line in event_lines(appointment, user, domain):
+            yield fold(line)
+
+    yield fold('END:VCALENDAR')
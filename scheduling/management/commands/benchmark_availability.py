@@ -0,0 +1,81 @@
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from scheduling.availability import compute_free_slots, daterange
+
+
+def legacy_slots(target_date, availability, booked_slots):
+    """The per-slot rescan SchedulingView used before the interval engine."""
+    available_slots = []
+    slot_start = datetime.combine(target_date, availability.start_time)
+    day_end = datetime.combine(target_date, availability.end_time)
+    durations = [10, 20, 30]
+
+    while slot_start < day_end:
+        is_available = True
+        for booked_start, booked_end in booked_slots:
+            booked_start_dt = datetime.combine(target_date, booked_start)
+            booked_end_dt = datetime.combine(target_date, booked_end)
+            if slot_start < booked_end_dt and (slot_start + timedelta(minutes=min(durations))) > booked_start_dt:
+                is_available = False
+                break
+        if is_available and slot_start + timedelta(minutes=max(durations)) <= day_end:
+            available_slots.append(slot_start.strftime('%H:%M'))
+        slot_start += timedelta(minutes=min(durations))
+    return available_slots
+
+
+class Command(BaseCommand):
+    help = 'Compares the interval availability engine with the legacy per-slot loop on synthetic data (no database access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--employees', type=int, default=20)
+        parser.add_argument('--bookings-per-day', type=int, default=12)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        days = list(daterange(date(2030, 1, 7), date(2030, 1, 7) + timedelta(days=options['days'] - 1)))
+        availability = SimpleNamespace(start_time=dt_time(8, 0), end_time=dt_time(20, 0))
+        weekly = {weekday: availability for weekday in range(7)}
+
+        employees = []
+        for _ in range(options['employees']):
+            bookings = []
+            for day in days:
+                for _ in range(options['bookings_per_day']):
+                    start = datetime.combine(day, dt_time(8, 0)) + timedelta(minutes=10 * rng.randrange(72))
+                    bookings.append((start, start + timedelta(minutes=rng.choice([10, 20, 30]))))
+            employees.append(bookings)
+
+        started = time.perf_counter()
+        legacy_total = 0
+        for bookings in employees:
+            for day in days:
+                booked = [(s.time(), e.time()) for s, e in bookings if s.date() == day]
+                legacy_total += len(legacy_slots(day, availability, booked))
+        legacy_seconds = time.perf_counter() - started
+
+        tz = timezone.get_current_timezone()
+        aware = [[(timezone.make_aware(s, tz), timezone.make_aware(e, tz)) for s, e in bookings] for bookings in employees]
+        started = time.perf_counter()
+        engine_total = 0
+        for bookings in aware:
+            for slots in compute_free_slots(days, weekly, bookings).values():
+                engine_total += len(slots)
+        engine_seconds = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{options['employees']} employees x {options['days']} days, "
+            f"{options['bookings_per_day']} bookings/day"
+        )
+        self.stdout.write(f"legacy loop:     {legacy_seconds * 1000:9.1f} ms ({legacy_total} slots)")
+        self.stdout.write(f"interval engine: {engine_seconds * 1000:9.1f} ms ({engine_total} slots)")
+        if engine_total != legacy_total:
+            self.stdout.write(self.style.ERROR("Slot counts differ between implementations."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Speed-up: {legacy_seconds / engine_seconds:.1f}x"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from scheduling import bitmap
+from scheduling.free_index import index_window, rebuild
+from scheduling.models import DayBitmap, FreeInterval
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the free-interval index and compiled calendars of every employee and owner and rolls their horizon forward'
+    chunk_size = 100
+
+    def handle(self, *args, **options):
+        first_day, last_day = index_window()
+        expired, _ = FreeInterval.objects.filter(day__lt=first_day).delete()
+        DayBitmap.objects.filter(day__lt=first_day).delete()
+
+        employee_ids = list(User.objects.filter(role__in=['EMPLOYEE', 'OWNER']).values_list('id', flat=True))
+        total = 0
+        for offset in range(0, len(employee_ids), self.chunk_size):
+            chunk = employee_ids[offset:offset + self.chunk_size]
+            total += rebuild(chunk)
+            bitmap.rebuild(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} free intervals for {len(employee_ids)} staff from {first_day} to {last_day} "
+            f"({expired} expired rows removed)."
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0002_appointment_meeting_link_appointment_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FreeInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('window_start', models.DateTimeField()),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('minutes', models.PositiveIntegerField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='free_intervals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'day'], name='free_interval_employee_day_idx'), models.Index(fields=['start', 'minutes'], name='free_interval_start_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0003_freeinterval'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('employee', models.ForeignKey(limit_choices_to={'role__in': ['EMPLOYEE', 'OWNER']}, on_delete=django.db.models.deletion.CASCADE, related_name='availability_overrides', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'date'], name='override_employee_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DayBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bits', models.BinaryField(max_length=18)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_bitmaps', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='day_bitmap_day_idx')],
+                'unique_together': {('employee', 'day')},
+            },
+        ),
+    ]
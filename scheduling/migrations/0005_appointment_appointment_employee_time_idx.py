@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0004_availabilityoverride_daybitmap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['employee', 'start_time', 'end_time'], name='appointment_employee_time_idx'),
+        ),
+    ]
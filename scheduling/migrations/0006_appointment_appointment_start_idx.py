@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0005_appointment_appointment_employee_time_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['start_time', 'id'], name='appointment_start_idx'),
+        ),
+    ]
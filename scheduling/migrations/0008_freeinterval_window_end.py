@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:02
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def backfill_window_end(apps, schema_editor):
+    # The latest free time of the day is the closest stored value to the end
+    # of the working window; rebuild_free_intervals recomputes it exactly.
+    FreeInterval = apps.get_model('scheduling', 'FreeInterval')
+    day_end = (
+        FreeInterval.objects.filter(employee=OuterRef('employee'), day=OuterRef('day'))
+        .order_by().values('employee', 'day').annotate(latest=Max('end')).values('latest')
+    )
+    FreeInterval.objects.update(window_end=Subquery(day_end))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0007_appointment_updated_at_calendarfeed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='freeinterval',
+            name='window_end',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_window_end, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='freeinterval',
+            name='window_end',
+            field=models.DateTimeField(),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0008_freeinterval_window_end'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarfeed',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
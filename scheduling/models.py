@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from datetime import time
 
 class EmployeeAvailability(models.Model):
@@ -30,6 +31,15 @@ class EmployeeAvailability(models.Model):
         return f"{self.employee.email}'s availability on {self.get_weekday_display()}"
 
 
+class AppointmentQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # auto_now only applies to save(); the calendar feed version reads
+        # updated_at, so bulk updates have to move it too.
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+
 class Appointment(models.Model):
 
     class Status(models.TextChoices):
@@ -55,6 +65,121 @@ class Appointment(models.Model):
     notes = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     meeting_link = models.URLField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AppointmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'start_time', 'end_time'], name='appointment_employee_time_idx'),
+            models.Index(fields=['start_time', 'id'], name='appointment_start_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so an appointment handed to another employee refreshes
+        # the previous employee's stats as well.
+        instance._loaded_employee_id = instance.__dict__.get('employee_id')
+        return instance
 
     def __str__(self):
         return f"Appointment with {self.employee.email} and {self.customer.email} on {self.start_time.strftime('%Y-%m-%d %H:%M')}"
+
+
+class AvailabilityOverride(models.Model):
+    """
+    Date-specific time an employee is not available, such as a holiday
+    (no times, the whole day) or a break.
+    """
+    employee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='availability_overrides',
+        limit_choices_to={'role__in': ['EMPLOYEE', 'OWNER']}
+    )
+    date = models.DateField()
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    reason = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'date'], name='override_employee_date_idx'),
+        ]
+
+    def __str__(self):
+        if self.start_time is None:
+            return f"{self.employee.email} unavailable on {self.date}"
+        return f"{self.employee.email} unavailable on {self.date} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
+class FreeInterval(models.Model):
+    """
+    Precomputed free time of one employee within one working day. Maintained
+    by scheduling.free_index from availabilities and bookings.
+    """
+    employee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='free_intervals',
+    )
+    day = models.DateField()
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    minutes = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'day'], name='free_interval_employee_day_idx'),
+            models.Index(fields=['start', 'minutes'], name='free_interval_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} free {self.start:%Y-%m-%d %H:%M}-{self.end:%H:%M}"
+
+
+class DayBitmap(models.Model):
+    """
+    One employee-day compiled into 144 bits, one per 10-minute cell starting
+    at midnight. A set bit means the cell is inside working hours and not
+    booked or blocked. Maintained by scheduling.bitmap.
+    """
+    employee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='day_bitmaps',
+    )
+    day = models.DateField()
+    bits = models.BinaryField(max_length=18)
+
+    class Meta:
+        unique_together = ('employee', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='day_bitmap_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} calendar for {self.day}"
+
+
+class CalendarFeed(models.Model):
+    """
+    Secret token giving read-only access to a user's appointments as an
+    iCalendar feed, for calendar apps that cannot send a JWT.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed',
+    )
+    token = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Moved when something the feed shows changes outside the user's own
+    # appointments, such as the other party's name.
+    changed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Calendar feed of {self.user.email}"
@@ -1,9 +1,11 @@
 from rest_framework import serializers
-from .models import EmployeeAvailability, Appointment
+from .models import EmployeeAvailability, Appointment, AvailabilityOverride
+from .booking import MAX_APPOINTMENT_LENGTH, BookingConflict, book, reschedule
 from users.serializers import UserSerializer
-from users.models import User
-from django.utils.crypto import get_random_string
-from django.core.mail import send_mail
+from users.models import User, GuestWelcome
+from users.provisioning import provision_guest
+from django.db import transaction
+from communications.outbox import queue_email
 from django.conf import settings
 
 class EmployeeAvailabilitySerializer(serializers.ModelSerializer):
@@ -13,6 +15,22 @@ class EmployeeAvailabilitySerializer(serializers.ModelSerializer):
         read_only_fields = ['employee']
 
 
+class AvailabilityOverrideSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityOverride
+        fields = ['id', 'employee', 'date', 'start_time', 'end_time', 'reason']
+        read_only_fields = ['employee']
+
+    def validate(self, attrs):
+        start_time = attrs.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = attrs.get('end_time', getattr(self.instance, 'end_time', None))
+        if (start_time is None) != (end_time is None):
+            raise serializers.ValidationError("Provide both 'start_time' and 'end_time', or neither for a whole day.")
+        if start_time is not None and end_time <= start_time:
+            raise serializers.ValidationError({"end_time": "End time must be after start time."})
+        return attrs
+
+
 class AppointmentSerializer(serializers.ModelSerializer):
     customer = UserSerializer(read_only=True)
     employee = UserSerializer(read_only=True)
@@ -29,6 +47,17 @@ class AppointmentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['customer', 'status', 'meeting_link']
 
+    def validate(self, attrs):
+        start_time = attrs.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = attrs.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time and end_time:
+            if end_time <= start_time:
+                raise serializers.ValidationError({"end_time": "End time must be after start time."})
+            if end_time - start_time > MAX_APPOINTMENT_LENGTH:
+                raise serializers.ValidationError({"end_time": "An appointment cannot be longer than 24 hours."})
+        return attrs
+
+    @transaction.atomic
     def create(self, validated_data):
         # Extract fields that are not part of the Appointment model
         email = validated_data.pop('email', None)
@@ -53,32 +82,15 @@ class AppointmentSerializer(serializers.ModelSerializer):
         
         # 2. If guest, use the email provided
         elif email:
-            customer, created = User.objects.get_or_create(
-                email=email,
-                defaults={
-                    'role': User.Role.CUSTOMER,
-                    'first_name': 'Guest',
-                    'last_name': 'User',
-                }
+            # NEW USER: credentials and the "Welcome" email are sent by the
+            # provision_guests worker
+            customer, created = provision_guest(
+                email,
+                GuestWelcome.Kind.BOOKING,
+                first_name='Guest',
+                last_name='User',
             )
-
-            if created:
-                # NEW USER: Generate password and send "Welcome" email
-                temp_password = get_random_string(length=10)
-                customer.set_password(temp_password)
-                customer.save()
-
-                subject = "Welcome to Global Financial World - Account Created"
-                message = (
-                    f"Hi {customer.first_name},\n\n"
-                    "You have successfully booked an appointment! An account has been created for you.\n\n"
-                    "Please log in to manage your appointments using these credentials:\n"
-                    f"Email: {customer.email}\n"
-                    f"Temporary Password: {temp_password}\n\n"
-                    "Thanks,\nGlobal Financial World Team"
-                )
-                self.send_email(customer.email, subject, message)
-            else:
+            if not created:
                 # EXISTING USER (but not logged in): Send "Booking Received" email
                 self.send_booking_confirmation(customer)
 
@@ -88,14 +100,25 @@ class AppointmentSerializer(serializers.ModelSerializer):
                 {"email": "This field is required for guest bookings."}
             )
 
-        # Create the appointment
-        appointment = Appointment.objects.create(
-            customer=customer,
-            employee=employee,
-            **validated_data
-        )
+        # Create the appointment, rejecting it if the slot was taken meanwhile
+        try:
+            appointment = book(employee, customer, **validated_data)
+        except BookingConflict as e:
+            raise serializers.ValidationError({"start_time": str(e)})
         return appointment
 
+    def update(self, instance, validated_data):
+        validated_data.pop('email', None)
+        employee_id = validated_data.get('employee_id', instance.employee_id)
+        if employee_id != instance.employee_id and not User.objects.filter(id=employee_id).exists():
+            raise serializers.ValidationError({"employee_id": "Invalid employee ID."})
+
+        # Moving the appointment goes through the same conflict check as booking
+        try:
+            return reschedule(instance, **validated_data)
+        except BookingConflict as e:
+            raise serializers.ValidationError({"start_time": str(e)})
+
     def send_booking_confirmation(self, user):
         """Helper to send a standard booking received email."""
         subject = "Appointment Request Received"
@@ -107,10 +130,9 @@ class AppointmentSerializer(serializers.ModelSerializer):
         self.send_email(user.email, subject, message)
 
     def send_email(self, to_email, subject, message):
-        send_mail(
+        queue_email(
             subject,
             message,
             from_email=settings.EMAIL_HOST_USER,
             recipient_list=[to_email],
-            fail_silently=False 
         )
\ No newline at end of file
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Appointment, AvailabilityOverride, EmployeeAvailability
+from . import bitmap, free_index, ical
+
+
+def refresh_schedule(employee_id, date_from=None, date_to=None):
+    """Refreshes the free-interval index and the compiled calendar of one employee."""
+    # An overnight working window that started the previous day can also
+    # contain the changed time.
+    free_index.rebuild([employee_id], date_from and date_from - timedelta(days=1), date_to)
+    bitmap.rebuild([employee_id], date_from, date_to)
+
+
+def refresh_booking(employee_id, start, end):
+    refresh_schedule(employee_id, timezone.localdate(start), timezone.localdate(end))
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_previous_booking(sender, instance, **kwargs):
+    # A moved or reassigned appointment frees time in its old slot as well.
+    instance._previous_booking = None
+    if instance.pk:
+        instance._previous_booking = (
+            Appointment.objects.filter(pk=instance.pk)
+            .values_list('employee_id', 'start_time', 'end_time')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def refresh_schedule_on_booking_change(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_booking', None)
+    if previous and previous != (instance.employee_id, instance.start_time, instance.end_time):
+        refresh_booking(*previous)
+    refresh_booking(instance.employee_id, instance.start_time, instance.end_time)
+
+
+@receiver(pre_save, sender=AvailabilityOverride)
+def remember_previous_override(sender, instance, **kwargs):
+    instance._previous_override = None
+    if instance.pk:
+        instance._previous_override = (
+            AvailabilityOverride.objects.filter(pk=instance.pk)
+            .values_list('employee_id', 'date')
+            .first()
+        )
+
+
+@receiver(post_save, sender=AvailabilityOverride)
+@receiver(post_delete, sender=AvailabilityOverride)
+def refresh_schedule_on_override_change(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_override', None)
+    if previous and previous != (instance.employee_id, instance.date):
+        refresh_schedule(previous[0], previous[1], previous[1])
+    refresh_schedule(instance.employee_id, instance.date, instance.date)
+
+
+@receiver(post_save, sender=EmployeeAvailability)
+@receiver(post_delete, sender=EmployeeAvailability)
+def refresh_schedule_on_availability_change(sender, instance, **kwargs):
+    refresh_schedule(instance.employee_id)
+
+
+@receiver(post_save, sender='users.User')
+def touch_feeds_on_rename(sender, instance, created, update_fields=None, **kwargs):
+    # Other people's feeds show this user's name in their event summaries.
+    if created or (update_fields is not None and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    ical.touch_counterpart_feeds(instance)
@@ -1,3 +1,424 @@
-from django.test import TestCase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as clock, timedelta
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import User
+from scheduling.availability import compute_free_slots
+from scheduling.ical import get_or_create_feed
+from scheduling.models import Appointment, AvailabilityOverride, EmployeeAvailability
 
-# Create your tests here.
+
+class ConcurrentBookingTests(TransactionTestCase):
+    requests = 300
+    workers = 16
+    distinct_slots = 30
+
+    def setUp(self):
+        self.employee = User.objects.create_user(email='employee@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.customers = [
+            User.objects.create_user(email=f'customer{i}@example.com', password='x')
+            for i in range(self.workers)
+        ]
+        self.day_start = timezone.make_aware(datetime(2030, 1, 7, 9, 0))
+
+    def book(self, index):
+        # Every slot is requested several times. Every third slot starts 10
+        # minutes late, so it also overlaps the slot after it.
+        start = self.day_start + timedelta(minutes=30 * (index % self.distinct_slots) + 10 * (index % 3 == 0))
+        client = APIClient()
+        client.force_authenticate(self.customers[index % self.workers])
+        started = time.perf_counter()
+        try:
+            response = client.post('/api/appointments/', {
+                'employee_id': self.employee.id,
+                'start_time': start.isoformat(),
+                'end_time': (start + timedelta(minutes=30)).isoformat(),
+            }, format='json')
+            return response.status_code, time.perf_counter() - started
+        finally:
+            connection.close()
+
+    def test_parallel_bookings_never_double_book(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self.book, range(self.requests)))
+        statuses = [status for status, _ in results]
+
+        self.assertEqual(set(statuses) - {201, 400}, set())
+        booked = list(Appointment.objects.filter(employee=self.employee).order_by('start_time'))
+        self.assertEqual(len(booked), statuses.count(201))
+        for previous, current in zip(booked, booked[1:]):
+            self.assertLessEqual(previous.end_time, current.start_time)
+        # Of every three slots the late one and the one after it exclude
+        # each other; whichever wins, exactly two of the three are booked.
+        self.assertEqual(len(booked), self.distinct_slots * 2 // 3)
+        # Waiting on the booking lock stays well short of the database's
+        # 20 second busy timeout, and bookings do not queue behind each other.
+        latencies = [elapsed for _, elapsed in results]
+        self.assertLess(max(latencies), 5.0)
+        self.assertLess(sum(latencies) / len(latencies), 0.5)
+
+
+class AvailabilityTests(TestCase):
+
+    def setUp(self):
+        self.employee = User.objects.create_user(email='employee@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.colleague = User.objects.create_user(email='colleague@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.customer = User.objects.create_user(email='customer@example.com', password='x')
+        for employee in (self.employee, self.colleague):
+            for weekday in (EmployeeAvailability.Weekday.MONDAY, EmployeeAvailability.Weekday.TUESDAY):
+                EmployeeAvailability.objects.create(
+                    employee=employee, weekday=weekday, start_time=clock(9, 0), end_time=clock(11, 0),
+                )
+        # 2030-01-07 is a Monday.
+        self.monday = timezone.make_aware(datetime(2030, 1, 7, 9, 30))
+        self.client = APIClient()
+
+    def book(self, start, minutes=30, status=Appointment.Status.PENDING):
+        return Appointment.objects.create(
+            customer=self.customer, employee=self.employee, start_time=start,
+            end_time=start + timedelta(minutes=minutes), status=status,
+        )
+
+    def test_single_day_skips_bookings_and_the_closing_margin(self):
+        self.book(self.monday)
+        self.book(self.monday + timedelta(hours=1), status=Appointment.Status.CANCELLED)
+
+        response = self.client.get('/api/available-slots/', {'date': '2030-01-07', 'employee_id': self.employee.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, ['09:00', '09:10', '09:20', '10:00', '10:10', '10:20', '10:30'])
+
+    def test_range_returns_slots_per_employee_per_day(self):
+        self.book(self.monday, minutes=90)
+        AvailabilityOverride.objects.create(employee=self.employee, date=date(2030, 1, 8), reason='Holiday')
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/available-slots/', {
+                'date_from': '2030-01-07',
+                'date_to': '2030-01-09',
+                'employee_ids': f'{self.employee.id},{self.colleague.id}',
+                'duration': 30,
+            })
+
+        self.assertEqual(response.status_code, 200)
+        days = {row['employee_id']: row['days'] for row in response.data}
+        self.assertEqual(days[self.employee.id], {'2030-01-07': ['09:00'], '2030-01-08': []})
+        self.assertEqual(days[self.colleague.id]['2030-01-08'], ['09:00', '09:10', '09:20', '09:30', '09:40', '09:50', '10:00', '10:10', '10:20', '10:30'])
+        self.assertNotIn('2030-01-09', days[self.colleague.id])
+
+    def test_range_validation(self):
+        for params in (
+            {'date_from': '2030-01-07'},
+            {'date_from': '2030-01-08', 'date_to': '2030-01-07'},
+            {'date_from': '2030-01-01', 'date_to': '2030-06-01'},
+            {'date_from': '2030-01-07', 'date_to': '2030-01-08', 'duration': '0'},
+        ):
+            self.assertEqual(self.client.get('/api/available-slots/', params).status_code, 400, params)
+
+    def test_overnight_window_runs_into_the_next_day(self):
+        availability = EmployeeAvailability(weekday=0, start_time=clock(22, 0), end_time=clock(1, 0))
+        monday = date(2030, 1, 7)
+        booked = timezone.make_aware(datetime(2030, 1, 7, 23, 0))
+
+        slots = compute_free_slots([monday], {0: availability}, [(booked, booked + timedelta(minutes=30))], duration=30)
+
+        self.assertEqual(
+            [timezone.localtime(slot).strftime('%H:%M') for slot in slots[monday]],
+            ['22:00', '22:10', '22:20', '22:30', '23:30', '23:40', '23:50', '00:00', '00:10', '00:20', '00:30'],
+        )
+
+
+class FirstAvailableSlotTests(TestCase):
+
+    def setUp(self):
+        self.employee = User.objects.create_user(
+            email='employee@example.com', password='x', role=User.Role.EMPLOYEE, first_name='Ada', last_name='Byron',
+        )
+        self.tomorrow = timezone.localdate() + timedelta(days=1)
+        EmployeeAvailability.objects.create(
+            employee=self.employee, weekday=self.tomorrow.weekday(), start_time=clock(9, 0), end_time=clock(11, 0),
+        )
+        self.client = APIClient()
+
+    def test_matches_the_slots_of_the_scheduling_view(self):
+        for duration in (10, 20, 60):
+            slots = self.client.get('/api/available-slots/', {
+                'date_from': self.tomorrow.isoformat(),
+                'date_to': self.tomorrow.isoformat(),
+                'employee_ids': self.employee.id,
+                'duration': duration,
+            }).data[0]['days'][self.tomorrow.isoformat()]
+
+            response = self.client.get('/api/first-available-slots/', {'duration': duration, 'horizon': 2, 'limit': 50})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([timezone.localtime(datetime.fromisoformat(row['start_time'])).strftime('%H:%M') for row in response.data], slots)
+
+    def test_leaves_the_closing_margin_free(self):
+        response = self.client.get('/api/first-available-slots/', {'duration': 10, 'horizon': 2, 'limit': 50})
+
+        starts = [datetime.fromisoformat(row['start_time']) for row in response.data]
+        self.assertEqual(timezone.localtime(starts[-1]).strftime('%H:%M'), '10:30')
+        self.assertEqual(response.data[0]['full_name'], 'Ada Byron')
+
+
+class CompiledCalendarTests(TestCase):
+
+    def setUp(self):
+        self.employee = User.objects.create_user(email='employee@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.colleague = User.objects.create_user(email='colleague@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.customer = User.objects.create_user(email='customer@example.com', password='x')
+        self.tomorrow = timezone.localdate() + timedelta(days=1)
+        EmployeeAvailability.objects.create(
+            employee=self.employee, weekday=self.tomorrow.weekday(), start_time=clock(9, 0), end_time=clock(11, 0),
+        )
+        EmployeeAvailability.objects.create(
+            employee=self.colleague, weekday=self.tomorrow.weekday(), start_time=clock(10, 0), end_time=clock(12, 0),
+        )
+        self.client = APIClient()
+
+    def at(self, hour, minute=0):
+        return timezone.make_aware(datetime.combine(self.tomorrow, clock(hour, minute)))
+
+    def free_staff(self, start, duration=30):
+        response = self.client.get('/api/free-staff/', {'start': start.isoformat(), 'duration': duration})
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data}
+
+    def team_slots(self, **params):
+        response = self.client.get('/api/team-slots/', {
+            'date_from': self.tomorrow.isoformat(),
+            'date_to': self.tomorrow.isoformat(),
+            'employee_ids': f'{self.employee.id},{self.colleague.id}',
+            **params,
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.data[self.tomorrow.isoformat()]
+
+    def test_free_staff_follows_bookings(self):
+        self.assertEqual(self.free_staff(self.at(10, 15)), {self.employee.id, self.colleague.id})
+
+        Appointment.objects.create(
+            customer=self.customer, employee=self.employee, start_time=self.at(10, 30), end_time=self.at(11),
+        )
+
+        self.assertEqual(self.free_staff(self.at(10, 15)), {self.colleague.id})
+        self.assertEqual(self.free_staff(self.at(9), duration=30), {self.employee.id})
+
+    def test_free_staff_rejects_bad_start_times(self):
+        for start in ('', 'tomorrow', '2026-13-40T10:00'):
+            response = self.client.get('/api/free-staff/', {'start': start})
+            self.assertEqual(response.status_code, 400, start)
+
+    def test_team_slots_match_any_or_all(self):
+        self.assertEqual(self.team_slots(duration=30, match='all'), ['10:00', '10:10', '10:20', '10:30'])
+        anyone = self.team_slots(duration=30)
+        self.assertEqual((anyone[0], anyone[-1], len(anyone)), ('09:00', '11:30', 16))
+
+    def test_team_slots_of_one_employee_for_a_week(self):
+        response = self.client.get('/api/team-slots/', {
+            'date_from': self.tomorrow.isoformat(),
+            'date_to': (self.tomorrow + timedelta(days=6)).isoformat(),
+            'employee_ids': self.employee.id,
+            'duration': 60,
+        })
+
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(response.data[self.tomorrow.isoformat()], ['09:00', '09:10', '09:20', '09:30', '09:40', '09:50', '10:00'])
+        self.assertEqual(sum(len(slots) for slots in response.data.values()), 7)
+
+    def test_team_slots_validation(self):
+        for params in ({'date_to': ''}, {'date_to': '2030-01-01'}, {'employee_ids': ''}, {'match': 'some'}, {'duration': '-5'}):
+            response = self.client.get('/api/team-slots/', {
+                'date_from': '2030-01-07', 'date_to': '2030-01-08', 'employee_ids': self.employee.id, **params,
+            })
+            self.assertEqual(response.status_code, 400, params)
+
+
+class AppointmentUpdateTests(TestCase):
+
+    def setUp(self):
+        self.employee = User.objects.create_user(email='employee@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.customer = User.objects.create_user(email='customer@example.com', password='x')
+        start = timezone.make_aware(datetime(2030, 1, 7, 9, 0))
+        self.first = self.appointment(start)
+        self.second = self.appointment(start + timedelta(hours=1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def appointment(self, start, **fields):
+        return Appointment.objects.create(
+            customer=self.customer, employee=self.employee, start_time=start,
+            end_time=start + timedelta(minutes=30), **fields
+        )
+
+    def move(self, appointment, minutes, method='patch'):
+        start = appointment.start_time + timedelta(minutes=minutes)
+        data = {'start_time': start.isoformat(), 'end_time': (start + timedelta(minutes=30)).isoformat()}
+        if method == 'put':
+            data['employee_id'] = self.employee.id
+        return getattr(self.client, method)(f'/api/appointments/{appointment.id}/', data, format='json')
+
+    def test_update_cannot_move_onto_another_booking(self):
+        for method in ('patch', 'put'):
+            response = self.move(self.second, -45, method)
+            self.assertEqual(response.status_code, 400, method)
+            self.assertIn('start_time', response.data)
+
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.start_time, timezone.make_aware(datetime(2030, 1, 7, 10, 0)))
+
+    def test_update_may_overlap_its_own_slot(self):
+        self.assertEqual(self.move(self.second, 10).status_code, 200)
+        self.assertEqual(self.move(self.second, -30, 'put').status_code, 200)
+
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.start_time, timezone.make_aware(datetime(2030, 1, 7, 9, 30)))
+
+    def test_cancelled_bookings_do_not_block_and_cannot_be_revived_into_a_conflict(self):
+        cancelled = self.appointment(self.first.start_time, status=Appointment.Status.CANCELLED)
+        self.client.force_authenticate(self.employee)
+
+        response = self.client.patch(f'/api/appointments/{cancelled.id}/update_status/', {'status': 'PENDING'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.move(self.first, 10).status_code, 200)
+
+
+class CalendarFeedTests(TestCase):
+
+    def setUp(self):
+        self.employee = User.objects.create_user(email='employee@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.customer = User.objects.create_user(email='customer@example.com', password='x', first_name='Ada', last_name='Byron')
+        start = timezone.make_aware(datetime(2030, 1, 7, 9, 0))
+        self.appointment = Appointment.objects.create(
+            customer=self.customer, employee=self.employee, start_time=start, end_time=start + timedelta(minutes=30),
+        )
+        self.url = f'/api/calendar/{get_or_create_feed(self.employee).token}.ics'
+
+    def fetch(self, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(self.url, headers=headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_feed_lists_appointments_and_honours_the_etag(self):
+        response = self.fetch()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Appointment with Ada Byron', self.body(response))
+        self.assertIn('Last-Modified', response)
+        # The feed lookup and one aggregate, however long the history is.
+        with self.assertNumQueries(2):
+            self.assertEqual(self.fetch(response['ETag']).status_code, 304)
+        response = self.client.get(self.url, headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_queryset_updates(self):
+        etag = self.fetch()['ETag']
+
+        Appointment.objects.filter(pk=self.appointment.pk).update(notes='Bring the ledgers')
+
+        response = self.fetch(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('DESCRIPTION:Bring the ledgers', self.body(response))
+
+    def test_etag_changes_when_the_other_party_is_renamed(self):
+        etag = self.fetch()['ETag']
+
+        self.customer.last_name = 'Lovelace'
+        self.customer.save()
+
+        response = self.fetch(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Appointment with Ada Lovelace', self.body(response))
+
+        # Saves that leave the name alone, such as a login, do not touch it.
+        self.customer.save(update_fields=['last_login'])
+        self.assertEqual(self.fetch(response['ETag']).status_code, 304)
+
+    def test_unknown_tokens_are_not_found(self):
+        self.assertEqual(self.client.get('/api/calendar/nope.ics').status_code, 404)
+
+
+class AppointmentListTests(TestCase):
+
+    def setUp(self):
+        self.employee = User.objects.create_user(email='employee@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.colleague = User.objects.create_user(email='colleague@example.com', password='x', role=User.Role.EMPLOYEE)
+        self.customer = User.objects.create_user(email='customer@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def appointment(self, day, hour=9, employee=None, status=Appointment.Status.PENDING):
+        start = timezone.make_aware(datetime(2030, 1, day, hour, 0))
+        return Appointment.objects.create(
+            customer=self.customer, employee=employee or self.employee, start_time=start,
+            end_time=start + timedelta(minutes=30), status=status,
+        )
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_filters(self):
+        early = self.appointment(7, status=Appointment.Status.CONFIRMED)
+        middle = self.appointment(8, employee=self.colleague)
+        late = self.appointment(9, status=Appointment.Status.CANCELLED)
+
+        self.assertEqual(self.ids(self.client.get('/api/appointments/', {'from': '2030-01-08'})), [middle.id, late.id])
+        self.assertEqual(self.ids(self.client.get('/api/appointments/', {'to': '2030-01-08'})), [early.id, middle.id])
+        self.assertEqual(self.ids(self.client.get('/api/appointments/', {'employee': self.colleague.id})), [middle.id])
+        self.assertEqual(
+            self.ids(self.client.get('/api/appointments/', {'status': 'confirmed, cancelled'})), [early.id, late.id],
+        )
+
+        for params in ({'from': '7 Jan'}, {'employee': 'me'}, {'status': 'booked'}):
+            response = self.client.get('/api/appointments/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.data)
+
+    def test_cursor_walks_every_page_in_start_order(self):
+        appointments = [self.appointment(day, hour) for day in (7, 8) for hour in (9, 10, 11)]
+        # Same start, different employee: the id breaks the tie.
+        appointments.insert(1, self.appointment(7, 9, employee=self.colleague))
+
+        seen = []
+        response = self.client.get('/api/appointments/', {'page_size': 3})
+        while True:
+            seen += self.ids(response)
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, [appointment.id for appointment in appointments])
+        self.assertEqual(self.client.get('/api/appointments/', {'cursor': 'garbage'}).status_code, 404)
+
+    def test_summary_counts_per_day(self):
+        self.appointment(7)
+        self.appointment(7, 10, status=Appointment.Status.CONFIRMED)
+        self.appointment(8, status=Appointment.Status.CANCELLED)
+        self.appointment(8, 10, employee=self.colleague)
+
+        response = self.client.get('/api/appointments/summary/', {'employee': self.employee.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [
+            {'day': '2030-01-07', 'total': 2, 'pending': 1, 'confirmed': 1, 'completed': 0, 'cancelled': 0},
+            {'day': '2030-01-08', 'total': 1, 'pending': 0, 'confirmed': 0, 'completed': 0, 'cancelled': 1},
+        ])
+
+    def test_list_and_summary_run_a_fixed_number_of_queries(self):
+        for day in range(7, 17):
+            self.appointment(day, employee=self.employee if day % 2 else self.colleague)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/appointments/')
+        self.assertEqual(len(self.ids(response)), 10)
+
+        with self.assertNumQueries(1):
+            self.client.get('/api/appointments/summary/')
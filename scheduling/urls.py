@@ -1,14 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EmployeeAvailabilityViewSet, AppointmentViewSet, PublicEmployeeListView, SchedulingView
+from .views import CalendarFeedView, calendar_feed, EmployeeAvailabilityViewSet, AvailabilityOverrideViewSet, AppointmentViewSet, FreeStaffView, PublicEmployeeListView, SchedulingView, FirstAvailableSlotView, TeamSlotsView
 
 router = DefaultRouter()
 router.register(r'availabilities', EmployeeAvailabilityViewSet, basename='employee-availability')
+router.register(r'availability-overrides', AvailabilityOverrideViewSet, basename='availability-override')
 router.register(r'appointments', AppointmentViewSet, basename='appointment')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('available-slots/', SchedulingView.as_view(), name='available-slots'),
+    path('first-available-slots/', FirstAvailableSlotView.as_view(), name='first-available-slots'),
+    path('free-staff/', FreeStaffView.as_view(), name='free-staff'),
+    path('team-slots/', TeamSlotsView.as_view(), name='team-slots'),
     path('public-employees/', PublicEmployeeListView.as_view(), name='public-employees'),
+    path('calendar-feed/', CalendarFeedView.as_view(), name='calendar-feed'),
+    path('calendar/<str:token>.ics', calendar_feed, name='calendar-feed-ics'),
 
 ]
\ No newline at end of file
@@ -2,11 +2,27 @@ from rest_framework import viewsets, views, status, serializers
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny 
 from rest_framework.decorators import action
-from datetime import datetime, time, timedelta
-from django.core.mail import send_mail
+from datetime import datetime, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from communications.outbox import queue_email
 from django.conf import settings
-from .models import EmployeeAvailability, Appointment
-from .serializers import EmployeeAvailabilitySerializer, AppointmentSerializer
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from api.filters import filter_date_window, filter_statuses
+from api.pagination import KeysetPagination
+from .models import EmployeeAvailability, Appointment, AvailabilityOverride, CalendarFeed
+from . import bitmap, ical
+from .booking import BookingConflict, reschedule
+from .serializers import EmployeeAvailabilitySerializer, AppointmentSerializer, AvailabilityOverrideSerializer
+from .availability import MAX_RANGE_DAYS, SLOT_MINUTES, find_free_slots
+from .free_index import INDEX_HORIZON_DAYS, first_available
 from users.permissions import IsEmployeeOrOwner
 from users.models import User 
 
@@ -37,11 +53,47 @@ class EmployeeAvailabilityViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(employee=self.request.user)
 
+class AvailabilityOverrideViewSet(viewsets.ModelViewSet):
+    """
+    Date-specific unavailability such as holidays and breaks.
+    """
+    serializer_class = AvailabilityOverrideSerializer
+
+    def get_permissions(self):
+        if self.action in ['list', 'retrieve']:
+            return [IsAuthenticated()]
+        return [IsEmployeeOrOwner()]
+
+    def get_queryset(self):
+        queryset = AvailabilityOverride.objects.all().order_by('date', 'start_time')
+        user = self.request.user
+        if self.action in ['update', 'partial_update', 'destroy']:
+            if user.role == 'EMPLOYEE':
+                return queryset.filter(employee=user)
+            return queryset
+        employee_id = self.request.query_params.get('employee_id')
+        if employee_id:
+            queryset = queryset.filter(employee_id=employee_id)
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(employee=self.request.user)
+
+class AppointmentPagination(KeysetPagination):
+    ordering = ('start_time', 'id')
+    page_size = 50
+
+
 class AppointmentViewSet(viewsets.ModelViewSet):
     """
     API for booking and managing appointments.
+
+    Lists are keyset-paginated on ``(start_time, id)`` and accept ``from`` and
+    ``to`` (YYYY-MM-DD, inclusive), ``employee`` and a comma-separated
+    ``status`` filter.
     """
     serializer_class = AppointmentSerializer
+    pagination_class = AppointmentPagination
     # Default permission is authenticated, but we override for 'create'
     permission_classes = [IsAuthenticated]
 
@@ -63,10 +115,48 @@ class AppointmentViewSet(viewsets.ModelViewSet):
 
         # Employees/Owners see ALL appointments to manage them
         if user.role in ['EMPLOYEE', 'OWNER']:
-            return Appointment.objects.all().order_by('start_time')
-        
-        # Customers only see THEIR own appointments
-        return Appointment.objects.filter(customer=user).order_by('start_time')
+            queryset = Appointment.objects.all()
+        else:
+            # Customers only see THEIR own appointments
+            queryset = Appointment.objects.filter(customer=user)
+
+        if self.action in ('list', 'summary'):
+            queryset = self.filter_window(queryset)
+        return queryset.select_related('customer__profile', 'employee__profile').order_by('start_time', 'id')
+
+    def filter_window(self, queryset):
+        params = self.request.query_params
+        queryset = filter_date_window(queryset, params, 'start_time')
+
+        if params.get('employee'):
+            try:
+                queryset = queryset.filter(employee_id=int(params['employee']))
+            except ValueError:
+                raise serializers.ValidationError({"error": "'employee' must be an integer."})
+        return filter_statuses(queryset, params, Appointment.Status.choices)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Appointment counts per day for calendar views, honouring the same
+        filters as the list.
+        """
+        counts = (
+            self.get_queryset()
+            .order_by()
+            .annotate(day=TruncDate('start_time', tzinfo=timezone.get_current_timezone()))
+            .values('day')
+            .annotate(
+                total=Count('id'),
+                **{
+                    value.lower(): Count('id', filter=Q(status=value))
+                    for value in Appointment.Status.values
+                },
+            )
+            .order_by('day')
+        )
+        data = [dict(row, day=row['day'].isoformat()) for row in counts]
+        return Response(data, status=status.HTTP_200_OK)
 
     # NOTE: perform_create is REMOVED because the logic is now in Serializer.create
 
@@ -79,13 +169,16 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if new_status not in valid_statuses:
             return Response({"error": f"Invalid status. Valid choices: {valid_statuses}"}, status=status.HTTP_400_BAD_REQUEST)
         
-        appointment.status = new_status
-        appointment.save()
-            
+        try:
+            reschedule(appointment, status=new_status)
+        except BookingConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = self.get_serializer(appointment)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], permission_classes=[IsEmployeeOrOwner])
+    @transaction.atomic
     def confirm_and_send_link(self, request, pk=None):
         """
         Confirms the appointment and sends the meeting link to the CUSTOMER.
@@ -96,9 +189,10 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if not meeting_link:
             return Response({"error": "A 'meeting_link' must be provided."}, status=status.HTTP_400_BAD_REQUEST)
 
-        appointment.meeting_link = meeting_link
-        appointment.status = Appointment.Status.CONFIRMED
-        appointment.save()
+        try:
+            reschedule(appointment, meeting_link=meeting_link, status=Appointment.Status.CONFIRMED)
+        except BookingConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Explicitly get the customer to ensure email goes to the right person
         customer = appointment.customer
@@ -123,12 +217,11 @@ Thanks,
 The Global Financial World Team
 """
         # Send email specifically to the customer's email address
-        send_mail(
+        queue_email(
             subject,
             message,
-            settings.EMAIL_HOST_USER,
-            [customer.email],
-            fail_silently=False
+            recipient_list=[customer.email],
+            from_email=settings.EMAIL_HOST_USER,
         )
 
         serializer = self.get_serializer(appointment)
@@ -138,62 +231,190 @@ The Global Financial World Team
 class SchedulingView(views.APIView):
     """
     Public endpoint to get available time slots.
+
+    Either a single ``date`` and ``employee_id`` (returns a flat list of
+    times), or a ``date_from``/``date_to`` range with an optional
+    comma-separated ``employee_ids`` list (returns slots per employee per day).
     """
     permission_classes = [AllowAny] 
 
     def get(self, request, *args, **kwargs):
-        date_str = request.query_params.get('date')
-        employee_id = request.query_params.get('employee_id')
+        params = request.query_params
+        if 'date_from' in params or 'date_to' in params:
+            return self.get_range(request)
+
+        date_str = params.get('date')
+        employee_id = params.get('employee_id')
 
         if not date_str or not employee_id:
             return Response({"error": "Both 'date' and 'employee_id' query parameters are required."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            weekday = target_date.weekday()
         except ValueError:
             return Response({"error": "Invalid date format. Please use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            employee_id = int(employee_id)
+        except ValueError:
+            return Response({"error": "'employee_id' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        slots = find_free_slots([employee_id], target_date, target_date).get(employee_id, {}).get(target_date, [])
+        return Response([timezone.localtime(slot).strftime('%H:%M') for slot in slots], status=status.HTTP_200_OK)
 
+    def get_range(self, request):
+        params = request.query_params
         try:
-            availability = EmployeeAvailability.objects.get(employee_id=employee_id, weekday=weekday)
-        except EmployeeAvailability.DoesNotExist:
-            return Response([], status=status.HTTP_200_OK)
+            date_from = datetime.strptime(params.get('date_from', ''), '%Y-%m-%d').date()
+            date_to = datetime.strptime(params.get('date_to', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "Both 'date_from' and 'date_to' are required, in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
 
-        booked_appointments = Appointment.objects.filter(
-            employee_id=employee_id,
-            start_time__date=target_date
-        )
-        
-        booked_slots = []
-        for appt in booked_appointments:
-            booked_slots.append((appt.start_time.time(), appt.end_time.time()))
-
-        available_slots = []
-        slot_start = datetime.combine(target_date, availability.start_time)
-        day_end = datetime.combine(target_date, availability.end_time)
-
-        durations = [10, 20, 30] 
-
-        while slot_start < day_end:
-            is_available = True
-            for booked_start, booked_end in booked_slots:
-                booked_start_dt = datetime.combine(target_date, booked_start)
-                booked_end_dt = datetime.combine(target_date, booked_end)
-                
-                if slot_start < booked_end_dt and (slot_start + timedelta(minutes=min(durations))) > booked_start_dt:
-                    is_available = False
-                    break
-            
-            if is_available:
-                longest_duration = max(durations)
-                if slot_start + timedelta(minutes=longest_duration) <= day_end:
-                     available_slots.append(slot_start.strftime('%H:%M'))
+        if date_to < date_from:
+            return Response({"error": "'date_to' must not be before 'date_from'."}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days >= MAX_RANGE_DAYS:
+            return Response({"error": f"The date range cannot exceed {MAX_RANGE_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
 
-            slot_start += timedelta(minutes=min(durations))
+        try:
+            duration = int(params.get('duration', SLOT_MINUTES))
+            if 'employee_ids' in params:
+                employee_ids = [int(value) for value in params['employee_ids'].split(',') if value.strip()]
+            else:
+                employee_ids = list(
+                    User.objects.filter(role__in=['EMPLOYEE', 'OWNER'], is_active=True).values_list('id', flat=True)
+                )
+        except ValueError:
+            return Response({"error": "'employee_ids' and 'duration' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if duration <= 0:
+            return Response({"error": "'duration' must be a positive number of minutes."}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(available_slots, status=status.HTTP_200_OK)
+        free_slots = find_free_slots(employee_ids, date_from, date_to, duration=duration)
+        data = [
+            {
+                "employee_id": employee_id,
+                "days": {
+                    day.isoformat(): [timezone.localtime(slot).strftime('%H:%M') for slot in slots]
+                    for day, slots in days.items()
+                },
+            }
+            for employee_id, days in free_slots.items()
+        ]
+        return Response(data, status=status.HTTP_200_OK)
     
 
+class FirstAvailableSlotView(views.APIView):
+    """
+    Public endpoint returning the earliest open slots across all staff, so
+    guests do not have to probe every employee and date one by one.
+    """
+    permission_classes = [AllowAny]
+    max_limit = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            duration = int(request.query_params.get('duration', SLOT_MINUTES))
+            horizon = int(request.query_params.get('horizon', 14))
+            limit = int(request.query_params.get('limit', 5))
+        except ValueError:
+            return Response({"error": "'duration', 'horizon' and 'limit' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if duration <= 0 or horizon <= 0 or limit <= 0:
+            return Response({"error": "'duration', 'horizon' and 'limit' must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+        horizon = min(horizon, INDEX_HORIZON_DAYS)
+        limit = min(limit, self.max_limit)
+
+        data = [
+            {
+                "employee_id": interval.employee_id,
+                "full_name": f"{interval.employee.first_name} {interval.employee.last_name}",
+                "start_time": timezone.localtime(slot).isoformat(),
+                "end_time": timezone.localtime(slot + timedelta(minutes=duration)).isoformat(),
+            }
+            for slot, interval in first_available(duration=duration, horizon_days=horizon, limit=limit)
+        ]
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class FreeStaffView(views.APIView):
+    """
+    Public endpoint listing the staff free for ``duration`` minutes from
+    ``start`` (ISO 8601), answered from the compiled calendars.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            start = parse_datetime(request.query_params.get('start', ''))
+        except ValueError:
+            # Well-formed but impossible, such as month 13.
+            start = None
+        if start is None:
+            return Response({"error": "'start' must be an ISO 8601 date-time."}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start)
+        try:
+            duration = int(request.query_params.get('duration', SLOT_MINUTES))
+        except ValueError:
+            return Response({"error": "'duration' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if duration <= 0:
+            return Response({"error": "'duration' must be a positive number of minutes."}, status=status.HTTP_400_BAD_REQUEST)
+
+        staff = {
+            employee.id: employee
+            for employee in User.objects.filter(role__in=['EMPLOYEE', 'OWNER'], is_active=True)
+        }
+        data = [
+            {
+                "id": employee_id,
+                "full_name": f"{staff[employee_id].first_name} {staff[employee_id].last_name}",
+            }
+            for employee_id in bitmap.free_staff(list(staff), start, duration)
+        ]
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class TeamSlotsView(views.APIView):
+    """
+    Public endpoint listing, per day from ``date_from`` to ``date_to``, the
+    times at which the comma-separated ``employee_ids`` are free for
+    ``duration`` minutes: any one of them by default, or all of them
+    together with ``match=all``. Answered from the compiled calendars, so
+    only days within the index horizon have slots.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            date_from = datetime.strptime(params.get('date_from', ''), '%Y-%m-%d').date()
+            date_to = datetime.strptime(params.get('date_to', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "Both 'date_from' and 'date_to' are required, in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+        if date_to < date_from:
+            return Response({"error": "'date_to' must not be before 'date_from'."}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days >= MAX_RANGE_DAYS:
+            return Response({"error": f"The date range cannot exceed {MAX_RANGE_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            duration = int(params.get('duration', SLOT_MINUTES))
+            employee_ids = [int(value) for value in params.get('employee_ids', '').split(',') if value.strip()]
+        except ValueError:
+            return Response({"error": "'employee_ids' and 'duration' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not employee_ids:
+            return Response({"error": "'employee_ids' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if duration <= 0:
+            return Response({"error": "'duration' must be a positive number of minutes."}, status=status.HTTP_400_BAD_REQUEST)
+        if params.get('match', 'any') not in ['any', 'all']:
+            return Response({"error": "'match' must be 'any' or 'all'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        slots = bitmap.free_slots(employee_ids, date_from, date_to, duration, require_all=params.get('match') == 'all')
+        data = {
+            day.isoformat(): [timezone.localtime(slot).strftime('%H:%M') for slot in day_slots]
+            for day, day_slots in slots.items()
+        }
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class PublicEmployeeListView(views.APIView):
     """
     Public endpoint to list employees so guests can choose who to book with.
@@ -210,4 +431,57 @@ class PublicEmployeeListView(views.APIView):
             }
             for emp in employees
         ]
-        return Response(data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class CalendarFeedView(views.APIView):
+    """
+    Returns the URL of the user's iCalendar feed (GET), or issues a new one
+    and revokes the old (POST).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        feed = ical.get_or_create_feed(request.user)
+        return Response({"url": self.feed_url(request, feed)}, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        feed = ical.rotate_feed(request.user)
+        return Response({"url": self.feed_url(request, feed)}, status=status.HTTP_200_OK)
+
+    def feed_url(self, request, feed):
+        return request.build_absolute_uri(reverse('calendar-feed-ics', args=[feed.token]))
+
+
+@require_GET
+def calendar_feed(request, token):
+    """
+    Streams a user's appointments as text/calendar. The secret token in the
+    URL is the only credential. Conditional requests are answered from the
+    version query alone, without reading any appointment.
+    """
+    try:
+        feed = CalendarFeed.objects.select_related('user').get(token=token, user__is_active=True)
+    except CalendarFeed.DoesNotExist:
+        raise Http404("Unknown calendar feed.")
+    user = feed.user
+
+    count, last_modified = ical.feed_version(feed)
+    stamp = last_modified.timestamp() if last_modified else 0
+    etag = f'"{user.id}-{count}-{stamp:.6f}"'
+    last_modified = int(stamp) if last_modified else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = StreamingHttpResponse(
+        ical.render_feed(user, request.get_host().split(':')[0]),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = 'inline; filename="appointments.ics"'
+    return response
@@ -0,0 +1,84 @@
+import json
+import threading
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from api.commit import CommitBatch
+from .models import CatalogSnapshot, Service
+
+# Older snapshots are kept briefly so a process that has just read the
+# previous version id can still load it.
+SNAPSHOTS_KEPT = 3
+
+_lock = threading.Lock()
+_current = None
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+class Catalog:
+    """One snapshot version with every response body pre-encoded."""
+
+    def __init__(self, version, services):
+        self.version = version
+        self.etag = f'"catalog-{version}"'
+        plans = sorted((plan for service in services for plan in service['plans']), key=lambda plan: plan['id'])
+        self.service_list = _dumps(services)
+        self.plan_list = _dumps(plans)
+        self.services = {service['slug']: _dumps(service) for service in services}
+        self.plans = {plan['slug']: _dumps(plan) for plan in plans}
+
+
+def render_catalog():
+    from .serializers import ServiceSerializer, plan_catalog_queryset
+
+    services = Service.objects.prefetch_related(
+        Prefetch('plans', queryset=plan_catalog_queryset().order_by('id'))
+    ).order_by('id')
+    return JSONRenderer().render(ServiceSerializer(services, many=True).data).decode('utf-8')
+
+
+def rebuild():
+    """Renders the catalog and publishes it as the next snapshot version."""
+    with transaction.atomic():
+        snapshot = CatalogSnapshot.objects.create(payload=render_catalog())
+        CatalogSnapshot.objects.filter(id__lte=snapshot.id - SNAPSHOTS_KEPT).delete()
+    return snapshot
+
+
+def current_catalog():
+    """
+    The latest snapshot, decoded once per process and version. Costs one
+    indexed query per call while the version is unchanged.
+    """
+    global _current
+    version = CatalogSnapshot.objects.order_by('-id').values_list('id', flat=True).first()
+    if version is None:
+        version = rebuild().id
+    catalog = _current
+    if catalog is not None and catalog.version == version:
+        return catalog
+
+    with _lock:
+        if _current is not None and _current.version >= version:
+            return _current
+        payload = CatalogSnapshot.objects.filter(id=version).values_list('payload', flat=True).first()
+        if payload is None:
+            # Pruned by a concurrent rebuild; whatever is newest now will do.
+            snapshot = CatalogSnapshot.objects.order_by('-id').first() or rebuild()
+            version, payload = snapshot.id, snapshot.payload
+        _current = Catalog(version, json.loads(payload))
+        return _current
+
+
+def schedule_rebuild():
+    """
+    Rebuilds once after the current transaction commits, however many
+    catalog rows it touched.
+    """
+    _rebuild.add()
+
+
+_rebuild = CommitBatch(lambda _: rebuild())
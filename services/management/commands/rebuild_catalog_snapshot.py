@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from services import catalog
+
+
+class Command(BaseCommand):
+    help = 'Renders the public catalog into a new snapshot version'
+
+    def handle(self, *args, **options):
+        snapshot = catalog.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Published catalog snapshot {snapshot.id} ({len(snapshot.payload)} bytes)."))
@@ -0,0 +1,133 @@
+from django.db import migrations
+
+# Rows of catalog_search are keyed by rowid = source id * 4 + kind, so the
+# triggers can replace a document with a rowid lookup instead of a scan.
+# Kinds: 0 service, 1 plan, 2 feature, 3 FAQ.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE catalog_search USING fts5(
+        kind UNINDEXED,
+        object_id UNINDEXED,
+        plan_id UNINDEXED,
+        title,
+        body,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER catalog_search_service_ai AFTER INSERT ON services_service BEGIN
+        INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+        VALUES (new.id * 4, 0, new.id, NULL, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_service_au AFTER UPDATE ON services_service BEGIN
+        DELETE FROM catalog_search WHERE rowid = old.id * 4;
+        INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+        VALUES (new.id * 4, 0, new.id, NULL, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_service_ad AFTER DELETE ON services_service BEGIN
+        DELETE FROM catalog_search WHERE rowid = old.id * 4;
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_plan_ai AFTER INSERT ON services_plan BEGIN
+        INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+        VALUES (new.id * 4 + 1, 1, new.id, new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_plan_au AFTER UPDATE ON services_plan BEGIN
+        DELETE FROM catalog_search WHERE rowid = old.id * 4 + 1;
+        INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+        VALUES (new.id * 4 + 1, 1, new.id, new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_plan_ad AFTER DELETE ON services_plan BEGIN
+        DELETE FROM catalog_search WHERE rowid = old.id * 4 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_feature_ai AFTER INSERT ON services_feature BEGIN
+        INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+        VALUES (new.id * 4 + 2, 2, new.id, new.plan_id, new.description, '');
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_feature_au AFTER UPDATE ON services_feature BEGIN
+        DELETE FROM catalog_search WHERE rowid = old.id * 4 + 2;
+        INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+        VALUES (new.id * 4 + 2, 2, new.id, new.plan_id, new.description, '');
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_feature_ad AFTER DELETE ON services_feature BEGIN
+        DELETE FROM catalog_search WHERE rowid = old.id * 4 + 2;
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_faq_ai AFTER INSERT ON reviews_faq BEGIN
+        INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+        VALUES (new.id * 4 + 3, 3, new.id, new.plan_id, new.question, new.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_faq_au AFTER UPDATE ON reviews_faq BEGIN
+        DELETE FROM catalog_search WHERE rowid = old.id * 4 + 3;
+        INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+        VALUES (new.id * 4 + 3, 3, new.id, new.plan_id, new.question, new.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_search_faq_ad AFTER DELETE ON reviews_faq BEGIN
+        DELETE FROM catalog_search WHERE rowid = old.id * 4 + 3;
+    END
+    """,
+    """
+    INSERT INTO catalog_search (rowid, kind, object_id, plan_id, title, body)
+    SELECT id * 4, 0, id, NULL, name, description FROM services_service
+    UNION ALL
+    SELECT id * 4 + 1, 1, id, id, name, description FROM services_plan
+    UNION ALL
+    SELECT id * 4 + 2, 2, id, plan_id, description, '' FROM services_feature
+    UNION ALL
+    SELECT id * 4 + 3, 3, id, plan_id, question, answer FROM reviews_faq
+    """,
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS catalog_search_{table}_{event}"
+    for table in ('service', 'plan', 'feature', 'faq')
+    for event in ('ai', 'au', 'ad')
+] + ["DROP TABLE IF EXISTS catalog_search"]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends simply go without catalog search.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_catalogsnapshot'),
+        ('reviews', '0002_planreviewstats_alter_review_rating_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -31,4 +31,17 @@ class Feature(models.Model):
     description = models.CharField(max_length=255)
 
     def __str__(self):
-        return self.description
\ No newline at end of file
+        return self.description
+
+
+class CatalogSnapshot(models.Model):
+    """
+    The public catalog (services with their plans, features, reviews and
+    FAQs) rendered once to JSON. Maintained by services.catalog; the
+    highest id is the current version.
+    """
+    payload = models.TextField()
+    built_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Catalog snapshot {self.pk} built {self.built_at:%Y-%m-%d %H:%M:%S}"
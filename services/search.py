@@ -0,0 +1,121 @@
+import re
+from django.db import connection
+from .models import Plan, Service
+
+# The catalog_search FTS5 table and the triggers that keep it in sync are
+# created by migration services.0003_catalog_search. SQLite drops a table's
+# triggers when a migration has to rebuild it, so migrations that alter
+# services_service, services_plan, services_feature or reviews_faq must
+# recreate them.
+KIND_SERVICE, KIND_PLAN, KIND_FEATURE, KIND_FAQ = range(4)
+KIND_NAMES = {KIND_SERVICE: 'service', KIND_PLAN: 'plan', KIND_FEATURE: 'feature', KIND_FAQ: 'faq'}
+MAX_QUERY_TERMS = 8
+# Title matches (names, questions) weigh more than descriptions and answers.
+TITLE_WEIGHT = 4.0
+BODY_WEIGHT = 1.0
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(text, prefix_all=False):
+    """
+    Turns free text into an FTS5 query: every term must match, and the last
+    one (or all of them, for autocomplete) may be a prefix. Terms are quoted
+    so user input can never be parsed as FTS5 syntax.
+    """
+    terms = _TERM.findall(text.lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    if prefix_all:
+        quoted = [f'{term}*' for term in quoted]
+    else:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search(text, limit=10):
+    """
+    Ranked catalog hits as (plans, services). Feature and FAQ matches count
+    towards their plan; each plan is reported once, with the snippet of its
+    best matching document.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return [], []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT kind, object_id, plan_id,
+                   snippet(catalog_search, -1, '<mark>', '</mark>', '…', 12)
+            FROM catalog_search
+            WHERE catalog_search MATCH %s
+            ORDER BY bm25(catalog_search, 0, 0, 0, %s, %s)
+            LIMIT %s
+            """,
+            [expression, TITLE_WEIGHT, BODY_WEIGHT, limit * 5],
+        )
+        rows = cursor.fetchall()
+
+    plan_hits = {}
+    service_hits = {}
+    for kind, object_id, plan_id, snippet in rows:
+        if kind == KIND_SERVICE:
+            service_hits.setdefault(object_id, snippet)
+        elif plan_id not in plan_hits:
+            plan_hits[plan_id] = (KIND_NAMES[kind], snippet)
+
+    plan_ids = list(plan_hits)[:limit]
+    service_ids = list(service_hits)[:limit]
+    plans = Plan.objects.select_related('service').in_bulk(plan_ids)
+    services = Service.objects.in_bulk(service_ids)
+
+    plan_results = [
+        {
+            'id': plan_id,
+            'slug': plans[plan_id].slug,
+            'name': plans[plan_id].name,
+            'service': {'slug': plans[plan_id].service.slug, 'name': plans[plan_id].service.name},
+            'matched': plan_hits[plan_id][0],
+            'snippet': plan_hits[plan_id][1],
+        }
+        for plan_id in plan_ids
+        if plan_id in plans
+    ]
+    service_results = [
+        {
+            'id': service_id,
+            'slug': services[service_id].slug,
+            'name': services[service_id].name,
+            'snippet': service_hits[service_id],
+        }
+        for service_id in service_ids
+        if service_id in services
+    ]
+    return plan_results, service_results
+
+
+def autocomplete(text, limit=8):
+    """Distinct service, plan and feature titles whose words start with ``text``."""
+    expression = match_expression(text, prefix_all=True)
+    if expression is None:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT title
+            FROM catalog_search
+            WHERE catalog_search MATCH %s AND kind IN (%s, %s, %s)
+            ORDER BY rank
+            LIMIT %s
+            """,
+            ['{title}: (' + expression + ')', KIND_SERVICE, KIND_PLAN, KIND_FEATURE, limit * 4],
+        )
+        titles = [title for title, in cursor.fetchall()]
+    return list(dict.fromkeys(titles))[:limit]
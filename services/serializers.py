@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import Prefetch
 from .models import Service, Plan, Feature
 from reviews.serializers import ReviewSerializer, FAQSerializer
 
@@ -9,16 +10,37 @@ class FeatureSerializer(serializers.ModelSerializer):
 
 class PlanSerializer(serializers.ModelSerializer):
     features = FeatureSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True) 
+    review_stats = serializers.SerializerMethodField()
+    recent_reviews = serializers.SerializerMethodField()
     faqs = FAQSerializer(many=True, read_only=True)
 
     class Meta:
         model = Plan
         fields = [
             'id', 'name', 'slug', 'description','service',
-            'price', 'billing_cycle', 'features', 'reviews', 'faqs'
+            'price', 'billing_cycle', 'features', 'review_stats', 'recent_reviews', 'faqs'
         ] 
 
+    def get_review_stats(self, obj):
+        from reviews.aggregates import get_stats
+
+        stats = get_stats(obj)
+        return {
+            'count': stats.review_count,
+            'average': stats.average_rating,
+            'histogram': stats.histogram,
+        }
+
+    def get_recent_reviews(self, obj):
+        from reviews.aggregates import RECENT_REVIEWS_LIMIT, recent_reviews
+
+        # Filled by plan_catalog_queryset(); fall back to a query otherwise.
+        if hasattr(obj, 'recent_review_list'):
+            reviews = obj.recent_review_list
+        else:
+            reviews = recent_reviews().filter(plan=obj)[:RECENT_REVIEWS_LIMIT]
+        return ReviewSerializer(reviews, many=True).data
+
 class ServiceSerializer(serializers.ModelSerializer):
     plans = PlanSerializer(many=True, read_only=True)
 
@@ -32,3 +54,14 @@ class SimplePlanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Plan
         fields = ['id', 'name', 'service_name']
+
+
+def plan_catalog_queryset():
+    """Plans with everything PlanSerializer reads, in a fixed number of queries."""
+    from reviews.aggregates import RECENT_REVIEWS_LIMIT, recent_reviews
+
+    return Plan.objects.select_related('review_stats').prefetch_related(
+        'features',
+        'faqs',
+        Prefetch('reviews', queryset=recent_reviews()[:RECENT_REVIEWS_LIMIT], to_attr='recent_review_list'),
+    )
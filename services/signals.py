@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Service, Plan, Feature
+from . import catalog
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+@receiver(post_save, sender='reviews.FAQ')
+@receiver(post_delete, sender='reviews.FAQ')
+@receiver(post_save, sender='reviews.Review')
+@receiver(post_delete, sender='reviews.Review')
+def rebuild_catalog_snapshot(sender, instance, **kwargs):
+    catalog.schedule_rebuild()
+
+
+# The reviewer fields embedded in the recent reviews (users.UserSerializer).
+REVIEWER_USER_FIELDS = {'email', 'first_name', 'last_name', 'role'}
+REVIEWER_PROFILE_FIELDS = {'company_name', 'phone_number'}
+
+
+def _rebuild_if_reviewer(user_id, fields, created, update_fields):
+    from reviews.models import Review
+
+    # New accounts have no reviews, and saves such as the last_login update
+    # on every sign-in touch nothing the catalog shows.
+    if created or (update_fields is not None and not fields & set(update_fields)):
+        return
+    if Review.objects.filter(user_id=user_id).exists():
+        catalog.schedule_rebuild()
+
+
+@receiver(post_save, sender='users.User')
+def rebuild_catalog_on_reviewer_change(sender, instance, created, update_fields=None, **kwargs):
+    _rebuild_if_reviewer(instance.pk, REVIEWER_USER_FIELDS, created, update_fields)
+
+
+@receiver(post_save, sender='users.Profile')
+def rebuild_catalog_on_reviewer_profile_change(sender, instance, created, update_fields=None, **kwargs):
+    _rebuild_if_reviewer(instance.user_id, REVIEWER_PROFILE_FIELDS, created, update_fields)
@@ -1,3 +1,123 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+from ecommerce.models import Order
+from reviews.models import FAQ, Review
+from services import catalog
+from services.models import CatalogSnapshot, Feature, Service, Plan
+from users.models import User
 
-# Create your tests here.
+
+class CatalogSnapshotTests(TestCase):
+
+    def setUp(self):
+        # Snapshot ids are reused once a test's transaction rolls back.
+        catalog._current = None
+        self.service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=self.service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.reviewer = User.objects.create_user(email="reviewer@example.com", password="x", first_name="Ada")
+        order = Order.objects.create(user=self.reviewer, plan=self.plan)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(order=order, plan=self.plan, user=self.reviewer, rating=5, comment="Great")
+        self.client = APIClient()
+
+    def reviewer_in_snapshot(self):
+        review = self.client.get("/api/plans/basic/").json()["recent_reviews"][0]
+        return review["user"]
+
+    def test_list_and_detail_come_from_the_snapshot(self):
+        response = self.client.get("/api/services/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([service["slug"] for service in response.json()], ["bookkeeping"])
+        self.assertEqual(self.client.get("/api/plans/basic/").json()["review_stats"]["count"], 1)
+        self.assertEqual(self.client.get("/api/plans/missing/").status_code, 404)
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get("/api/services/", headers={"If-None-Match": etag}).status_code, 304)
+
+    def test_catalog_writes_publish_a_new_snapshot(self):
+        etag = self.client.get("/api/plans/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Plan.objects.create(service=self.service, name="Pro", slug="pro", description="Pro", price="200.00")
+
+        response = self.client.get("/api/plans/", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([plan["slug"] for plan in response.json()], ["basic", "pro"])
+
+    def test_reviewer_changes_publish_a_new_snapshot(self):
+        self.assertEqual(self.reviewer_in_snapshot()["first_name"], "Ada")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reviewer.first_name = "Grace"
+            self.reviewer.save()
+        self.assertEqual(self.reviewer_in_snapshot()["first_name"], "Grace")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reviewer.profile.company_name = "Analytical Engines"
+            self.reviewer.profile.save()
+        self.assertEqual(self.reviewer_in_snapshot()["profile"]["company_name"], "Analytical Engines")
+
+    def test_rebuilds_are_coalesced_per_transaction(self):
+        versions = CatalogSnapshot.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            for slug in ("pro", "max"):
+                Plan.objects.create(service=self.service, name=slug, slug=slug, description=slug, price="200.00")
+            self.service.save()
+        self.assertEqual(CatalogSnapshot.objects.count(), versions + 1)
+
+    def test_saves_that_skip_reviewer_fields_run_no_review_lookup(self):
+        # Only the UPDATE itself.
+        with self.assertNumQueries(1):
+            self.reviewer.save(update_fields=["last_login"])
+
+    def test_users_without_reviews_do_not_rebuild(self):
+        versions = CatalogSnapshot.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(email="someone@example.com", password="x")
+        self.assertEqual(CatalogSnapshot.objects.count(), versions)
+
+
+class CatalogSearchTests(TestCase):
+
+    def setUp(self):
+        self.tax = Service.objects.create(name="Tax Filing", slug="tax-filing", description="Yearly returns for companies")
+        self.books = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Monthly ledgers")
+        self.returns = Plan.objects.create(service=self.tax, name="Returns", slug="returns", description="Corporate returns", price="300.00")
+        self.ledger = Plan.objects.create(service=self.books, name="Ledger", slug="ledger", description="Ledgers", price="100.00")
+        Feature.objects.create(plan=self.ledger, description="Payroll reconciliation")
+        FAQ.objects.create(plan=self.ledger, question="Do you handle invoices?", answer="Yes, including VAT invoices.")
+        self.client = APIClient()
+
+    def search(self, q, **params):
+        response = self.client.get("/api/search/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_matches_titles_and_prefixes(self):
+        data = self.search("tax fil")
+        self.assertEqual([service["slug"] for service in data["services"]], ["tax-filing"])
+        self.assertIn("<mark>", data["services"][0]["snippet"])
+
+    def test_features_and_faqs_count_towards_their_plan(self):
+        self.assertEqual([(plan["slug"], plan["matched"]) for plan in self.search("payroll")["plans"]], [("ledger", "feature")])
+        self.assertEqual([(plan["slug"], plan["matched"]) for plan in self.search("vat")["plans"]], [("ledger", "faq")])
+
+    def test_index_follows_catalog_edits(self):
+        self.assertEqual(self.search("audit"), {"plans": [], "services": []})
+
+        self.returns.description = "Corporate returns and audit support"
+        self.returns.save()
+        self.assertEqual([plan["slug"] for plan in self.search("audit")["plans"]], ["returns"])
+
+        self.returns.delete()
+        self.assertEqual(self.search("audit")["plans"], [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('ledger" OR "tax')["plans"], [])
+        self.assertEqual(self.client.get("/api/search/", {"q": "  "}).status_code, 400)
+        self.assertEqual(self.client.get("/api/search/", {"q": "tax", "limit": "x"}).status_code, 400)
+
+    def test_autocomplete_suggests_titles(self):
+        response = self.client.get("/api/search/autocomplete/", {"q": "led"})
+        self.assertEqual(response.data, ["Ledger"])
+        self.assertEqual(self.client.get("/api/search/autocomplete/", {"q": ""}).data, [])
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ServiceViewSet, PlanViewSet , FeatureViewSet
+from .views import ServiceViewSet, PlanViewSet , FeatureViewSet, CatalogSearchView, CatalogAutocompleteView
 
 router = DefaultRouter()
 router.register(r'services', ServiceViewSet, basename='service')
@@ -9,4 +9,6 @@ router.register(r'features', FeatureViewSet, basename='feature')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('search/', CatalogSearchView.as_view(), name='catalog-search'),
+    path('search/autocomplete/', CatalogAutocompleteView.as_view(), name='catalog-autocomplete'),
 ]
\ No newline at end of file
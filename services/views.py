@@ -1,21 +1,98 @@
-from rest_framework import viewsets
-from .models import Service, Plan, Feature
-from .serializers import ServiceSerializer, PlanSerializer, FeatureSerializer
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import viewsets, views, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
+from .models import Service, Feature
+from .serializers import ServiceSerializer, PlanSerializer, FeatureSerializer, plan_catalog_queryset
+from .catalog import current_catalog
+from . import search
 from users.permissions import IsOwnerOrReadOnly
 
-class ServiceViewSet(viewsets.ModelViewSet): 
-    queryset = Service.objects.all() 
+
+class CatalogSnapshotMixin:
+    """
+    Serves list and slug-detail reads from the pre-rendered catalog snapshot
+    instead of serializing the tree per request. Writes go through the
+    regular ModelViewSet actions and trigger a rebuild via signals.
+
+    ``snapshot_list`` names the Catalog attribute holding the encoded list
+    and ``snapshot_detail`` the one mapping slugs to encoded details.
+    """
+    snapshot_list = None
+    snapshot_detail = None
+
+    def snapshot_response(self, request, body):
+        if body is None:
+            raise NotFound()
+        not_modified = get_conditional_response(request, etag=self.catalog.etag)
+        if not_modified is not None:
+            return not_modified
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = self.catalog.etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        self.catalog = current_catalog()
+        return self.snapshot_response(request, getattr(self.catalog, self.snapshot_list))
+
+    def retrieve(self, request, *args, **kwargs):
+        self.catalog = current_catalog()
+        details = getattr(self.catalog, self.snapshot_detail)
+        return self.snapshot_response(request, details.get(kwargs[self.lookup_field]))
+
+
+class ServiceViewSet(CatalogSnapshotMixin, viewsets.ModelViewSet):
+    queryset = Service.objects.all()
     serializer_class = ServiceSerializer
     lookup_field = 'slug'
     permission_classes = [IsOwnerOrReadOnly]
+    snapshot_list = 'service_list'
+    snapshot_detail = 'services'
 
-class FeatureViewSet(viewsets.ModelViewSet): 
+class FeatureViewSet(viewsets.ModelViewSet):
     queryset = Feature.objects.all()
     serializer_class = FeatureSerializer
     permission_classes = [IsOwnerOrReadOnly]
 
-class PlanViewSet(viewsets.ModelViewSet): 
-    queryset = Plan.objects.prefetch_related('features', 'reviews__user__profile', 'faqs').all()
+class PlanViewSet(CatalogSnapshotMixin, viewsets.ModelViewSet):
+    queryset = plan_catalog_queryset()
     serializer_class = PlanSerializer
     lookup_field = 'slug'
-    permission_classes = [IsOwnerOrReadOnly] 
\ No newline at end of file
+    permission_classes = [IsOwnerOrReadOnly]
+    snapshot_list = 'plan_list'
+    snapshot_detail = 'plans'
+
+
+class CatalogSearchView(views.APIView):
+    """
+    Public full-text search over services, plans, features and FAQs.
+    ``q`` is required; ``limit`` caps the number of plan and service hits.
+    """
+    permission_classes = [AllowAny]
+    max_limit = 50
+
+    def get(self, request):
+        if not search.is_available():
+            return Response({"error": "Catalog search is not available on this database."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "The 'q' query parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), self.max_limit)
+        except ValueError:
+            return Response({"error": "'limit' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        plans, services = search.search(query, limit=limit)
+        return Response({"plans": plans, "services": services}, status=status.HTTP_200_OK)
+
+
+class CatalogAutocompleteView(views.APIView):
+    """Public title suggestions for a partially typed ``q``."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        if not search.is_available():
+            return Response({"error": "Catalog search is not available on this database."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        return Response(search.autocomplete(request.query_params.get('q', '')), status=status.HTTP_200_OK)
@@ -0,0 +1,164 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import User
+
+DEFAULTS = {
+    'MAX_ENTRIES': 1024,
+    'TTL': 300,
+    'SHARED_CACHE': 'default',
+}
+
+# The only user fields kept in the cache. Anything else (the password hash
+# included) is left deferred and loaded from the database if a view reads it.
+AUTH_FIELDS = ('id', 'email', 'first_name', 'last_name', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+
+class UserCache:
+    """
+    Bounded LRU of authenticated users keyed by id, with a TTL per entry.
+
+    Every user id also gets a generation in the shared cache alias, a random
+    value that is never reused. Invalidating a user replaces it, so entries
+    held by other processes stop matching on their next lookup and a role
+    change or deactivation applies everywhere at once. A generation the
+    cache has evicted is replaced the same way, so older entries can never
+    match again. Entries hold AUTH_FIELDS and,
+    when tokens are revocable, the password's revocation hash.
+    """
+
+    def __init__(self, max_entries, ttl, shared_cache=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_alias = shared_cache
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULTS, **getattr(settings, 'USER_AUTH_CACHE', {})}
+        return cls(options['MAX_ENTRIES'], options['TTL'], options['SHARED_CACHE'])
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _user_key(self, user_id, generation):
+        return f"auth-user:{user_id}:{generation}"
+
+    def _generation_key(self, user_id):
+        return f"auth-user-generation:{user_id}"
+
+    # Token claims may carry the id as a string while signals see the integer
+    # primary key, so every public method normalises ids the same way.
+    def generation(self, user_id):
+        user_id = str(user_id)
+        if self.shared is None:
+            return 0
+        key = self._generation_key(user_id)
+        generation = self.shared.get(key)
+        if generation is None:
+            # add() keeps the value of a process that got there first.
+            self.shared.add(key, uuid.uuid4().hex, None)
+            generation = self.shared.get(key)
+        return generation
+
+    def get(self, user_id, generation):
+        """Returns (user, revocation hash) or None."""
+        user_id = str(user_id)
+        now = time.monotonic()
+        entry = None
+        with self._lock:
+            local = self._entries.get(user_id)
+            if local is not None:
+                expires_at, entry_generation, entry = local
+                if expires_at > now and entry_generation == generation:
+                    self._entries.move_to_end(user_id)
+                else:
+                    del self._entries[user_id]
+                    entry = None
+
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(self._user_key(user_id, generation))
+            if entry is not None:
+                self._store_local(user_id, generation, entry)
+        if entry is None:
+            return None
+        values, revoke_hash = entry
+        return User.from_db(None, self.field_names(), values), revoke_hash
+
+    def set(self, user_id, generation, user):
+        user_id = str(user_id)
+        revoke_hash = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+        entry = (tuple(getattr(user, name) for name in self.field_names()), revoke_hash)
+        self._store_local(user_id, generation, entry)
+        if self.shared is not None:
+            self.shared.set(self._user_key(user_id, generation), entry, self.ttl)
+
+    @staticmethod
+    def field_names():
+        # In model order, as Model.from_db expects.
+        return [field.attname for field in User._meta.concrete_fields if field.attname in AUTH_FIELDS]
+
+    def _store_local(self, user_id, generation, entry):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, generation, entry)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if self.shared is not None:
+            self.shared.set(self._generation_key(user_id), uuid.uuid4().hex, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache.from_settings()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through ``user_cache``
+    instead of issuing a SELECT on every request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        generation = user_cache.generation(user_id)
+        cached = user_cache.get(user_id, generation)
+        if cached is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user_cache.set(user_id, generation, user)
+            revoke_hash = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+        else:
+            user, revoke_hash = cached
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != revoke_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from users.provisioning import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Issues temporary passwords and queues welcome emails for new guest accounts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Guests handled per pass.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting once nothing is pending.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls in --loop mode.')
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                processed = process_pending(options['batch_size'])
+                total += processed
+                if processed < options['batch_size']:
+                    break
+            if total:
+                self.stdout.write(self.style.SUCCESS(f"Welcomed {total} new guests."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
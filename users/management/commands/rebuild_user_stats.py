@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users.models import User
+from users.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-user stats rollup from orders, transactions, milestones and appointments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of users recomputed per transaction.')
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Only rebuild these user ids.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = User.objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        self.stdout.write("Rebuilding user stats...")
+
+        total = 0
+        batch = []
+        for user_id in users.values_list('id', flat=True).iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) >= batch_size:
+                total += self.flush(batch)
+                batch = []
+        if batch:
+            total += self.flush(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {total} users."))
+
+    def flush(self, batch):
+        with transaction.atomic():
+            return rebuild_stats(batch)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('active_orders', models.PositiveIntegerField(default=0)),
+                ('awaiting_payment_orders', models.PositiveIntegerField(default=0)),
+                ('completed_orders', models.PositiveIntegerField(default=0)),
+                ('cancelled_orders', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_pending', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_schedules', models.PositiveIntegerField(default=0)),
+                ('pending_schedules', models.PositiveIntegerField(default=0)),
+                ('confirmed_schedules', models.PositiveIntegerField(default=0)),
+                ('completed_schedules', models.PositiveIntegerField(default=0)),
+                ('cancelled_schedules', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestWelcome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('QUOTE', 'Quote request'), ('BOOKING', 'Appointment booking')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guest_welcomes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='guest_welcome_pending_idx')],
+            },
+        ),
+    ]
@@ -44,4 +44,51 @@ class Profile(models.Model):
     phone_number = models.CharField(max_length=20, blank=True, null=True)
 
     def __str__(self):
-        return f"Profile of {self.user.email}"    
\ No newline at end of file
+        return f"Profile of {self.user.email}"    
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+
+    total_orders = models.PositiveIntegerField(default=0)
+    active_orders = models.PositiveIntegerField(default=0)
+    awaiting_payment_orders = models.PositiveIntegerField(default=0)
+    completed_orders = models.PositiveIntegerField(default=0)
+    cancelled_orders = models.PositiveIntegerField(default=0)
+
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_pending = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    total_schedules = models.PositiveIntegerField(default=0)
+    pending_schedules = models.PositiveIntegerField(default=0)
+    confirmed_schedules = models.PositiveIntegerField(default=0)
+    completed_schedules = models.PositiveIntegerField(default=0)
+    cancelled_schedules = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats of {self.user.email}"
+
+
+class GuestWelcome(models.Model):
+    """
+    A guest account created by an anonymous quote or booking that still
+    needs its temporary password and welcome email. Processed by the
+    provision_guests worker, see users.provisioning.
+    """
+    class Kind(models.TextChoices):
+        QUOTE = 'QUOTE', 'Quote request'
+        BOOKING = 'BOOKING', 'Appointment booking'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='guest_welcomes')
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['processed_at', 'id'], name='guest_welcome_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} welcome for {self.user.email}"
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from communications.outbox import queue_email
+from .models import GuestWelcome, User
+
+WELCOME_EMAILS = {
+    GuestWelcome.Kind.QUOTE: (
+        "Welcome to Global Financial World - Your Account is Ready",
+        """
+                Hi {first_name},
+
+                Thank you for your request! Your account has been created and you are now logged in.
+
+                For future logins, please use the credentials below. We recommend changing your password from your dashboard.
+
+                Email: {email}
+                Temporary Password: {password}
+
+                Thanks,
+                The Global Financial World Team
+                """,
+    ),
+    GuestWelcome.Kind.BOOKING: (
+        "Welcome to Global Financial World - Account Created",
+        "Hi {first_name},\n\n"
+        "You have successfully booked an appointment! An account has been created for you.\n\n"
+        "Please log in to manage your appointments using these credentials:\n"
+        "Email: {email}\n"
+        "Temporary Password: {password}\n\n"
+        "Thanks,\nGlobal Financial World Team",
+    ),
+}
+
+
+def provision_guest(email, kind, first_name='', last_name=''):
+    """
+    Returns (user, created) for a guest ``email``. A new account is inserted
+    with an unusable password and its credentials are left to the
+    provision_guests worker, so the request does no hashing and no I/O.
+    Must run inside the caller's transaction.
+    """
+    user, created = User.objects.get_or_create(
+        email=email,
+        defaults={
+            'first_name': first_name,
+            'last_name': last_name,
+            'role': User.Role.CUSTOMER,
+            'password': make_password(None),
+        },
+    )
+    if created:
+        GuestWelcome.objects.create(user=user, kind=kind)
+    return user, created
+
+
+def process_pending(batch_size=50):
+    """
+    Issues temporary passwords and queues the welcome emails for up to
+    ``batch_size`` new guests. Returns the number processed.
+    """
+    pending = GuestWelcome.objects.filter(processed_at__isnull=True).order_by('id').values_list('id', flat=True)
+    processed = 0
+    for welcome_id in list(pending[:batch_size]):
+        # Hash before taking any lock; PBKDF2 is the slow part.
+        password = get_random_string(length=10)
+        if welcome_guest(welcome_id, password, make_password(password)):
+            processed += 1
+    return processed
+
+
+@transaction.atomic
+def welcome_guest(welcome_id, password, password_hash):
+    welcome = (
+        GuestWelcome.objects.select_for_update(skip_locked=True)
+        .select_related('user')
+        .filter(id=welcome_id, processed_at__isnull=True)
+        .first()
+    )
+    if welcome is None:
+        # Taken by another worker.
+        return False
+
+    user = welcome.user
+    # A guest who already chose a password (e.g. through a reset link) keeps it.
+    if not user.has_usable_password():
+        user.password = password_hash
+        user.save(update_fields=['password'])
+
+        subject, template = WELCOME_EMAILS[welcome.kind]
+        message = template.format(first_name=user.first_name, email=user.email, password=password)
+        queue_email(subject, message, recipient_list=[user.email], from_email=settings.EMAIL_HOST_USER)
+
+    welcome.processed_at = timezone.now()
+    welcome.save(update_fields=['processed_at'])
+    return True
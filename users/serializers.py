@@ -6,7 +6,7 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.encoding import smart_bytes
 from django.utils.http import urlsafe_base64_encode
-from django.core.mail import send_mail
+from communications.outbox import queue_email
 from django.conf import settings
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
@@ -126,6 +126,8 @@ class MyProfileSerializer(serializers.ModelSerializer):
     transaction_history = serializers.SerializerMethodField()
     schedule_stats = serializers.SerializerMethodField()
 
+    TRANSACTION_HISTORY_PREVIEW_SIZE = 5
+
     class Meta:
         model = User
         fields = [
@@ -136,7 +138,7 @@ class MyProfileSerializer(serializers.ModelSerializer):
             'transaction_history' ,
             'schedule_stats',
         ]
-        read_only_fields = ['email', 'role', 'id', 'order_stats', 'financial_stats', 'transaction_history']
+        read_only_fields = ['email', 'role', 'id', 'order_stats', 'financial_stats', 'transaction_history', 'schedule_stats']
 
     def update(self, instance, validated_data):
         profile_data = validated_data.pop('profile', {})
@@ -151,55 +153,60 @@ class MyProfileSerializer(serializers.ModelSerializer):
         return instance
 
 
+    def _stats(self, obj):
+        from .stats import get_or_build_stats
+        return get_or_build_stats(obj)
+
+    def _is_staff_member(self, obj):
+        return obj.role in [User.Role.EMPLOYEE, User.Role.OWNER]
+
     def get_order_stats(self, obj):
-        from ecommerce.models import Order
-        user_orders = Order.objects.filter(user=obj)
-        
+        if self._is_staff_member(obj):
+            return None
+        stats = self._stats(obj)
+
         return {
-            "total_orders": user_orders.count(),
-            "active_running": user_orders.filter(status=Order.Status.ACTIVE).count(),
-            "awaiting_payment": user_orders.filter(status=Order.Status.AWAITING_PAYMENT).count(),
-            "completed": user_orders.filter(status=Order.Status.PAID).count(),
-            "cancelled_rejected": user_orders.filter(status=Order.Status.CANCELLED).count(),
+            "total_orders": stats.total_orders,
+            "active_running": stats.active_orders,
+            "awaiting_payment": stats.awaiting_payment_orders,
+            "completed": stats.completed_orders,
+            "cancelled_rejected": stats.cancelled_orders,
         }
 
     def get_financial_stats(self, obj):
-        from ecommerce.models import Transaction
-        from billing.models import Milestone
-        from django.db.models import Sum
-
-        total_spent = Transaction.objects.filter(
-            order__user=obj, 
-            status=Transaction.Status.SUCCESS
-        ).aggregate(total=Sum('amount'))['total'] or 0.00
-        total_pending = Milestone.objects.filter(
-            order__user=obj,
-            status='PENDING' 
-        ).aggregate(total=Sum('amount'))['total'] or 0.00
-        
+        if self._is_staff_member(obj):
+            return None
+        stats = self._stats(obj)
+
         return {
-            "total_spend_money": total_spent,
-            "total_pending_money": total_pending 
+            "total_spend_money": stats.total_spent,
+            "total_pending_money": stats.total_pending
         }
 
     def get_transaction_history(self, obj):
-
+        # Only the latest few rows are embedded; the full history is served
+        # page by page from the my-transactions endpoint.
         from ecommerce.models import Transaction
         from ecommerce.serializers import TransactionSerializer 
-        transactions = Transaction.objects.filter(order__user=obj).order_by('-timestamp')
+        transactions = (
+            Transaction.objects.filter(order__user=obj)
+            .select_related('order__user', 'order__plan', 'milestone')
+            .order_by('-timestamp', '-id')[:self.TRANSACTION_HISTORY_PREVIEW_SIZE]
+        )
         return TransactionSerializer(transactions, many=True).data
 
     def get_schedule_stats(self, obj):
-            from scheduling.models import Appointment
-            my_schedules = Appointment.objects.filter(employee=obj)
-            
-            return {
-                "total_schedules_handled": my_schedules.count(),
-                "pending_requests": my_schedules.filter(status=Appointment.Status.PENDING).count(),
-                "active_upcoming": my_schedules.filter(status=Appointment.Status.CONFIRMED).count(),
-                "completed_schedules": my_schedules.filter(status=Appointment.Status.COMPLETED).count(),
-                "cancelled_schedules": my_schedules.filter(status=Appointment.Status.CANCELLED).count(),
-            }
+        if not self._is_staff_member(obj):
+            return None
+        stats = self._stats(obj)
+
+        return {
+            "total_schedules_handled": stats.total_schedules,
+            "pending_requests": stats.pending_schedules,
+            "active_upcoming": stats.confirmed_schedules,
+            "completed_schedules": stats.completed_schedules,
+            "cancelled_schedules": stats.cancelled_schedules,
+        }
 
 class RequestPasswordResetEmailSerializer(serializers.Serializer):
     email = serializers.EmailField(min_length=2)
@@ -234,12 +241,11 @@ class RequestPasswordResetEmailSerializer(serializers.Serializer):
                 Thanks,
                 The Global Financial World Team
                 """
-        send_mail(
+        queue_email(
             subject=subject,
             message=message,
             from_email=settings.EMAIL_HOST_USER,
             recipient_list=[email],
-            fail_silently=False
         )
 
 
@@ -1,9 +1,65 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import User, Profile
+from .authentication import user_cache
+from . import stats
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
 
     if created:
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Drop the entry now and again after commit, so a request that reads the
+    # old row while the write is still in flight cannot re-cache it.
+    user_id = instance.pk
+    user_cache.invalidate(user_id)
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+def _order_owner_id(instance):
+    from ecommerce.models import Order
+
+    if type(instance).order.is_cached(instance) and instance.order is not None:
+        return instance.order.user_id
+    return Order.objects.filter(pk=instance.order_id).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender='ecommerce.Order')
+@receiver(post_delete, sender='ecommerce.Order')
+def refresh_stats_on_order_change(sender, instance, **kwargs):
+    stats.refresh_order_stats(instance.user_id)
+    if kwargs.get('signal') is post_delete:
+        stats.refresh_financial_stats(instance.user_id)
+        return
+
+    previous_user_id = getattr(instance, '_loaded_user_id', None)
+    if previous_user_id and previous_user_id != instance.user_id:
+        # The order took its payments and milestones to the new customer.
+        stats.refresh_order_stats(previous_user_id)
+        stats.refresh_financial_stats(previous_user_id)
+        stats.refresh_financial_stats(instance.user_id)
+    instance._loaded_user_id = instance.user_id
+
+
+@receiver(post_save, sender='ecommerce.Transaction')
+@receiver(post_delete, sender='ecommerce.Transaction')
+@receiver(post_save, sender='billing.Milestone')
+@receiver(post_delete, sender='billing.Milestone')
+def refresh_stats_on_payment_change(sender, instance, **kwargs):
+    stats.refresh_financial_stats(_order_owner_id(instance))
+
+
+@receiver(post_save, sender='scheduling.Appointment')
+@receiver(post_delete, sender='scheduling.Appointment')
+def refresh_stats_on_appointment_change(sender, instance, **kwargs):
+    stats.refresh_schedule_stats(instance.employee_id)
+    previous_employee_id = getattr(instance, '_loaded_employee_id', None)
+    if previous_employee_id and previous_employee_id != instance.employee_id:
+        stats.refresh_schedule_stats(previous_employee_id)
+    instance._loaded_employee_id = instance.employee_id
@@ -0,0 +1,153 @@
+from decimal import Decimal
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from .models import UserStats
+
+ORDER_FIELDS = ['total_orders', 'active_orders', 'awaiting_payment_orders', 'completed_orders', 'cancelled_orders']
+FINANCIAL_FIELDS = ['total_spent', 'total_pending']
+SCHEDULE_FIELDS = ['total_schedules', 'pending_schedules', 'confirmed_schedules', 'completed_schedules', 'cancelled_schedules']
+
+
+def _order_aggregates():
+    from ecommerce.models import Order
+    return {
+        'total_orders': Count('id'),
+        'active_orders': Count('id', filter=Q(status=Order.Status.ACTIVE)),
+        'awaiting_payment_orders': Count('id', filter=Q(status=Order.Status.AWAITING_PAYMENT)),
+        'completed_orders': Count('id', filter=Q(status=Order.Status.PAID)),
+        'cancelled_orders': Count('id', filter=Q(status=Order.Status.CANCELLED)),
+    }
+
+
+def _schedule_aggregates():
+    from scheduling.models import Appointment
+    return {
+        'total_schedules': Count('id'),
+        'pending_schedules': Count('id', filter=Q(status=Appointment.Status.PENDING)),
+        'confirmed_schedules': Count('id', filter=Q(status=Appointment.Status.CONFIRMED)),
+        'completed_schedules': Count('id', filter=Q(status=Appointment.Status.COMPLETED)),
+        'cancelled_schedules': Count('id', filter=Q(status=Appointment.Status.CANCELLED)),
+    }
+
+
+def compute_order_stats(user_id):
+    from ecommerce.models import Order
+    return Order.objects.filter(user_id=user_id).aggregate(**_order_aggregates())
+
+
+def compute_financial_stats(user_id):
+    from ecommerce.models import Transaction
+    from billing.models import Milestone
+
+    total_spent = Transaction.objects.filter(
+        order__user_id=user_id,
+        status=Transaction.Status.SUCCESS
+    ).aggregate(total=Sum('amount'))['total']
+    total_pending = Milestone.objects.filter(
+        order__user_id=user_id,
+        status=Milestone.Status.PENDING
+    ).aggregate(total=Sum('amount'))['total']
+
+    return {
+        'total_spent': total_spent or Decimal('0.00'),
+        'total_pending': total_pending or Decimal('0.00'),
+    }
+
+
+def compute_schedule_stats(user_id):
+    from scheduling.models import Appointment
+    return Appointment.objects.filter(employee_id=user_id).aggregate(**_schedule_aggregates())
+
+
+def _store(user_id, values):
+    # Rows that do not exist yet are built lazily on first read, so a write
+    # here never resurrects the rollup of a user that is being deleted.
+    UserStats.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **values)
+
+
+def refresh_order_stats(user_id):
+    if user_id:
+        _store(user_id, compute_order_stats(user_id))
+
+
+def refresh_financial_stats(user_id):
+    if user_id:
+        _store(user_id, compute_financial_stats(user_id))
+
+
+def refresh_schedule_stats(user_id):
+    if user_id:
+        _store(user_id, compute_schedule_stats(user_id))
+
+
+def get_or_build_stats(user):
+    """Returns the rollup row for ``user``, building it on first access."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        values = {}
+        values.update(compute_order_stats(user.id))
+        values.update(compute_financial_stats(user.id))
+        values.update(compute_schedule_stats(user.id))
+        stats, _ = UserStats.objects.update_or_create(user=user, defaults=values)
+        user.stats = stats
+        return stats
+
+
+def rebuild_stats(user_ids):
+    """
+    Recomputes the rollup for a batch of users with one grouped query per
+    section and writes it back with a single upsert.
+    """
+    from ecommerce.models import Order, Transaction
+    from billing.models import Milestone
+    from scheduling.models import Appointment
+
+    rows = {
+        user_id: UserStats(user_id=user_id, total_spent=Decimal('0.00'), total_pending=Decimal('0.00'))
+        for user_id in user_ids
+    }
+    if not rows:
+        return 0
+
+    order_rows = (
+        Order.objects.filter(user_id__in=rows)
+        .values('user_id')
+        .annotate(**_order_aggregates())
+    )
+    for row in order_rows:
+        for field in ORDER_FIELDS:
+            setattr(rows[row['user_id']], field, row[field])
+
+    spent_rows = (
+        Transaction.objects.filter(order__user_id__in=rows, status=Transaction.Status.SUCCESS)
+        .values('order__user_id')
+        .annotate(total=Sum('amount'))
+    )
+    for row in spent_rows:
+        rows[row['order__user_id']].total_spent = row['total'] or Decimal('0.00')
+
+    pending_rows = (
+        Milestone.objects.filter(order__user_id__in=rows, status=Milestone.Status.PENDING)
+        .values('order__user_id')
+        .annotate(total=Sum('amount'))
+    )
+    for row in pending_rows:
+        rows[row['order__user_id']].total_pending = row['total'] or Decimal('0.00')
+
+    schedule_rows = (
+        Appointment.objects.filter(employee_id__in=rows)
+        .values('employee_id')
+        .annotate(**_schedule_aggregates())
+    )
+    for row in schedule_rows:
+        for field in SCHEDULE_FIELDS:
+            setattr(rows[row['employee_id']], field, row[field])
+
+    UserStats.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=ORDER_FIELDS + FINANCIAL_FIELDS + SCHEDULE_FIELDS + ['updated_at'],
+    )
+    return len(rows)
@@ -1,3 +1,273 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from io import StringIO
+from decimal import Decimal
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from billing.models import Milestone
+from communications.models import OutboundEmail
+from ecommerce.models import Order, Transaction
+from scheduling.models import Appointment
+from services.models import Service, Plan
+from users.authentication import UserCache, user_cache
+from users.models import GuestWelcome, User, UserStats
+from users.stats import get_or_build_stats
 
-# Create your tests here.
+
+class UserStatsTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        self.other = User.objects.create_user(email="other@example.com", password="x")
+        self.employee = User.objects.create_user(email="employee@example.com", password="x", role=User.Role.EMPLOYEE)
+        self.colleague = User.objects.create_user(email="colleague@example.com", password="x", role=User.Role.EMPLOYEE)
+        for user in (self.customer, self.other, self.employee, self.colleague):
+            get_or_build_stats(user)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_profile_reads_the_rollup(self):
+        order = Order.objects.create(user=self.customer, plan=self.plan, status=Order.Status.ACTIVE)
+        milestone = Milestone.objects.create(order=order, title="Deposit", amount="40.00")
+        Transaction.objects.create(order=order, milestone=milestone, amount="60.00", status=Transaction.Status.SUCCESS)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.customer.pk))
+        response = client.get("/api/users/me/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_stats"]["total_orders"], 1)
+        self.assertEqual(response.data["order_stats"]["active_running"], 1)
+        self.assertEqual(Decimal(str(response.data["financial_stats"]["total_spend_money"])), Decimal("60.00"))
+        self.assertEqual(Decimal(str(response.data["financial_stats"]["total_pending_money"])), Decimal("40.00"))
+        self.assertIsNone(response.data["schedule_stats"])
+
+    def test_moving_an_order_refreshes_both_customers(self):
+        order = Order.objects.create(user=self.customer, plan=self.plan)
+        Milestone.objects.create(order=order, title="Deposit", amount="40.00")
+
+        order = Order.objects.get(pk=order.pk)
+        order.user = self.other
+        order.save()
+
+        self.assertEqual(self.stats(self.customer).total_orders, 0)
+        self.assertEqual(self.stats(self.customer).total_pending, Decimal("0.00"))
+        self.assertEqual(self.stats(self.other).total_orders, 1)
+        self.assertEqual(self.stats(self.other).total_pending, Decimal("40.00"))
+
+    def test_reassigning_an_appointment_refreshes_both_employees(self):
+        start = timezone.make_aware(datetime(2030, 1, 7, 9, 0))
+        appointment = Appointment.objects.create(
+            customer=self.customer, employee=self.employee, start_time=start, end_time=start + timedelta(minutes=30),
+        )
+        self.assertEqual(self.stats(self.employee).total_schedules, 1)
+
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.employee = self.colleague
+        appointment.save()
+
+        self.assertEqual(self.stats(self.employee).total_schedules, 0)
+        self.assertEqual(self.stats(self.colleague).total_schedules, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        Order.objects.create(user=self.customer, plan=self.plan)
+        UserStats.objects.filter(user=self.customer).update(total_orders=7)
+
+        call_command("rebuild_user_stats", stdout=StringIO())
+
+        self.assertEqual(self.stats(self.customer).total_orders, 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CachedAuthenticationTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(email="customer@example.com", password="x", first_name="Ada")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def user_queries(self, context):
+        return [query for query in context.captured_queries if 'FROM "users_user"' in query['sql']]
+
+    def test_warm_cache_makes_no_auth_queries(self):
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/users/me/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["first_name"], "Ada")
+        self.assertEqual(self.user_queries(context), [])
+
+    def test_shared_entry_holds_no_password(self):
+        self.client.get("/api/users/me/")
+
+        generation = user_cache.generation(self.user.pk)
+        values, _ = caches['default'].get(f"auth-user:{self.user.pk}:{generation}")
+        self.assertNotIn(self.user.password, values)
+        self.assertEqual(dict(zip(UserCache.field_names(), values))["email"], "customer@example.com")
+
+    def test_invalidation_reaches_other_processes(self):
+        self.client.get("/api/users/me/")
+
+        # Another worker deactivates the user; this process keeps its own LRU.
+        other_process = UserCache(1024, 300, 'default')
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            other_process.invalidate(self.user.pk)
+
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 401)
+
+    def test_an_evicted_generation_never_revives_old_entries(self):
+        # The shared cache culls entries at random once it is full.
+        generation_key = f"auth-user-generation:{self.user.pk}"
+        caches['default'].delete(generation_key)
+        self.client.get("/api/users/me/")
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            user_cache.invalidate(self.user.pk)
+        user_cache.clear()
+
+        caches['default'].delete(generation_key)
+
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 401)
+
+
+class GuestProvisioningTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        self.plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.employee = User.objects.create_user(email="employee@example.com", password="x", role=User.Role.EMPLOYEE)
+        self.client = APIClient()
+
+    def request_quote(self, email="guest@example.com"):
+        return self.client.post("/api/quotes/", {"name": "Ada Byron", "email": email, "plan": self.plan.id}, format="json")
+
+    def book(self, email):
+        start = timezone.make_aware(datetime(2030, 1, 7, 9, 0))
+        return self.client.post("/api/appointments/", {
+            "employee_id": self.employee.id,
+            "email": email,
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=30)).isoformat(),
+        }, format="json")
+
+    def provision(self):
+        call_command("provision_guests", stdout=StringIO())
+
+    def test_guest_quote_defers_the_password_and_the_email(self):
+        response = self.request_quote()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("access", response.data["token"])
+        guest = User.objects.get(email="guest@example.com")
+        self.assertEqual((guest.first_name, guest.last_name), ("Ada", "Byron"))
+        self.assertFalse(guest.has_usable_password())
+        self.assertEqual(GuestWelcome.objects.get(user=guest).kind, GuestWelcome.Kind.QUOTE)
+        self.assertFalse(OutboundEmail.objects.filter(recipients=["guest@example.com"]).exists())
+
+    def test_worker_issues_the_password_once(self):
+        self.book("guest@example.com")
+
+        self.provision()
+        self.provision()
+
+        email = OutboundEmail.objects.get(recipients=["guest@example.com"])
+        self.assertEqual(email.subject, "Welcome to Global Financial World - Account Created")
+        password = email.body.split("Temporary Password: ")[1].split()[0]
+        self.assertTrue(User.objects.get(email="guest@example.com").check_password(password))
+        self.assertIsNotNone(GuestWelcome.objects.get().processed_at)
+
+    def test_password_chosen_before_the_worker_runs_is_kept(self):
+        self.request_quote()
+        guest = User.objects.get(email="guest@example.com")
+        guest.set_password("chosen-password")
+        guest.save()
+
+        self.provision()
+
+        self.assertTrue(User.objects.get(pk=guest.pk).check_password("chosen-password"))
+        self.assertFalse(OutboundEmail.objects.filter(recipients=["guest@example.com"]).exists())
+        self.assertIsNotNone(GuestWelcome.objects.get().processed_at)
+
+    def test_known_emails_are_not_provisioned_again(self):
+        User.objects.create_user(email="known@example.com", password="x")
+
+        self.assertEqual(self.request_quote("known@example.com").status_code, 201)
+        self.assertEqual(self.book("known@example.com").status_code, 201)
+
+        self.assertFalse(GuestWelcome.objects.exists())
+        self.assertTrue(User.objects.get(email="known@example.com").check_password("x"))
+
+
+class TransactionHistoryTests(TestCase):
+
+    def setUp(self):
+        service = Service.objects.create(name="Bookkeeping", slug="bookkeeping", description="Books")
+        plan = Plan.objects.create(service=service, name="Basic", slug="basic", description="Basic", price="100.00")
+        self.customer = User.objects.create_user(email="customer@example.com", password="x")
+        other = User.objects.create_user(email="other@example.com", password="x")
+        self.order = Order.objects.create(user=self.customer, plan=plan)
+        Transaction.objects.create(order=Order.objects.create(user=other, plan=plan), amount="10.00")
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def add(self, count, when):
+        created = [Transaction.objects.create(order=self.order, amount="10.00") for _ in range(count)]
+        Transaction.objects.filter(pk__in=[t.pk for t in created]).update(timestamp=when)
+        return created
+
+    def expected(self):
+        return list(
+            Transaction.objects.filter(order__user=self.customer).order_by("-timestamp", "-id").values_list("id", flat=True)
+        )
+
+    def test_cursor_walks_tied_timestamps_without_gaps_or_duplicates(self):
+        # Most rows share a timestamp, so the id alone has to break the ties.
+        self.add(7, timezone.make_aware(datetime(2030, 1, 1, 9, 0)))
+        self.add(4, timezone.make_aware(datetime(2030, 1, 2, 9, 0)))
+
+        seen = []
+        response = self.client.get("/api/users/me/transactions/", {"page_size": 3})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += [row["id"] for row in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(seen, self.expected())
+
+    def test_bad_cursor_is_rejected(self):
+        for cursor in ("not-base64!", "WzFd", "WyJ4IiwgIjEiXQ=="):
+            response = self.client.get("/api/users/me/transactions/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_a_page_costs_the_same_queries_at_any_size(self):
+        self.add(25, timezone.make_aware(datetime(2030, 1, 1, 9, 0)))
+
+        counts = []
+        for page_size in (2, 20):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get("/api/users/me/transactions/", {"page_size": page_size})
+            self.assertEqual(len(response.data["results"]), page_size)
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts, [1, 1])
+
+    def test_profile_embeds_only_the_latest_five(self):
+        self.add(8, timezone.make_aware(datetime(2030, 1, 1, 9, 0)))
+
+        response = self.client.get("/api/users/me/")
+
+        self.assertEqual([row["id"] for row in response.data["transaction_history"]], self.expected()[:5])
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from .views import MyProfileViewSet, RequestPasswordResetEmailView, SetNewPasswordView , UserManagementViewSet,  ApproveEmployeeView, PendingEmployeeListView, ChangePasswordView , UserRegistrationView
+from .views import MyProfileViewSet, MyTransactionHistoryView, RequestPasswordResetEmailView, SetNewPasswordView , UserManagementViewSet,  ApproveEmployeeView, PendingEmployeeListView, ChangePasswordView , UserRegistrationView
 from rest_framework.routers import DefaultRouter 
 
 
@@ -22,6 +22,7 @@ urlpatterns = [
     path('pending-employees/', PendingEmployeeListView.as_view(), name='pending-employees'),
     path('approve-employee/<int:user_id>/', ApproveEmployeeView.as_view(), name='approve-employee'),
     path('me/', my_profile_view, name='my-profile'),
+    path('me/transactions/', MyTransactionHistoryView.as_view(), name='my-transactions'),
     path('request-reset-password/', RequestPasswordResetEmailView.as_view(), name='request-reset-password'),
     path('reset-password-confirm/', SetNewPasswordView.as_view(), name='reset-password-confirm'),
 
@@ -11,6 +11,9 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import viewsets, filters 
 from rest_framework.permissions import IsAuthenticated
 from .serializers import MyProfileSerializer 
+from api.pagination import KeysetPagination
+from ecommerce.models import Transaction
+from ecommerce.serializers import TransactionSerializer
 
 
 User = get_user_model()
@@ -143,6 +146,23 @@ class MyProfileViewSet(mixins.RetrieveModelMixin,
         return self.request.user    
     
 
+class TransactionHistoryPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+    page_size = 20
+
+
+class MyTransactionHistoryView(generics.ListAPIView):
+
+    serializer_class = TransactionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = TransactionHistoryPagination
+
+    def get_queryset(self):
+        return Transaction.objects.filter(order__user=self.request.user).select_related(
+            'order__user', 'order__plan', 'milestone'
+        )
+
+
 class RequestPasswordResetEmailView(generics.GenericAPIView):
 
     serializer_class = RequestPasswordResetEmailSerializer